@@ -3,139 +3,555 @@ Municipal Complaint Management System
 Professional Edition v2.0
 Main Flask Application with Advanced Features
 """
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, send_file
+from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, send_file, make_response, Response, stream_with_context, g
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
 import os
-import bcrypt
-from pymongo import MongoClient
+import random
+import time
+import atexit
+import hmac
+import logging
+import threading
+from pymongo import MongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
 from bson import ObjectId
 import json
+import mimetypes
+import click
 from config import Config
 from utils.helpers import *
 from utils.decorators import login_required, admin_required, staff_required
+from utils.storage import create_storage_backend
+from utils.compression import init_compression, precompress_static
+from utils.projections import get_projection, parse_fields_param
+from utils.exports import run_export, EXPORT_FORMATS
+from utils.reports import (data_version, month_range, report_filename, run_performance_report, list_cached_reports,
+                           ensure_report_indexes, resolution_changes)
+from utils.imports import run_import, ensure_import_indexes, IMPORT_FORMATS
+from utils.jobs import JobManager, ConsoleContext, PeriodicTask, acquire_lease, job_to_json
+from utils.assignment import AssignmentEngine, CLOSED_STATUSES, is_open
+from utils.roster import StaffRoster
+from utils.sla import ensure_sla_indexes, sweep_sla_breaches, group_by_department
+from utils.deadlines import DeadlineScheduler, LOAD_PROJECTION as DEADLINE_PROJECTION
+from utils.live import ChangeFeed
+from utils.sync import InvalidSyncToken, changes_since, ensure_sync_indexes, record_reassignments
+from utils.duplicates import DuplicateIndex, ensure_duplicate_indexes, minhash_signature
+from utils.classifier import ClassifierHolder, ComplaintClassifier, TRAINING_PROJECTION, rescore_collection
+from utils.classifier import is_available as classifier_available
+from utils.keywords import KeywordMatcher, is_more_severe, rescan_collection
+from utils.geo import (ensure_geo_indexes, parse_point, validate_polygon, bbox_polygon, geohash_encode,
+                       find_nearby, find_within, hotspots, read_wards)
+from utils.pool import PoolMonitor
+from utils.commands import CommandMonitor, server_timing
+from utils.metrics import MetricsRegistry
+from utils.profiles import ProfileStore, RequestProfiler
+from utils.logs import setup_logging, new_request_id, dropped_records
+from utils.conditional import VALIDATOR_FIELDS, complaint_etag, is_not_modified, not_modified_response, set_validators
 
 app = Flask(__name__)
 app.config.from_object(Config)
 app.secret_key = app.config['SECRET_KEY']
 
+# Structured logging (JSON lines through a background writer thread), correlated by request ID
+setup_logging(app.config)
+logger = logging.getLogger(__name__)
+
+@app.before_request
+def start_request():
+    """Request ID for log correlation, start time for timings"""
+    g.request_id = new_request_id(request.headers.get('X-Request-ID'))
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def echo_request_id(response):
+    request_id = g.get('request_id')
+    if request_id:
+        response.headers['X-Request-ID'] = request_id
+    return response
+
+# Opt-in profiling of single requests for admins; with PROFILING_ENABLED off no hook is registered
+profile_store = ProfileStore(app.config['PROFILE_DIR'], app.config['PROFILE_MAX_STORED'])
+
+def requested_profile_mode():
+    """'cpu', 'mem' or None from the X-Profile header or _profile query flag (admins only)"""
+    flag = (request.headers.get('X-Profile') or request.args.get('_profile') or '').lower()
+    if flag not in ('1', 'true', 'cpu', 'mem', 'memory') or session.get('user_role') != 'admin':
+        return None
+    if random.random() >= app.config['PROFILE_SAMPLE_RATE']:
+        return None
+    return 'mem' if flag.startswith('mem') else 'cpu'
+
+def finish_profile(status_code):
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return None
+    profiler.stop()
+    try:
+        return profile_store.save(profiler, {
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': request.endpoint,
+            'status': status_code,
+            'request_id': g.get('request_id'),
+            'user_id': session.get('user_id')
+        })
+    except Exception as e:
+        logger.exception("Error saving profile: %s", e)
+        return None
+
+if app.config['PROFILING_ENABLED']:
+    @app.before_request
+    def start_profiling():
+        mode = requested_profile_mode()
+        if mode is not None:
+            profiler = RequestProfiler.start(memory=(mode == 'mem'))
+            if profiler is not None:
+                g.profiler = profiler
+
+    @app.after_request
+    def save_profile(response):
+        # Registered early, so this after_request hook runs last (after compression and the others)
+        profile_id = finish_profile(response.status_code)
+        if profile_id:
+            response.headers['X-Profile-ID'] = profile_id
+            logger.info("Profiled %s %s: %s", request.method, request.path, profile_id)
+        return response
+
+    @app.teardown_request
+    def discard_profile(error=None):
+        # Requests that raised never reach after_request
+        if 'profiler' in g:
+            finish_profile(500)
+
+# Compress HTML/JSON responses and serve precompressed static files
+init_compression(app)
+
 # Make config available to templates
 @app.context_processor
 def inject_config():
     return dict(config=app.config)
 
 # MongoDB Connection - Separate databases for users and complaints
-try:
-    client = MongoClient(app.config['MONGODB_URI'], serverSelectionTimeoutMS=5000)
-    # Test connection
-    client.admin.command('ping')
-    
-    # Separate databases
-    users_db = client[app.config['USERS_DATABASE_NAME']]
-    complaints_db = client[app.config['COMPLAINTS_DATABASE_NAME']]
-    
-    # Legacy support - maintain 'db' variable for complaints
-    db = complaints_db
-    
-    print("✓ Connected to MongoDB successfully")
-    print(f"  - Users Database: {app.config['USERS_DATABASE_NAME']}")
-    print(f"  - Complaints Database: {app.config['COMPLAINTS_DATABASE_NAME']}")
-except Exception as e:
-    print(f"✗ MongoDB connection error: {e}")
-    print("\n" + "="*60)
-    print("MongoDB Setup Instructions:")
-    print("="*60)
-    print("\nOption 1: Start Local MongoDB")
-    print("  - Windows: Start 'MongoDB' service from Services")
-    print("  - Or run: net start MongoDB")
-    print("  - Download: https://www.mongodb.com/try/download/community")
-    print("\nOption 2: Use MongoDB Atlas (Cloud - Free)")
-    print("  - Sign up: https://www.mongodb.com/cloud/atlas")
-    print("  - Create free cluster")
-    print("  - Get connection string")
-    print("  - Update MONGODB_URI in config.py")
-    print("\n" + "="*60)
-    users_db = None
-    complaints_db = None
-    db = None
+# Pool counters and checkout wait times for /healthz and /readyz
+pool_monitor = PoolMonitor(max_pool_size=app.config['MONGO_MAX_POOL_SIZE'])
+# Prometheus metrics (/metrics), summed across worker processes through METRICS_DIR
+metrics = MetricsRegistry(app.config['METRICS_DIR'] if app.config['METRICS_ENABLED'] else None)
+request_count = metrics.counter('http_requests_total', 'HTTP requests by endpoint, method and status',
+                                ('endpoint', 'method', 'status'))
+request_latency = metrics.histogram('http_request_duration_seconds', 'Time to produce the response, by endpoint',
+                                    ('endpoint',))
+db_command_count = metrics.counter('mongodb_commands_total', 'MongoDB commands by collection and command',
+                                   ('collection', 'command'))
+db_command_errors = metrics.counter('mongodb_command_errors_total', 'Failed MongoDB commands by collection',
+                                    ('collection',))
+db_command_latency = metrics.histogram('mongodb_command_duration_seconds', 'MongoDB command time by collection',
+                                       ('collection',), buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                                                                 0.25, 0.5, 1.0, 5.0))
+cache_lookups = metrics.counter('cache_lookups_total', 'Cache lookups by cache and result (hit/miss)',
+                                ('cache', 'result'))
+upload_bytes = metrics.counter('upload_bytes_total', 'Bytes of uploaded files stored, by kind', ('kind',))
+active_sessions = metrics.active_set('active_sessions', 'Signed-in users with a request in the last '
+                                     f"{app.config['METRICS_SESSION_WINDOW']} seconds",
+                                     window=app.config['METRICS_SESSION_WINDOW'])
+# Publishes this process's values for /metrics answered by sibling workers
+metrics_flusher = PeriodicTask('metrics-flush', metrics.flush, app.config['METRICS_FLUSH_INTERVAL'])
+
+def observe_database_command(command_name, collection, seconds, failed):
+    collection = collection or '-'
+    db_command_count.inc(collection, command_name)
+    db_command_latency.observe(seconds, collection)
+    if failed:
+        db_command_errors.inc(collection)
+
+# Database commands per request (count, time, collections, repeated query shapes)
+command_monitor = CommandMonitor(observer=observe_database_command if app.config['METRICS_ENABLED'] else None)
+
+def open_database():
+    """
+    MongoDB client and databases: (client, users_db, complaints_db), or Nones for an unusable URI
+    Nothing connects here (connect=False); database_ready() is the readiness gate
+    """
+    try:
+        client = MongoClient(
+            app.config['MONGODB_URI'],
+            connect=False,
+            maxPoolSize=app.config['MONGO_MAX_POOL_SIZE'],
+            minPoolSize=app.config['MONGO_MIN_POOL_SIZE'],
+            maxIdleTimeMS=app.config['MONGO_MAX_IDLE_TIME_MS'],
+            waitQueueTimeoutMS=app.config['MONGO_WAIT_QUEUE_TIMEOUT_MS'],
+            socketTimeoutMS=app.config['MONGO_SOCKET_TIMEOUT_MS'],
+            connectTimeoutMS=app.config['MONGO_CONNECT_TIMEOUT_MS'],
+            serverSelectionTimeoutMS=app.config['MONGO_SERVER_SELECTION_TIMEOUT_MS'],
+            event_listeners=[pool_monitor] + ([command_monitor] if app.config['DB_TRACE_ENABLED']
+                                              or app.config['METRICS_ENABLED'] else [])
+        )
+        return client, client[app.config['USERS_DATABASE_NAME']], client[app.config['COMPLAINTS_DATABASE_NAME']]
+    except Exception as e:
+        log_mongodb_help(e)
+        return None, None, None
+
+MONGODB_HELP = """MongoDB Setup Instructions:
+Option 1: Start Local MongoDB
+  - Windows: Start 'MongoDB' service from Services
+  - Or run: net start MongoDB
+  - Download: https://www.mongodb.com/try/download/community
+Option 2: Use MongoDB Atlas (Cloud - Free)
+  - Sign up: https://www.mongodb.com/cloud/atlas
+  - Create free cluster
+  - Get connection string
+  - Update MONGODB_URI in config.py"""
+
+def log_mongodb_help(error):
+    logger.error("MongoDB connection error: %s", error)
+    logger.info(MONGODB_HELP)
+
+client, users_db, complaints_db = open_database()
+# Legacy support - maintain 'db' variable for complaints
+db = complaints_db
+# MongoClient is not fork-safe: workers forked from a preloaded master reconnect (see reconnect_after_fork)
+connected_pid = os.getpid()
+process_started = time.monotonic()
+
+# Readiness: the first successful ping marks the database ready for this process
+database_status = {'ready': False, 'checked_at': None, 'error': None, 'initialize': False}
+database_lock = threading.Lock()
+
+def database_ready():
+    """Ping MongoDB until it answers once; while it is down, re-check at most every DB_READY_RETRY_SECONDS"""
+    if database_status['ready']:
+        return True
+    if client is None:
+        return False
+    # One thread pings; others don't queue behind a 5s server-selection timeout
+    if not database_lock.acquire(blocking=False):
+        return False
+    try:
+        checked_at = database_status['checked_at']
+        if checked_at is not None and time.monotonic() - checked_at < app.config['DB_READY_RETRY_SECONDS']:
+            return False
+        database_status['checked_at'] = time.monotonic()
+        try:
+            client.admin.command('ping')
+        except Exception as e:
+            if database_status['error'] is None:
+                log_mongodb_help(e)
+            database_status['error'] = str(e)
+            return False
+        database_status.update(ready=True, error=None)
+        logger.info("Connected to MongoDB (users: %s, complaints: %s, pid %s)", app.config['USERS_DATABASE_NAME'],
+                    app.config['COMPLAINTS_DATABASE_NAME'], os.getpid())
+    finally:
+        database_lock.release()
+    if database_status['initialize']:
+        # The database was down when the app started
+        database_status['initialize'] = False
+        initialize_database()
+        ensure_default_admin()
+    return True
+
+@app.before_request
+def require_database():
+    """Answer 503 until MongoDB is reachable rather than failing deep inside a view"""
+    if request.endpoint in DATABASE_FREE_ENDPOINTS or database_ready():
+        return None
+    message = 'Service is starting up, please try again shortly'
+    if request.path.startswith('/api/') or request.is_json or request.accept_mimetypes.best == 'application/json':
+        response = jsonify({'success': False, 'message': message})
+    else:
+        response = make_response(message)
+    response.status_code = 503
+    response.headers['Retry-After'] = str(app.config['DB_READY_RETRY_SECONDS'])
+    return response
+
+DATABASE_FREE_ENDPOINTS = {'static', 'healthz', 'readyz', 'metrics'}
+
+@app.before_request
+def trace_database_commands():
+    if app.config['DB_TRACE_ENABLED'] and request.endpoint != 'static':
+        command_monitor.begin()
+
+@app.after_request
+def report_database_commands(response):
+    """Per-route totals, Server-Timing header and N+1 warnings from the request's command trace"""
+    trace = command_monitor.current()
+    if trace is None or 'request_started' not in g:
+        return response
+    elapsed = time.perf_counter() - g.request_started
+    route = request.endpoint or 'unmatched'
+    command_monitor.record_route(route, trace, elapsed)
+    if app.config['DB_TRACE_SERVER_TIMING']:
+        response.headers['Server-Timing'] = server_timing(trace, elapsed)
+    logger.debug("%s %s: %s database commands, %.1f ms of %.1f ms", request.method, route, trace.commands,
+                 trace.duration * 1000, elapsed * 1000, extra={'route': route, 'db': trace.summary()})
+    if app.config['DB_TRACE_REPEAT_WARNINGS']:
+        for shape, count in trace.repeated(app.config['DB_TRACE_REPEAT_THRESHOLD']):
+            logger.warning("Possible N+1 in %s: %s ran %s times in one request", route, shape, count,
+                           extra={'route': route, 'shape': shape, 'count': count})
+    return response
+
+@app.teardown_request
+def end_database_trace(error=None):
+    command_monitor.end()
+
+@app.after_request
+def record_request_metrics(response):
+    """Request count and latency per endpoint, conditional GET hits, active sessions"""
+    if not app.config['METRICS_ENABLED'] or 'request_started' not in g:
+        return response
+    endpoint = request.endpoint or 'unmatched'
+    request_count.inc(endpoint, request.method, response.status_code)
+    request_latency.observe(time.perf_counter() - g.request_started, endpoint)
+    if request.if_none_match or request.if_modified_since:
+        cache_lookups.inc('http_conditional', 'hit' if response.status_code == 304 else 'miss')
+    if endpoint != 'static' and 'user_id' in session:
+        active_sessions.touch(session['user_id'])
+    return response
+
+# Upload storage (local filesystem or GridFS)
+storage = create_storage_backend(app.config, complaints_db)
+
+# Background jobs (exports, reports)
+jobs = JobManager(complaints_db.jobs if complaints_db is not None else None,
+                  max_workers=app.config['JOB_WORKERS'])
+
+# Queued or running jobs; the notifications count is the email outbox
+metrics.gauge('background_jobs', 'Background jobs queued or running, by type', ('type',),
+              callback=lambda: jobs.active_counts())
+metrics.gauge('email_outbox_depth', 'Notification email jobs queued or running',
+              callback=lambda: jobs.active_counts().get('notifications', 0))
+metrics.gauge('mongodb_pool_connections_in_use', 'Connections checked out of the MongoDB pool',
+              callback=lambda: sum(server['in_use'] for server in pool_monitor.snapshot()['servers'].values()))
+
+# Staff roster cache and load-balanced auto-assignment (per-process counters)
+roster = StaffRoster(reconcile_interval=app.config['ROSTER_RECONCILE_SECONDS'])
+assigner = AssignmentEngine()
 
 # Create necessary directories
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 # Create reports and exports folders if they don't exist
-reports_folder = os.path.join('static', 'reports')
-exports_folder = os.path.join('static', 'exports')
-os.makedirs(reports_folder, exist_ok=True)
-os.makedirs(exports_folder, exist_ok=True)
+os.makedirs(app.config['REPORTS_FOLDER'], exist_ok=True)
+os.makedirs(app.config['EXPORTS_FOLDER'], exist_ok=True)
+os.makedirs(app.config['IMPORTS_FOLDER'], exist_ok=True)
+
+@app.cli.command('precompress-static')
+def precompress_static_command():
+    """Write .gz/.br variants of static CSS/JS files (run at build time)"""
+    written = precompress_static(app.static_folder)
+    print(f"✓ Wrote {written} precompressed static files")
+
+@app.cli.command('import-complaints')
+@click.argument('path')
+@click.option('--user-email', default='admin@municipal.gov', help='Owner for rows without user_id/user_email')
+@click.option('--batch-size', default=None, type=int, help='Rows per insert_many batch')
+@click.option('--resume', is_flag=True, help='Continue from the last checkpoint of a previous run')
+def import_complaints_command(path, user_email, batch_size, resume):
+    """Bulk import complaints from a CSV or JSONL file"""
+    if not database_ready():
+        print("✗ Database connection not available")
+        return
+    owner = users_db.users.find_one({'email': user_email.lower()})
+    if not owner:
+        print(f"✗ User not found: {user_email}")
+        return
+    # The unique complaint_id index that rejects re-imported rows is part of the schema
+    initialize_database()
+    print(f"📥 Importing complaints from {path}...")
+    result = run_import(ConsoleContext(), path, get_category_collection, users_db.users, app.config,
+                        owner['_id'], batch_size or app.config['IMPORT_BATCH_SIZE'], resume)
+    print(f"✓ Inserted: {result['inserted']}, duplicates: {result['duplicates']}, "
+          f"errors: {result['errors']}, skipped (already imported): {result['skipped']}")
+    if result['errors']:
+        print(f"  Row errors written to {path}.errors.csv")
+
+@app.cli.command('import-wards')
+@click.argument('path')
+@click.option('--name-property', default='name', help='Feature property holding the ward name')
+def import_wards_command(path, name_property):
+    """Load ward boundaries from a GeoJSON FeatureCollection (for within-ward queries)"""
+    if not database_ready():
+        print("✗ Database connection not available")
+        return
+    try:
+        wards = read_wards(path, name_property)
+    except (OSError, ValueError) as e:
+        print(f"✗ Could not read wards: {e}")
+        return
+    ensure_geo_indexes([], complaints_db.wards)
+    for ward in wards:
+        complaints_db.wards.update_one({'name': ward['name']}, {'$set': ward}, upsert=True)
+    print(f"✓ Loaded {len(wards)} ward(s)")
+
+@app.cli.command('train-classifier')
+@click.option('--output', default=None, help='Model file (defaults to CLASSIFIER_MODEL_PATH)')
+@click.option('--epochs', default=150, type=int, help='Training passes over the data')
+def train_classifier_command(output, epochs):
+    """Train the category/priority classifier from historical complaints and admin corrections"""
+    if not database_ready():
+        print("✗ Database connection not available")
+        return
+    if not classifier_available():
+        print("✗ NumPy is required to train the classifier (pip install numpy)")
+        return
+    corrected = set(complaints_db.classification_feedback.distinct('complaint_oid'))
+    weight = app.config['CLASSIFIER_CORRECTION_WEIGHT']
+    samples = []
+    for category in app.config['COMPLAINT_CATEGORIES']:
+        # Merged duplicates would only repeat their parent's text
+        for doc in get_category_collection(category).find({'duplicate_of': None}, TRAINING_PROJECTION):
+            samples.append((doc.get('description'), doc.get('location'), doc.get('category') or category,
+                            doc.get('priority'), weight if doc['_id'] in corrected else 1.0))
+    print(f"🧠 Training on {len(samples)} complaints ({len(corrected)} corrected by admins)...")
+    try:
+        model, accuracy = ComplaintClassifier.train(samples, epochs=epochs)
+    except ValueError as e:
+        print(f"✗ {e}")
+        return
+    path = output or app.config['CLASSIFIER_MODEL_PATH']
+    model.save(path)
+    for head, value in accuracy.items():
+        print(f"  {head} accuracy on held-out complaints: {value:.1%}")
+    print(f"✓ Model saved to {path} ({model.metadata['features']} features); restart the app to load it")
+
+@app.cli.command('classify-complaints')
+@click.option('--all', 'include_closed', is_flag=True, help='Also re-score resolved and closed complaints')
+@click.option('--batch-size', default=1000, type=int, help='Complaints scored per bulk write')
+def classify_complaints_command(include_closed, batch_size):
+    """Re-score the backlog with the current classifier (e.g. after retraining)"""
+    if not database_ready():
+        print("✗ Database connection not available")
+        return
+    model = classifier.get()
+    if model is None:
+        print(f"✗ No classifier model at {app.config['CLASSIFIER_MODEL_PATH']} (run 'flask train-classifier')")
+        return
+    query = {} if include_closed else {'status': {'$in': get_open_statuses()}}
+    total = 0
+    for category in app.config['COMPLAINT_CATEGORIES']:
+        scored = rescore_collection(model, get_category_collection(category), query, batch_size)
+        if scored:
+            print(f"  {category}: {scored}")
+        total += scored
+    print(f"✓ Re-scored {total} complaint(s)")
+
+@app.cli.command('rescan-keywords')
+@click.option('--batch-size', default=500, type=int, help='Complaints updated per bulk write')
+def rescan_keywords_command(batch_size):
+    """Rescan open complaints against ESCALATION_KEYWORDS (run after changing the list)"""
+    if not database_ready():
+        print("✗ Database connection not available")
+        return
+    print(f"🔎 Scanning open complaints for {len(escalation_matcher)} keyword(s)...")
+    escalated = []
+    for category in app.config['COMPLAINT_CATEGORIES']:
+        escalated.extend(rescan_collection(escalation_matcher, get_category_collection(category),
+                                           {'status': {'$in': get_open_statuses()}},
+                                           app.config['PRIORITY_LEVELS'], batch_size))
+    for complaint, update_set in escalated:
+        track_deadline(complaint, update_set)
+    log_activities([(complaint['_id'], 'auto_escalated', None,
+                     {'keywords': update_set['escalation_keywords'], 'priority_from': complaint.get('priority'),
+                      'priority_to': update_set['priority']})
+                    for complaint, update_set in escalated])
+    print(f"✓ Escalated {len(escalated)} complaint(s)")
+
+@app.cli.command('sla-sweep')
+def sla_sweep_command():
+    """Flag and escalate complaints that breached their SLA (for cron-driven deployments)"""
+    if not database_ready():
+        print("✗ Database connection not available")
+        return
+    breached = run_sla_sweep(use_lease=False)
+    print(f"✓ {len(breached)} complaint(s) newly breached their SLA")
 
 # Database Initialization Function
-def initialize_database():
-    """Initialize MongoDB databases and collections"""
+SCHEMA_VERSION = 3  # Bump whenever initialize_database gains collections or indexes
+
+def initialize_database(force=False):
+    """
+    Create collections and indexes once per schema version
+    With an up-to-date schema a boot costs a single find_one, whatever the data volume
+    """
     if complaints_db is None or users_db is None:
-        print("⚠️  Cannot initialize databases - connection not available")
+        logger.warning("Cannot initialize databases - connection not available")
         return
     
     try:
-        # Initialize activity_logs collection (create if doesn't exist)
-        if 'activity_logs' not in complaints_db.list_collection_names():
-            complaints_db.activity_logs.insert_one({
-                'initialized': datetime.utcnow(),
-                'type': 'initialization'
-            })
-            # Remove the initialization document
-            complaints_db.activity_logs.delete_one({'type': 'initialization'})
-            print("✓ Activity logs collection initialized")
+        schema = complaints_db.app_meta.find_one({'_id': 'schema'}) or {}
+        if not force and schema.get('version', 0) >= SCHEMA_VERSION:
+            logger.info("Database schema v%s up to date", schema['version'])
+            return
+        
+        # Indexes create their collections, so no placeholder documents are needed
+        collections = [get_category_collection(category) for category in app.config['COMPLAINT_CATEGORIES']]
+        
+        # Every step runs (each helper logs its own failures); the version is only
+        # recorded when all succeeded, so a failed index is retried on the next start
+        steps = [
+            # Indexes used by the SLA sweeper and the breach counts on dashboards
+            ('SLA', ensure_sla_indexes(collections)),
+            # Index and tombstones behind the staff delta-sync API
+            ('Sync', ensure_sync_indexes(collections, complaints_db.sync_tombstones,
+                                         app.config['SYNC_TOMBSTONE_DAYS'])),
+            ('Duplicate detection', ensure_duplicate_indexes(collections)),
+            ('Geospatial', ensure_geo_indexes(collections, complaints_db.wards)),
+            # Unique complaint IDs (re-imported rows are rejected as duplicates)
+            ('Complaint ID', ensure_import_indexes(collections)),
+            # Newest updated_at per collection (report cache key, live polling)
+            ('Report', ensure_report_indexes(collections))
+        ]
+        failed = [name for name, ok in steps if not ok]
+        if failed:
+            logger.warning("Database schema v%s incomplete (%s indexes failed); retried on next start",
+                           SCHEMA_VERSION, ', '.join(failed))
+            return
+        logger.info("SLA, sync, duplicate detection, geospatial, complaint ID and report indexes ready")
+        
+        complaints_db.app_meta.update_one(
+            {'_id': 'schema'},
+            {'$set': {'version': SCHEMA_VERSION, 'updated_at': datetime.utcnow()}},
+            upsert=True
+        )
+        logger.info("Database schema v%s ready", SCHEMA_VERSION)
         
-        # Initialize category collections (create if don't exist)
-        for category in app.config['COMPLAINT_CATEGORIES']:
-            collection_name = get_category_collection_name(category)
-            collection = get_category_collection(category)
-            if collection is not None:
-                # Check if collection exists by trying to count
-                try:
-                    collection.count_documents({})
-                    print(f"✓ Collection '{collection_name}' ready")
-                except:
-                    # Collection doesn't exist, create it by inserting a temp doc
-                    temp_doc = {
-                        'initialized': datetime.utcnow(),
-                        'type': 'initialization',
-                        'category': category
-                    }
-                    collection.insert_one(temp_doc)
-                    collection.delete_one({'type': 'initialization'})
-                    print(f"✓ Collection '{collection_name}' created")
-        
-        # Print database structure
-        print("\n" + "="*60)
-        print("DATABASE STRUCTURE")
-        print("="*60)
-        print(f"\n📊 Complaints Database: {app.config['COMPLAINTS_DATABASE_NAME']}")
-        collections_list = complaints_db.list_collection_names()
+    except Exception as e:
+        logger.exception("Error initializing databases: %s", e)
+
+@app.cli.command('init-db')
+@click.option('--force', is_flag=True, help='Re-check indexes even if the stored schema version is current')
+def init_db_command(force):
+    """Create collections and indexes for the current schema version"""
+    if not database_ready():
+        print("✗ Database connection not available")
+        return
+    initialize_database(force=force)
+    ensure_default_admin()
+
+@app.cli.command('db-stats')
+def db_stats_command():
+    """Print collections and document counts for both databases"""
+    if not database_ready():
+        print("✗ Database connection not available")
+        return
+    print("\n" + "="*60)
+    print("DATABASE STRUCTURE")
+    print("="*60)
+    for label, database in ((f"📊 Complaints Database: {app.config['COMPLAINTS_DATABASE_NAME']}", complaints_db),
+                            (f"👥 Users Database: {app.config['USERS_DATABASE_NAME']}", users_db)):
+        print(f"\n{label}")
+        collections_list = database.list_collection_names()
         if collections_list:
             print(f"   Collections ({len(collections_list)}):")
             for coll_name in sorted(collections_list):
-                count = complaints_db[coll_name].count_documents({})
+                # Metadata count: no collection scan
+                count = database[coll_name].estimated_document_count()
                 print(f"   - {coll_name}: {count} documents")
         else:
             print("   ⚠️  No collections found (collections will be created when first complaint is saved)")
-        
-        print(f"\n👥 Users Database: {app.config['USERS_DATABASE_NAME']}")
-        users_collections = users_db.list_collection_names()
-        if users_collections:
-            print(f"   Collections ({len(users_collections)}):")
-            for coll_name in sorted(users_collections):
-                count = users_db[coll_name].count_documents({})
-                print(f"   - {coll_name}: {count} documents")
-        else:
-            print("   ⚠️  No collections found")
-        
-        print("="*60 + "\n")
-        
-    except Exception as e:
-        print(f"⚠️  Error initializing databases: {e}")
-        import traceback
-        traceback.print_exc()
+    schema = complaints_db.app_meta.find_one({'_id': 'schema'}) or {}
+    print(f"\n🔧 Schema version: {schema.get('version', 'not initialized')} (code expects v{SCHEMA_VERSION})")
+    print("="*60 + "\n")
 
 # JSON Encoder for ObjectId
 class JSONEncoder(json.JSONEncoder):
@@ -165,12 +581,28 @@ def status_color_filter(value):
 def priority_color_filter(value):
     return get_priority_color(value)
 
+@app.template_filter('upload_url')
+def upload_url_filter(value):
+    return storage.url_for(value)
+
 # Helper Functions
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
+def save_upload(file, prefix=''):
+    """Save an uploaded file through the storage backend and return its stored path"""
+    filename = secure_filename(file.filename)
+    timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+    filename = f"{prefix}{timestamp}_{filename}"
+    path = storage.put(filename, file.stream, file.mimetype)
+    try:
+        upload_bytes.inc(prefix.rstrip('_') or 'photo', amount=file.stream.tell())  # put() read to the end
+    except (OSError, ValueError):
+        pass
+    return path
+
 def get_category_collection_name(category):
     """Convert category name to a valid MongoDB collection name"""
     # Replace spaces and special characters with underscores, lowercase
@@ -185,17 +617,17 @@ def get_category_collection(category):
     collection_name = get_category_collection_name(category)
     return complaints_db[collection_name]
 
-def get_complaint_from_all_collections(complaint_id):
+def get_complaint_from_all_collections(complaint_id, projection=None):
     """Search for a complaint across all category collections by ID"""
     if complaints_db is None:
-        print("ERROR: complaints_db is None in get_complaint_from_all_collections")
+        logger.error("complaints_db is None in get_complaint_from_all_collections")
         return None, None
     
     if not complaint_id:
-        print("ERROR: complaint_id is empty")
+        logger.error("complaint_id is empty")
         return None, None
     
-    print(f"DEBUG: Searching for complaint with ID: {complaint_id}")
+    logger.debug("Searching for complaint with ID: %s", complaint_id)
     
     # Try to find in all category collections
     for category in app.config['COMPLAINT_CATEGORIES']:
@@ -206,9 +638,9 @@ def get_complaint_from_all_collections(complaint_id):
             
             # Try by _id first (as ObjectId)
             try:
-                complaint = collection.find_one({'_id': ObjectId(complaint_id)})
+                complaint = collection.find_one({'_id': ObjectId(complaint_id)}, projection)
                 if complaint:
-                    print(f"DEBUG: Found complaint in collection '{collection.name}' by _id")
+                    logger.debug("Found complaint in collection '%s' by _id", collection.name)
                     return complaint, collection
             except Exception as e:
                 # If ObjectId conversion fails, continue to try other methods
@@ -216,30 +648,61 @@ def get_complaint_from_all_collections(complaint_id):
             
             # Also try by complaint_id field (string match)
             try:
-                complaint = collection.find_one({'complaint_id': complaint_id})
+                complaint = collection.find_one({'complaint_id': complaint_id}, projection)
                 if complaint:
-                    print(f"DEBUG: Found complaint in collection '{collection.name}' by complaint_id field")
+                    logger.debug("Found complaint in collection '%s' by complaint_id field", collection.name)
                     return complaint, collection
             except Exception as e:
                 pass
             
             # Try as string _id if complaint_id was passed as string
             try:
-                complaint = collection.find_one({'_id': complaint_id})
+                complaint = collection.find_one({'_id': complaint_id}, projection)
                 if complaint:
-                    print(f"DEBUG: Found complaint in collection '{collection.name}' by _id (string)")
+                    logger.debug("Found complaint in collection '%s' by _id (string)", collection.name)
                     return complaint, collection
             except:
                 pass
                 
         except Exception as e:
-            print(f"Error searching collection {category}: {e}")
+            logger.error("Error searching collection %s: %s", category, e)
             continue
     
-    print(f"DEBUG: Complaint not found in any collection for ID: {complaint_id}")
+    logger.debug("Complaint not found in any collection for ID: %s", complaint_id)
     return None, None
 
-def query_all_category_collections(query, sort=None, skip=0, limit=None):
+def find_complaints_by_ids(complaint_ids, projection=None):
+    """
+    Locate many complaints at once (one $in query per category collection)
+    Returns a list of (complaint, collection) pairs
+    """
+    if complaints_db is None:
+        return []
+    
+    object_ids = []
+    for complaint_id in complaint_ids:
+        try:
+            object_ids.append(ObjectId(complaint_id))
+        except Exception:
+            continue
+    if not object_ids:
+        return []
+    
+    found = []
+    for category in app.config['COMPLAINT_CATEGORIES']:
+        collection = get_category_collection(category)
+        if collection is None:
+            continue
+        try:
+            for complaint in collection.find({'_id': {'$in': object_ids}}, projection):
+                found.append((complaint, collection))
+        except Exception as e:
+            logger.error("Error searching collection %s: %s", category, e)
+        if len(found) == len(object_ids):
+            break
+    return found
+
+def query_all_category_collections(query, sort=None, skip=0, limit=None, projection=None):
     """Query across all category collections and combine results"""
     if complaints_db is None:
         return []
@@ -250,13 +713,16 @@ def query_all_category_collections(query, sort=None, skip=0, limit=None):
             collection = get_category_collection(category)
             if collection is None:
                 continue
-            cursor = collection.find(query)
+            cursor = collection.find(query, projection)
             if sort:
                 cursor = cursor.sort(sort[0], sort[1] if len(sort) > 1 else 1)
+                # Each collection can contribute at most skip + limit rows to the merged page
+                if limit:
+                    cursor = cursor.limit(skip + limit)
             results = list(cursor)
             all_results.extend(results)
         except Exception as e:
-            print(f"Error querying collection {category}: {e}")
+            logger.error("Error querying collection %s: %s", category, e)
             continue
     
     # Sort all results if sort is provided
@@ -286,11 +752,29 @@ def count_all_category_collections(query):
                 continue
             total += collection.count_documents(query)
         except Exception as e:
-            print(f"Error counting collection {category}: {e}")
+            logger.error("Error counting collection %s: %s", category, e)
             continue
     
     return total
 
+def build_admin_complaint_query(args):
+    """Build the complaint filter used by the admin list and exports (category excluded)"""
+    query = {}
+    status = args.get('status', '')
+    priority = args.get('priority', '')
+    search = args.get('search', '')
+    if status:
+        query['status'] = status
+    if priority:
+        query['priority'] = priority
+    if search:
+        query['$or'] = [
+            {'complaint_id': {'$regex': search, '$options': 'i'}},
+            {'location': {'$regex': search, '$options': 'i'}},
+            {'description': {'$regex': search, '$options': 'i'}}
+        ]
+    return query
+
 def log_activity(complaint_id, action, user_id, details=None):
     """Log activity for audit trail"""
     if complaints_db is None:
@@ -307,7 +791,284 @@ def log_activity(complaint_id, action, user_id, details=None):
         }
         complaints_db.activity_logs.insert_one(activity)
     except Exception as e:
-        print(f"Error logging activity: {e}")
+        logger.error("Error logging activity: %s", e)
+
+def log_activities(entries):
+    """Log several activities with a single insert_many"""
+    if complaints_db is None or not entries:
+        return
+    
+    try:
+        now = datetime.utcnow()
+        ip_address = request.remote_addr if request else 'N/A'
+        activities = [{
+            'complaint_id': ObjectId(complaint_id) if isinstance(complaint_id, str) else complaint_id,
+            'action': action,
+            'user_id': ObjectId(user_id) if isinstance(user_id, str) else user_id,
+            'details': details or {},
+            'timestamp': now,
+            'ip_address': ip_address
+        } for complaint_id, action, user_id, details in entries]
+        complaints_db.activity_logs.insert_many(activities, ordered=False)
+    except Exception as e:
+        logger.error("Error logging activities: %s", e)
+
+def get_roster():
+    """Staff roster, reconciled with the database when stale"""
+    stale = roster.needs_reload()
+    cache_lookups.inc('staff_roster', 'miss' if stale else 'hit')
+    if stale and complaints_db is not None and users_db is not None:
+        try:
+            roster.load(users_db.users,
+                        [get_category_collection(category) for category in app.config['COMPLAINT_CATEGORIES']])
+            assigner.rebuild(roster.workloads())
+        except Exception as e:
+            logger.error("Error loading staff roster: %s", e)
+    return roster
+
+def get_assigner():
+    """Assignment engine, seeded from the staff roster"""
+    get_roster()
+    return assigner
+
+def track_workload(old_assigned, old_status, new_assigned, new_status):
+    """Keep roster and workload counters in step with an assignment or status change"""
+    try:
+        roster.track(old_assigned, old_status, new_assigned, new_status)
+        assigner.track(old_assigned, old_status, new_assigned, new_status)
+    except Exception as e:
+        logger.error("Error updating staff workload: %s", e)
+
+def track_reassignments(moves):
+    """Record (complaint_oid, old_assigned, new_assigned) moves so the previous assignee's sync drops them"""
+    if complaints_db is None:
+        return
+    try:
+        record_reassignments(complaints_db.sync_tombstones, moves)
+    except Exception as e:
+        logger.error("Error recording reassignment tombstones: %s", e)
+
+def queue_assignment_emails(assignments):
+    """Queue 'complaint assigned' emails for (complaint, staff_id) pairs as one background job"""
+    if users_db is None or not assignments:
+        return
+    
+    try:
+        staff_ids = list({ObjectId(staff_id) for _, staff_id in assignments})
+        staff_by_id = {str(staff['_id']): staff
+                       for staff in users_db.users.find({'_id': {'$in': staff_ids}}, {'name': 1, 'email': 1})}
+        notifications = []
+        for complaint, staff_id in assignments:
+            staff = staff_by_id.get(str(staff_id))
+            if not staff:
+                continue
+            notifications.append({
+                'type': 'assigned',
+                'email': staff.get('email', ''),
+                'name': staff.get('name', 'Worker'),
+                'complaint_id': complaint.get('complaint_id', str(complaint.get('_id'))),
+                'category': complaint.get('category', ''),
+                'location': complaint.get('location', '')
+            })
+        if notifications:
+            from utils.email_service import send_notifications_batch
+            jobs.submit('notifications', send_notifications_batch, params={'count': len(notifications)},
+                        user_id=session.get('user_id'), app=app, notifications=notifications)
+    except Exception as e:
+        logger.error("Error queueing assignment emails: %s", e)
+
+def run_sla_sweep(use_lease=True):
+    """Flag newly breached complaints, escalate their priority and notify departments"""
+    if complaints_db is None:
+        return []
+    # Several app processes may run the sweeper; only one sweeps per interval
+    if use_lease and not acquire_lease(complaints_db.locks, 'sla_sweep', max(app.config['SLA_SWEEP_INTERVAL'] - 1, 1)):
+        return []
+    
+    breached = sweep_sla_breaches(
+        [get_category_collection(category) for category in app.config['COMPLAINT_CATEGORIES']],
+        complaints_db.activity_logs,
+        get_open_statuses(),
+        app.config['PRIORITY_LEVELS'],
+        escalate=app.config['SLA_ESCALATE_PRIORITY']
+    )
+    if breached:
+        logger.info("SLA sweep: %s complaint(s) breached their SLA", len(breached))
+        if app.config['SLA_NOTIFY_DEPARTMENT']:
+            notifications = [dict(digest, type='sla_digest')
+                             for digest in group_by_department(breached, app.config['DEPARTMENTS'])]
+            if notifications:
+                from utils.email_service import send_notifications_batch
+                jobs.submit('notifications', send_notifications_batch, params={'count': len(notifications)},
+                            app=app, notifications=notifications)
+    return breached
+
+# Periodic SLA sweeper (started with the server)
+sla_sweeper = PeriodicTask('sla-sweeper', run_sla_sweep, app.config['SLA_SWEEP_INTERVAL'])
+
+def get_open_statuses():
+    return [status for status in app.config['STATUS_OPTIONS'] if status not in CLOSED_STATUSES]
+
+def send_sla_warning(entry, hours):
+    """
+    Deadline scheduler callback: warn the assignee (or the department) once per threshold
+    The entry may be stale (another worker reassigned the complaint or moved its deadline),
+    so the alert is claimed only if the deadline still matches, and goes to the current assignee
+    """
+    collection = get_category_collection(entry.get('category', ''))
+    if collection is None:
+        return
+    # Recorded on the complaint so other processes and restarts don't warn again; the version
+    # bump changes the track page ETag, whose timeline shows the warning
+    complaint = collection.find_one_and_update(
+        {'_id': ObjectId(entry['_id']), 'sla_deadline': entry['sla_deadline'], 'sla_alerts_sent': {'$ne': hours},
+         'status': {'$in': get_open_statuses()}},
+        {'$addToSet': {'sla_alerts_sent': hours}, '$inc': {'version': 1}},
+        projection=DEADLINE_PROJECTION,
+        return_document=ReturnDocument.AFTER
+    )
+    if complaint is None:
+        refresh_deadline(entry)
+        return
+    
+    recipient = get_roster().get(complaint['assigned_to']) if complaint.get('assigned_to') else None
+    if not recipient:
+        department = next((info for info in app.config['DEPARTMENTS'].values()
+                           if info.get('code') == complaint.get('department_code')), None)
+        recipient = {'email': department.get('email'), 'name': department.get('name')} if department else None
+    if not recipient or not recipient.get('email'):
+        return
+    
+    log_activity(entry['_id'], 'sla_warning', None, {'hours': hours, 'sla_deadline': complaint.get('sla_deadline')})
+    from utils.email_service import send_notifications_batch
+    jobs.submit('notifications', send_notifications_batch, params={'count': 1}, app=app, notifications=[{
+        'type': 'sla_warning',
+        'email': recipient['email'],
+        'name': recipient.get('name', 'Team'),
+        'complaint_id': complaint.get('complaint_id') or entry['_id'],
+        'category': complaint.get('category', ''),
+        'location': complaint.get('location', ''),
+        'hours': hours
+    }])
+
+def refresh_deadline(entry):
+    """Re-read a complaint whose cached deadline entry no longer matches (changed by another worker)"""
+    complaint, _ = get_complaint_from_all_collections(entry['_id'], projection=dict(DEADLINE_PROJECTION, status=1))
+    if complaint is None or not is_open(complaint.get('status')):
+        deadlines.remove(entry['_id'])
+    elif complaint.get('sla_deadline') != entry.get('sla_deadline') or \
+            str(complaint.get('assigned_to') or '') != str(entry.get('assigned_to') or ''):
+        deadlines.upsert(complaint)
+
+# In-memory SLA deadline heap with "due in X hours" alerts (alert thread started with the server)
+deadlines = DeadlineScheduler(alert_hours=app.config['SLA_ALERT_HOURS'], on_alert=send_sla_warning)
+
+def get_deadlines():
+    """Deadline scheduler, loaded from the database on first use"""
+    if not deadlines.loaded and complaints_db is not None:
+        try:
+            deadlines.load([get_category_collection(category) for category in app.config['COMPLAINT_CATEGORIES']],
+                           get_open_statuses())
+        except Exception as e:
+            logger.error("Error loading SLA deadlines: %s", e)
+    return deadlines
+
+def track_deadline(complaint, changes=None):
+    """Keep the deadline scheduler and the duplicate index in step with a new or changed complaint"""
+    doc = dict(complaint, **(changes or {}))
+    if not is_open(doc.get('status')) and duplicates.loaded:
+        # Closed complaints are no longer merge targets
+        duplicates.remove(doc.get('category'), doc['_id'])
+    if not deadlines.loaded:
+        return
+    try:
+        if is_open(doc.get('status')):
+            deadlines.upsert(doc)
+        else:
+            deadlines.remove(doc['_id'])
+    except Exception as e:
+        logger.error("Error updating SLA deadline: %s", e)
+
+# Near-duplicate detection over recent complaints, per category
+duplicates = DuplicateIndex(window_hours=app.config['DUPLICATE_WINDOW_HOURS'],
+                            threshold=app.config['DUPLICATE_THRESHOLD'])
+
+def get_duplicate_index():
+    """Duplicate index, loaded from the database on first use"""
+    if not duplicates.loaded and complaints_db is not None:
+        try:
+            duplicates.load({category: get_category_collection(category)
+                             for category in app.config['COMPLAINT_CATEGORIES']})
+        except Exception as e:
+            logger.error("Error loading duplicate index: %s", e)
+    return duplicates
+
+def find_probable_duplicate(category, signature):
+    """Best (score, entry) match among recent complaints in the category, or None"""
+    try:
+        index = get_duplicate_index()
+        index.catch_up(category, get_category_collection(category))
+        matches = index.find(category, signature, limit=1)
+        return matches[0] if matches else None
+    except Exception as e:
+        logger.error("Error checking for duplicates: %s", e)
+        return None
+
+# Category/priority suggestions (model file loaded once per process, on first use)
+classifier = ClassifierHolder(app.config['CLASSIFIER_MODEL_PATH'])
+
+def suggest_classification(description, location):
+    """Predicted category and priority with confidences, or None without a model"""
+    if not app.config['CLASSIFIER_ENABLED']:
+        return None
+    model = classifier.get()
+    if model is None:
+        return None
+    try:
+        return model.predict(description, location)
+    except Exception as e:
+        logger.error("Error classifying complaint: %s", e)
+        return None
+
+def record_classification_corrections(corrections):
+    """Log admin category/priority changes as training labels; corrections are (complaint, field, value, admin_id)"""
+    if complaints_db is None:
+        return
+    now = datetime.utcnow()
+    docs = []
+    for complaint, field, value, admin_id in corrections:
+        if not value or value == complaint.get(field):
+            continue
+        docs.append({
+            'complaint_oid': complaint['_id'],
+            'complaint_id': complaint.get('complaint_id'),
+            'field': field,
+            'original': complaint.get(field),
+            'corrected': value,
+            'predicted': (complaint.get('classification') or {}).get(field),
+            'user_id': ObjectId(str(admin_id)),
+            'created_at': now
+        })
+    if docs:
+        try:
+            complaints_db.classification_feedback.insert_many(docs, ordered=False)
+        except Exception as e:
+            logger.error("Error recording classification corrections: %s", e)
+
+# Keyword escalation (automaton built once at startup)
+escalation_matcher = KeywordMatcher(app.config['ESCALATION_KEYWORDS'])
+
+# One change feed per process for live dashboards (started by the first subscriber)
+def create_live_feed():
+    if complaints_db is None:
+        return None
+    return ChangeFeed(complaints_db,
+                      [get_category_collection_name(category) for category in app.config['COMPLAINT_CATEGORIES']],
+                      poll_interval=app.config['LIVE_POLL_INTERVAL'],
+                      stats_interval=app.config['LIVE_STATS_INTERVAL'],
+                      max_subscribers=max(1, min(app.config['LIVE_MAX_SUBSCRIBERS'], app.config['SERVER_THREADS'] - 1)))
+
+live_feed = create_live_feed()
 
 # ==================== ROUTES ====================
 
@@ -366,6 +1127,7 @@ def register():
             return redirect(url_for('login'))
         
         # Hash password
+        import bcrypt  # Imported on first use to keep worker start-up fast
         password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
         
         # Create user
@@ -392,17 +1154,17 @@ def register():
             # Verify insertion was successful
             if not result.inserted_id:
                 flash('Registration failed. Please try again.', 'danger')
-                print("ERROR: User insertion failed - no inserted_id returned")
+                logger.error("User insertion failed - no inserted_id returned")
                 return render_template('register.html')
             
             # Verify user was actually saved
             saved_user = users_db.users.find_one({'_id': result.inserted_id})
             if not saved_user:
                 flash('Registration failed. Please try again.', 'danger')
-                print(f"ERROR: User with ID {result.inserted_id} not found after insertion")
+                logger.error("User with ID %s not found after insertion", result.inserted_id)
                 return render_template('register.html')
             
-            print(f"✓ User registered successfully: {email} (ID: {result.inserted_id})")
+            logger.info("User registered successfully: %s (ID: %s)", email, result.inserted_id)
             
             # Set session variables
             session['user_id'] = str(result.inserted_id)
@@ -414,10 +1176,7 @@ def register():
             return redirect(url_for('dashboard'))
             
         except Exception as e:
-            print(f"ERROR during user registration: {str(e)}")
-            print(f"Error type: {type(e).__name__}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error during user registration: %s", e)
             flash(f'Registration failed: {str(e)}. Please try again.', 'danger')
             return render_template('register.html')
     
@@ -442,19 +1201,20 @@ def login():
         user = users_db.users.find_one({'email': email})
         
         if not user:
-            print(f"LOGIN ERROR: User not found for email: {email}")
+            logger.warning("User not found for email: %s", email)
             flash('Invalid email or password', 'danger')
             return render_template('login.html')
         
         # Debug: Check user details
-        print(f"LOGIN: User found - Email: {user.get('email')}, Role: {user.get('role')}, Active: {user.get('is_active')}")
+        logger.debug("User found - Email: %s, Role: %s, Active: %s", user.get('email'), user.get('role'), user.get('is_active'))
         
         # Check password
         try:
+            import bcrypt
             password_match = bcrypt.checkpw(password.encode('utf-8'), user['password'])
-            print(f"LOGIN: Password match: {password_match}")
+            logger.debug("Password match: %s", password_match)
         except Exception as e:
-            print(f"LOGIN ERROR: Password check failed - {str(e)}")
+            logger.warning("Password check failed - %s", e)
             flash('Invalid email or password', 'danger')
             return render_template('login.html')
         
@@ -475,23 +1235,23 @@ def login():
             session['user_role'] = user_role
             session['user_email'] = user['email']
             
-            print(f"LOGIN SUCCESS: User {user.get('email')} logged in with role: {user_role}")
-            print(f"LOGIN: Session set - user_id: {session.get('user_id')}, role: {session.get('user_role')}")
+            logger.info("User %s logged in with role: %s", user.get('email'), user_role)
+            logger.debug("Session set - user_id: %s, role: %s", session.get('user_id'), session.get('user_role'))
             
             flash(f'Welcome back, {user["name"]}!', 'success')
             
             # Redirect based on role
             if user_role == 'admin':
-                print("LOGIN: Redirecting to admin_dashboard")
+                logger.debug("Redirecting to admin_dashboard")
                 return redirect(url_for('admin_dashboard'))
             elif user_role == 'staff':
-                print("LOGIN: Redirecting to staff_dashboard")
+                logger.debug("Redirecting to staff_dashboard")
                 return redirect(url_for('staff_dashboard'))
             else:
-                print("LOGIN: Redirecting to dashboard (citizen)")
+                logger.debug("Redirecting to dashboard (citizen)")
                 return redirect(url_for('dashboard'))
         else:
-            print(f"LOGIN ERROR: Password mismatch for user: {email}")
+            logger.warning("Password mismatch for user: %s", email)
             flash('Invalid email or password', 'danger')
     
     return render_template('login.html')
@@ -531,7 +1291,7 @@ def dashboard():
         category_collection = get_category_collection(category_filter)
         if category_collection is not None:
             total = category_collection.count_documents(query)
-            complaints = list(category_collection.find(query)
+            complaints = list(category_collection.find(query, get_projection('list_row'))
                              .sort('created_at', -1)
                              .skip((page - 1) * app.config['ITEMS_PER_PAGE'])
                              .limit(app.config['ITEMS_PER_PAGE']))
@@ -542,7 +1302,8 @@ def dashboard():
         # Query all category collections
         total = count_all_category_collections(query)
         skip = (page - 1) * app.config['ITEMS_PER_PAGE']
-        complaints = query_all_category_collections(query, sort=('created_at', -1), skip=skip, limit=app.config['ITEMS_PER_PAGE'])
+        complaints = query_all_category_collections(query, sort=('created_at', -1), skip=skip, limit=app.config['ITEMS_PER_PAGE'],
+                                                    projection=get_projection('list_row'))
     
     # Convert ObjectIds
     for complaint in complaints:
@@ -632,6 +1393,7 @@ def update_profile():
         }}
     )
     
+    roster.update_member(session['user_id'], {'name': name, 'phone': phone})
     session['user_name'] = name
     flash('Profile updated successfully', 'success')
     return redirect(url_for('profile'))
@@ -640,133 +1402,131 @@ def update_profile():
 @login_required
 def submit_complaint():
     """Submit a new complaint"""
-    print("\n" + "="*70)
-    print("DEBUG: ===== COMPLAINT SUBMISSION STARTED =====")
-    print("="*70)
-    print(f"DEBUG: Request method: {request.method}")
-    print(f"DEBUG: Request URL: {request.url}")
-    print(f"DEBUG: Request endpoint: {request.endpoint}")
-    
     if request.method == 'POST':
-        print("DEBUG: POST request received - processing complaint submission")
-        print(f"DEBUG: User ID from session: {session.get('user_id')}")
-        print(f"DEBUG: User role: {session.get('user_role')}")
-        
         if complaints_db is None or users_db is None:
-            print("ERROR: Database connections are None!")
-            print(f"  - complaints_db: {complaints_db}")
-            print(f"  - users_db: {users_db}")
+            logger.error("Complaint submission without a database connection")
             flash('Database connection error', 'danger')
             return render_template('submit_complaint.html', categories=app.config['COMPLAINT_CATEGORIES'])
         
-        print("DEBUG: Database connections OK")
-        
-        # Get form data with detailed logging
-        print("\nDEBUG: --- Extracting Form Data ---")
+        # Get form data
         category = request.form.get('category', '').strip()
         location = request.form.get('location', '').strip()
         description = request.form.get('description', '').strip()
         priority = request.form.get('priority', 'Normal').strip()
         is_urgent = request.form.get('is_urgent', '').lower() in ['true', 'on', '1']
+        latitude = request.form.get('latitude', '').strip()
+        longitude = request.form.get('longitude', '').strip()
         
-        print(f"DEBUG: Category: '{category}'")
-        print(f"DEBUG: Location: '{location}'")
-        print(f"DEBUG: Description length: {len(description)} characters")
-        print(f"DEBUG: Description preview: '{description[:100]}...' if len(description) > 100 else description")
-        print(f"DEBUG: Priority: '{priority}'")
-        print(f"DEBUG: Is urgent: {is_urgent}")
-        print(f"DEBUG: All form keys: {list(request.form.keys())}")
-        print(f"DEBUG: Files in request: {list(request.files.keys())}")
+        logger.debug("Complaint submission: category=%r location=%r priority=%r urgent=%s description=%s chars",
+                     category, location, priority, is_urgent, len(description))
         
         # Validate required fields
-        print("\nDEBUG: --- Validating Form Data ---")
         if not all([category, location, description]):
-            print("ERROR: Missing required fields!")
-            print(f"  - Category present: {bool(category)}")
-            print(f"  - Location present: {bool(location)}")
-            print(f"  - Description present: {bool(description)}")
+            logger.info("Complaint rejected: missing required fields")
             flash('Category, location, and description are required', 'danger')
             return render_template('submit_complaint.html', categories=app.config['COMPLAINT_CATEGORIES'])
-        print("DEBUG: All required fields present")
         
         if len(description) < 10:
-            print(f"ERROR: Description too short: {len(description)} characters")
+            logger.info("Complaint rejected: description too short (%s characters)", len(description))
             flash('Description must be at least 10 characters long', 'danger')
             return render_template('submit_complaint.html', categories=app.config['COMPLAINT_CATEGORIES'])
-        print(f"DEBUG: Description length OK: {len(description)} characters")
         
         # Validate category
-        print(f"DEBUG: Validating category '{category}' against: {app.config['COMPLAINT_CATEGORIES']}")
         if category not in app.config['COMPLAINT_CATEGORIES']:
-            print(f"ERROR: Invalid category '{category}'")
+            logger.info("Complaint rejected: invalid category %r", category)
             flash('Invalid category selected', 'danger')
             return render_template('submit_complaint.html', categories=app.config['COMPLAINT_CATEGORIES'])
-        print(f"DEBUG: Category validation passed")
         
         # Validate priority
         if priority not in app.config['PRIORITY_LEVELS']:
-            print(f"DEBUG: Invalid priority '{priority}', defaulting to 'Normal'")
+            logger.debug("Invalid priority '%s', defaulting to 'Normal'", priority)
             priority = 'Normal'
-        print(f"DEBUG: Final priority: '{priority}'")
+        
+        # Suggested category/priority; confident suggestions re-route 'Other' and raise (never lower) priority
+        classification = suggest_classification(description, location)
+        if classification:
+            classification['submitted_category'] = category
+            classification['submitted_priority'] = priority
+            threshold = app.config['CLASSIFIER_AUTO_APPLY_CONFIDENCE']
+            levels = app.config['PRIORITY_LEVELS']
+            suggested_category = classification.get('category')
+            suggested_priority = classification.get('priority')
+            if (category == 'Other' and suggested_category in app.config['COMPLAINT_CATEGORIES']
+                    and suggested_category != 'Other' and classification['category_confidence'] >= threshold):
+                category = suggested_category
+            if (suggested_priority in levels and levels[suggested_priority]['days'] < levels[priority]['days']
+                    and classification['priority_confidence'] >= threshold):
+                priority = suggested_priority
+            logger.debug("Classifier suggestion: %s", classification)
+        
+        # Hazard keywords in the description raise the priority (one pass over the text)
+        escalation_keywords = escalation_matcher.scan(description)
+        escalated_from = None
+        escalated_priority = escalation_matcher.escalation(escalation_keywords, app.config['PRIORITY_LEVELS'])
+        if escalated_priority and is_more_severe(escalated_priority, 'Urgent' if is_urgent else priority,
+                                                 app.config['PRIORITY_LEVELS']):
+            escalated_from = priority
+            priority = escalated_priority
+            is_urgent = is_urgent or priority == 'Urgent'
+            logger.debug("Escalated to %s for keywords %s", priority, escalation_keywords)
         
         # Handle file upload
-        print("\nDEBUG: --- Processing File Upload ---")
         photo_path = None
         if 'photo' in request.files:
-            print("DEBUG: Photo field found in request.files")
             file = request.files['photo']
-            print(f"DEBUG: File object: {file}")
-            print(f"DEBUG: Filename: {file.filename}")
             if file and file.filename and allowed_file(file.filename):
-                print(f"DEBUG: File is valid, processing...")
-                filename = secure_filename(file.filename)
-                timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-                filename = f"{timestamp}_{filename}"
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                print(f"DEBUG: Saving file to: {filepath}")
-                file.save(filepath)
-                photo_path = f"uploads/{filename}"
-                print(f"DEBUG: File saved successfully: {photo_path}")
+                photo_path = save_upload(file)
+                logger.debug("Photo saved: %s", photo_path)
             else:
-                print(f"DEBUG: File upload skipped or invalid")
-        else:
-            print("DEBUG: No photo field in request")
+                logger.debug("Photo upload skipped or invalid: %r", file.filename)
         
         # Assign department based on category
-        print("\nDEBUG: --- Preparing Complaint Document ---")
         department_info = app.config['DEPARTMENTS'].get(category, app.config['DEPARTMENTS'].get('Other', {'name': 'General Department', 'code': 'GEN'}))
-        print(f"DEBUG: Department assigned: {department_info.get('name')} ({department_info.get('code')})")
         
         # Generate complaint ID
         complaint_id = generate_complaint_id()
-        print(f"DEBUG: Generated complaint ID: {complaint_id}")
         
         # Set final priority (urgent overrides)
         final_priority = 'Urgent' if is_urgent else priority
-        print(f"DEBUG: Final priority: {final_priority} (urgent={is_urgent}, original={priority})")
+        logger.debug("Final priority: %s (urgent=%s, original=%s)", final_priority, is_urgent, priority)
         
         # Calculate SLA deadline
         created_at = datetime.utcnow()
         sla_deadline = calculate_sla_deadline(final_priority, created_at)
-        print(f"DEBUG: Created at: {created_at}")
-        print(f"DEBUG: SLA deadline: {sla_deadline}")
+        
+        # Auto-assign to the least-loaded staff member (department staff preferred)
+        auto_assigned_to = None
+        if app.config['AUTO_ASSIGN_ENABLED']:
+            auto_assigned_to = get_assigner().choose(department_info.get('code', 'GEN'),
+                                                     affinity=app.config['AUTO_ASSIGN_DEPARTMENT_AFFINITY'],
+                                                     slack=app.config['AUTO_ASSIGN_AFFINITY_SLACK'])
+            logger.debug("Auto-assigned to: %s", auto_assigned_to)
+        
+        # Near-duplicate check against recent complaints in the same category
+        signature = None
+        duplicate = None
+        if app.config['DUPLICATE_DETECTION_ENABLED']:
+            signature = minhash_signature(description, location)
+            duplicate = find_probable_duplicate(category, signature)
+            if duplicate:
+                logger.debug("Probable duplicate of %s (score %.2f)", duplicate[1].get('complaint_id'), duplicate[0])
         
         # Create complaint document
-        print("\nDEBUG: Creating complaint document structure...")
         complaint_doc = {
             'complaint_id': complaint_id,
             'user_id': ObjectId(session['user_id']),
             'category': category,
             'location': location,
             'description': description,
-            'status': 'Pending',
+            'status': 'Acknowledged' if auto_assigned_to else 'Pending',
             'priority': final_priority,
             'is_urgent': is_urgent,
             'department': department_info.get('name', 'General Department'),
             'department_code': department_info.get('code', 'GEN'),
-            'assigned_to': None,
+            'assigned_to': ObjectId(auto_assigned_to) if auto_assigned_to else None,
             'created_at': created_at,
             'updated_at': created_at,
+            'version': 1,  # Incremented on every update, used for ETags
             'sla_deadline': sla_deadline,
             'sla_breached': False,
             'comments': [],
@@ -780,104 +1540,98 @@ def submit_complaint():
             complaint_doc['image_path'] = photo_path
             complaint_doc['photo'] = photo_path
         
+        if auto_assigned_to:
+            complaint_doc['assigned_at'] = created_at
+            complaint_doc['auto_assigned'] = True
+        if signature:
+            complaint_doc['minhash'] = signature
+        if classification:
+            complaint_doc['classification'] = classification
+        if escalation_keywords:
+            complaint_doc['escalation_keywords'] = escalation_keywords
+        if escalated_from:
+            complaint_doc['escalated_from'] = escalated_from
+            complaint_doc['escalated_at'] = created_at
+        if latitude and longitude:
+            # Optional coordinates: a bad value drops them rather than the complaint
+            try:
+                complaint_doc['geo'] = parse_point(latitude, longitude)
+                complaint_doc['geohash'] = geohash_encode(float(latitude), float(longitude))
+            except ValueError as e:
+                logger.debug("Ignoring invalid coordinates (%s, %s): %s", latitude, longitude, e)
+        if duplicate:
+            complaint_doc['possible_duplicate_of'] = ObjectId(duplicate[1]['_id'])
+            complaint_doc['duplicate_score'] = round(duplicate[0], 2)
+        
         # Insert complaint into category-specific collection
-        print("\nDEBUG: --- Database Insertion Started ---")
-        print(f"DEBUG: Database name: {app.config['COMPLAINTS_DATABASE_NAME']}")
-        print(f"DEBUG: Category: {category}")
-        print(f"DEBUG: User ID: {session['user_id']}")
-        print(f"DEBUG: Complaint document contains {len(complaint_doc)} fields:")
-        for key, value in complaint_doc.items():
-            if key == 'description':
-                print(f"  - {key}: '{str(value)[:50]}...' (length: {len(str(value))})")
-            elif isinstance(value, ObjectId):
-                print(f"  - {key}: ObjectId('{value}')")
-            else:
-                print(f"  - {key}: {value}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Complaint document: %s", {key: (f"{value[:50]}... ({len(value)} chars)" if key == 'description' else value)
+                                                    for key, value in complaint_doc.items() if key != 'minhash'})
         
         try:
             if complaints_db is None:
-                print("ERROR: complaints_db is None!")
+                logger.error("Complaint insert without a database connection")
                 flash('Database connection error', 'danger')
                 return render_template('submit_complaint.html', categories=app.config['COMPLAINT_CATEGORIES'])
             
-            print("DEBUG: complaints_db connection OK")
-            
             # Get the category-specific collection
             collection_name = get_category_collection_name(category)
-            print(f"DEBUG: Collection name for category '{category}': {collection_name}")
-            
             category_collection = get_category_collection(category)
-            print(f"DEBUG: Category collection object: {category_collection}")
             
             if category_collection is None:
-                print("ERROR: Could not get category collection!")
-                print(f"DEBUG: Tried to get collection: {collection_name}")
+                logger.error("Could not get collection %s", collection_name)
                 flash('Database connection error', 'danger')
                 return render_template('submit_complaint.html', categories=app.config['COMPLAINT_CATEGORIES'])
             
-            print(f"DEBUG: Category collection retrieved successfully")
-            print(f"DEBUG: Collection database: {category_collection.database.name}")
-            print(f"DEBUG: Collection name: {category_collection.name}")
-            
             # Insert into category-specific collection
-            print(f"\nDEBUG: Attempting to insert document into collection...")
             result = category_collection.insert_one(complaint_doc)
-            print(f"DEBUG: Insert operation completed")
-            print(f"DEBUG: Insert result type: {type(result)}")
-            print(f"DEBUG: Insert result object: {result}")
-            print(f"DEBUG: Inserted ID: {result.inserted_id}")
             
             if not result.inserted_id:
-                print("ERROR: No inserted_id returned from insert_one()!")
+                logger.error("No inserted_id returned from insert_one() for complaint %s", complaint_id)
+                if auto_assigned_to:
+                    assigner.release(auto_assigned_to)
                 flash('Error: Failed to save complaint to database', 'danger')
                 return render_template('submit_complaint.html', categories=app.config['COMPLAINT_CATEGORIES'])
             
-            print(f"DEBUG: Document inserted with ID: {result.inserted_id}")
-            
             # Verify the complaint was saved
-            print(f"DEBUG: Verifying document was saved...")
             saved_complaint = category_collection.find_one({'_id': result.inserted_id})
             if not saved_complaint:
-                print("ERROR: Complaint was not found after insert!")
-                print(f"DEBUG: Searched for _id: {result.inserted_id}")
-                print(f"DEBUG: Collection document count: {category_collection.count_documents({})}")
+                logger.error("Complaint %s (_id %s) was not found after insert", complaint_id, result.inserted_id)
                 flash('Error: Complaint was not saved correctly', 'danger')
                 return render_template('submit_complaint.html', categories=app.config['COMPLAINT_CATEGORIES'])
             
-            print(f"DEBUG: ✓ Verification passed - document found in database")
-            print(f"DEBUG: Saved document keys: {list(saved_complaint.keys())}")
-            
-            print(f"\n{'='*70}")
-            print(f"✓ SUCCESS: Complaint saved successfully!")
-            print(f"  - Complaint ID: {complaint_id}")
-            print(f"  - MongoDB _id: {result.inserted_id}")
-            print(f"  - Collection: {collection_name}")
-            print(f"  - Database: {app.config['COMPLAINTS_DATABASE_NAME']}")
-            print(f"  - Full path: {app.config['COMPLAINTS_DATABASE_NAME']}.{collection_name}")
-            print(f"{'='*70}\n")
+            logger.info("Complaint %s saved to %s.%s", complaint_id, app.config['COMPLAINTS_DATABASE_NAME'], collection_name,
+                        extra={'complaint_id': complaint_id, 'category': category, 'priority': complaint_doc['priority']})
             
         except Exception as e:
-            print(f"\n{'='*70}")
-            print(f"✗ ERROR: Database insert failed!")
-            print(f"  - Error type: {type(e).__name__}")
-            print(f"  - Error message: {str(e)}")
-            print(f"{'='*70}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Database insert failed for complaint %s", complaint_id)
+            if auto_assigned_to:
+                assigner.release(auto_assigned_to)
             flash(f'Error saving complaint: {str(e)}', 'danger')
             return render_template('submit_complaint.html', categories=app.config['COMPLAINT_CATEGORIES'])
         
         # Log activity
-        print("\nDEBUG: Logging activity...")
         try:
             log_activity(str(result.inserted_id), 'complaint_created', session['user_id'], 
                         {'complaint_id': complaint_id, 'category': category})
-            print("DEBUG: Activity logged successfully")
         except Exception as e:
-            print(f"WARNING: Activity log error: {e}")
+            logger.warning("Activity log error: %s", e)
+        
+        track_deadline(complaint_doc)
+        if escalated_from:
+            log_activity(str(result.inserted_id), 'auto_escalated', session['user_id'],
+                         {'keywords': escalation_keywords, 'priority_from': escalated_from, 'priority_to': priority})
+        if duplicate:
+            log_activity(str(result.inserted_id), 'possible_duplicate', session['user_id'],
+                         {'duplicate_of': duplicate[1].get('complaint_id'), 'score': complaint_doc['duplicate_score']})
+        elif signature and duplicates.loaded:
+            duplicates.add(category, complaint_doc)
+        if auto_assigned_to:
+            roster.track(None, None, auto_assigned_to, complaint_doc['status'])
+            log_activity(str(result.inserted_id), 'auto_assigned', session['user_id'], {'assigned_to': auto_assigned_to})
+            queue_assignment_emails([(complaint_doc, auto_assigned_to)])
         
         # Send email notification
-        print("DEBUG: Attempting email notification...")
         try:
             from utils.email_service import send_complaint_submitted_email
             user = users_db.users.find_one({'_id': ObjectId(session['user_id'])})
@@ -888,17 +1642,14 @@ def submit_complaint():
                     complaint_id,
                     category
                 )
-                print("DEBUG: Email notification sent")
             else:
-                print("DEBUG: User not found for email notification")
+                logger.debug("User not found for email notification")
         except Exception as e:
-            print(f"WARNING: Email notification error: {e}")
+            logger.warning("Email notification error: %s", e)
         
-        print(f"\nDEBUG: Redirecting to track_complaint page with ID: {result.inserted_id}")
         flash(f'Complaint submitted successfully! Your complaint ID is {complaint_id}', 'success')
         return redirect(url_for('track_complaint', complaint_id=str(result.inserted_id)))
     
-    print("DEBUG: GET request - rendering form")
     return render_template('submit_complaint.html', 
                          categories=app.config['COMPLAINT_CATEGORIES'],
                          priorities=list(app.config['PRIORITY_LEVELS'].keys()))
@@ -911,38 +1662,48 @@ def submit_complaint():
 @login_required
 def track_complaint(complaint_id):
     """Track a specific complaint"""
-    print(f"\n{'='*70}")
-    print(f"DEBUG: track_complaint called with ID: {complaint_id}")
-    print(f"{'='*70}")
-    
     if db is None:
-        print("ERROR: db is None")
+        logger.error("track_complaint without a database connection")
         flash('Database connection error', 'danger')
         return render_template('track_complaint.html', complaint=None)
     
     try:
-        complaint, category_collection = get_complaint_from_all_collections(complaint_id)
+        # Fetch only the validator fields first so unchanged complaints get a 304
+        validators, category_collection = get_complaint_from_all_collections(complaint_id, projection=VALIDATOR_FIELDS)
+        if not validators:
+            logger.info("Complaint not found for ID: %s", complaint_id)
+            flash('Complaint not found', 'danger')
+            return render_template('track_complaint.html', complaint=None)
         
+        user_role = session.get('user_role', 'citizen')
+        etag = complaint_etag(validators, session['user_id'], user_role,
+                              is_sla_breached(validators.get('sla_deadline')),
+                              datetime.utcnow().strftime('%Y%m%d%H'))
+        has_access = str(validators.get('user_id')) == session['user_id'] or user_role in ['admin', 'staff']
+        if has_access and '_flashes' not in session and is_not_modified(etag, validators.get('updated_at')):
+            return not_modified_response(etag, validators.get('updated_at'))
+        
+        complaint = category_collection.find_one({'_id': validators['_id']})
         if not complaint:
-            print(f"ERROR: Complaint not found for ID: {complaint_id}")
+            logger.info("Complaint not found for ID: %s", complaint_id)
             flash('Complaint not found', 'danger')
             return render_template('track_complaint.html', complaint=None)
         
-        print(f"DEBUG: Found complaint - Category: {complaint.get('category')}, Status: {complaint.get('status')}")
+        logger.debug("Found complaint - Category: %s, Status: %s", complaint.get('category'), complaint.get('status'))
         
         # Convert complaint to dict if it's not already
         if not isinstance(complaint, dict):
-            print(f"WARNING: Complaint is not a dict, converting...")
+            logger.warning("Complaint is not a dict, converting...")
             try:
                 complaint = dict(complaint)
             except Exception as e:
-                print(f"ERROR: Could not convert complaint to dict: {e}")
+                logger.error("Could not convert complaint to dict: %s", e)
                 flash('Invalid complaint data format', 'danger')
                 return render_template('track_complaint.html', complaint=None)
         
         # Check if complaint is empty
         if not complaint or len(complaint) == 0:
-            print(f"ERROR: Complaint is empty")
+            logger.error("Complaint is empty")
             flash('Complaint data is empty', 'danger')
             return render_template('track_complaint.html', complaint=None)
         
@@ -953,10 +1714,10 @@ def track_complaint(complaint_id):
                 complaint_oid = ObjectId(complaint['_id']) if not isinstance(complaint['_id'], ObjectId) else complaint['_id']
                 complaint['_id'] = str(complaint['_id'])
             except Exception as e:
-                print(f"WARNING: Could not convert _id to ObjectId: {e}")
+                logger.warning("Could not convert _id to ObjectId: %s", e)
                 complaint['_id'] = str(complaint.get('_id', complaint_id))
         else:
-            print(f"ERROR: Complaint _id is missing")
+            logger.error("Complaint _id is missing")
             complaint['_id'] = str(complaint_id)
             try:
                 complaint_oid = ObjectId(complaint_id)
@@ -979,7 +1740,6 @@ def track_complaint(complaint_id):
         complaint['sla_deadline'] = complaint.get('sla_deadline')
         
         # Check if user owns this complaint or is admin/staff
-        user_role = session.get('user_role', 'citizen')
         if str(complaint['user_id']) != session['user_id'] and user_role not in ['admin', 'staff']:
             flash('You do not have access to this complaint', 'danger')
             return redirect(url_for('dashboard'))
@@ -1016,11 +1776,11 @@ def track_complaint(complaint_id):
                 assigned_to_id = complaint['assigned_to']
                 if isinstance(assigned_to_id, str):
                     assigned_to_id = ObjectId(assigned_to_id)
-                staff = users_db.users.find_one({'_id': assigned_to_id})
+                staff = get_roster().get(assigned_to_id) or users_db.users.find_one({'_id': assigned_to_id})
                 if staff:
                     complaint['assigned_staff_name'] = staff.get('name', 'Unknown')
             except Exception as e:
-                print(f"Error getting assigned staff: {e}")
+                logger.error("Error getting assigned staff: %s", e)
                 complaint['assigned_staff_name'] = None
         
         # Get activity log
@@ -1042,11 +1802,11 @@ def track_complaint(complaint_id):
                     activity['user_name'] = 'Unknown'
                 activities.append(activity)
         except Exception as e:
-            print(f"Error getting activities: {e}")
+            logger.error("Error getting activities: %s", e)
         
         complaint['activities'] = activities
         complaint['age'] = get_complaint_age(complaint.get('created_at'))
-        complaint['sla_breached'] = is_sla_breached(complaint.get('sla_deadline'))
+        complaint['sla_breached'] = complaint.get('sla_breached', False)
         
         # Ensure comments, progress, and proof_images are lists
         if 'comments' not in complaint:
@@ -1058,32 +1818,24 @@ def track_complaint(complaint_id):
         
         # Ensure complaint is a dict before passing to template
         if not isinstance(complaint, dict):
-            print(f"WARNING: Complaint is not a dict before template render, converting...")
+            logger.warning("Complaint is not a dict before template render, converting...")
             try:
                 complaint = dict(complaint)
             except:
-                print(f"ERROR: Could not convert complaint to dict")
+                logger.error("Could not convert complaint to dict")
                 flash('Invalid complaint data format', 'danger')
                 return render_template('track_complaint.html', complaint=None)
         
         # Ensure complaint is not empty
         if not complaint or len(complaint) == 0:
-            print(f"ERROR: Complaint dict is empty before template render")
+            logger.error("Complaint dict is empty before template render")
             flash('Complaint data is empty', 'danger')
             return render_template('track_complaint.html', complaint=None)
         
-        print(f"DEBUG: Complaint data prepared - User: {complaint.get('user_name')}, Category: {complaint.get('category')}")
-        print(f"DEBUG: Complaint keys count: {len(complaint.keys())}")
-        print(f"DEBUG: Rendering template with complaint data")
-        
-        return render_template('track_complaint.html', complaint=complaint)
+        response = make_response(render_template('track_complaint.html', complaint=complaint))
+        return set_validators(response, etag, validators.get('updated_at'))
     except Exception as e:
-        import traceback
-        print(f"\n{'='*70}")
-        print(f"ERROR in track_complaint: {e}")
-        print(f"{'='*70}")
-        traceback.print_exc()
-        print(f"{'='*70}\n")
+        logger.exception("Error in track_complaint for %s", complaint_id)
         flash(f'Error loading complaint: {str(e)}', 'danger')
         return render_template('track_complaint.html', complaint=None)
 
@@ -1117,7 +1869,8 @@ def update_complaint(complaint_id):
                 {'$set': {
                     'comments': comments,
                     'updated_at': datetime.utcnow()
-                }}
+                },
+                 '$inc': {'version': 1}}
             )
             
             log_activity(complaint_id, 'comment_added', session['user_id'], {'comment': comment[:50]})
@@ -1147,10 +1900,10 @@ def admin_dashboard():
     closed = count_all_category_collections({'status': 'Closed'})
     urgent = count_all_category_collections({'is_urgent': True, 'status': {'$nin': ['Resolved', 'Closed']}})
     
-    # SLA breaches
+    # SLA breaches (flag maintained by the SLA sweeper, indexed)
     sla_breached = count_all_category_collections({
-        'status': {'$nin': ['Resolved', 'Closed']},
-        'sla_deadline': {'$lt': datetime.utcnow()}
+        'sla_breached': True,
+        'status': {'$nin': list(CLOSED_STATUSES)}
     })
     
     # Category-wise counts
@@ -1166,12 +1919,13 @@ def admin_dashboard():
         priority_stats[priority] = count_all_category_collections({'priority': priority})
     
     # Recent complaints
-    recent_complaints = query_all_category_collections({}, sort=('created_at', -1), limit=10)
+    recent_complaints = query_all_category_collections({}, sort=('created_at', -1), limit=10,
+                                                       projection=get_projection('list_row'))
     for complaint in recent_complaints:
         complaint['_id'] = str(complaint['_id'])
         complaint['user_id'] = str(complaint['user_id'])
         complaint['age'] = get_complaint_age(complaint.get('created_at'))
-        complaint['sla_breached'] = is_sla_breached(complaint.get('sla_deadline'))
+        complaint['sla_breached'] = complaint.get('sla_breached', False)
         
         # Fix photo path
         if complaint.get('image_path') and not complaint.get('photo'):
@@ -1188,7 +1942,7 @@ def admin_dashboard():
     urgent_complaints = query_all_category_collections({
         'is_urgent': True,
         'status': {'$nin': ['Resolved', 'Closed']}
-    }, sort=('created_at', -1), limit=5)
+    }, sort=('created_at', -1), limit=5, projection=get_projection('list_row'))
     for complaint in urgent_complaints:
         complaint['_id'] = str(complaint['_id'])
         complaint['user_id'] = str(complaint['user_id'])
@@ -1226,17 +1980,7 @@ def admin_view_complaints():
     page = int(request.args.get('page', 1))
     
     # Build query
-    query = {}
-    if status:
-        query['status'] = status
-    if priority:
-        query['priority'] = priority
-    if search:
-        query['$or'] = [
-            {'complaint_id': {'$regex': search, '$options': 'i'}},
-            {'location': {'$regex': search, '$options': 'i'}},
-            {'description': {'$regex': search, '$options': 'i'}}
-        ]
+    query = build_admin_complaint_query(request.args)
     
     # Get complaints with pagination (from specific category or all)
     if category:
@@ -1245,7 +1989,7 @@ def admin_view_complaints():
         if category_collection is not None:
             query['category'] = category  # Keep category in query for consistency
             total = category_collection.count_documents(query)
-            complaints = list(category_collection.find(query)
+            complaints = list(category_collection.find(query, get_projection('list_row'))
                              .sort('created_at', -1)
                              .skip((page - 1) * app.config['ADMIN_ITEMS_PER_PAGE'])
                              .limit(app.config['ADMIN_ITEMS_PER_PAGE']))
@@ -1256,14 +2000,15 @@ def admin_view_complaints():
         # Query all category collections
         total = count_all_category_collections(query)
         skip = (page - 1) * app.config['ADMIN_ITEMS_PER_PAGE']
-        complaints = query_all_category_collections(query, sort=('created_at', -1), skip=skip, limit=app.config['ADMIN_ITEMS_PER_PAGE'])
+        complaints = query_all_category_collections(query, sort=('created_at', -1), skip=skip, limit=app.config['ADMIN_ITEMS_PER_PAGE'],
+                                                    projection=get_projection('list_row'))
     
     # Convert ObjectIds and add metadata
     for complaint in complaints:
         complaint['_id'] = str(complaint['_id'])
         complaint['user_id'] = str(complaint['user_id'])
         complaint['age'] = get_complaint_age(complaint.get('created_at'))
-        complaint['sla_breached'] = is_sla_breached(complaint.get('sla_deadline'))
+        complaint['sla_breached'] = complaint.get('sla_breached', False)
         
         # Fix photo path - normalize image_path and photo fields
         if complaint.get('image_path') and not complaint.get('photo'):
@@ -1286,7 +2031,7 @@ def admin_view_complaints():
             assigned_to_id = complaint['assigned_to']
             if isinstance(assigned_to_id, str):
                 assigned_to_id = ObjectId(assigned_to_id)
-            staff = users_db.users.find_one({'_id': assigned_to_id})
+            staff = get_roster().get(assigned_to_id) or users_db.users.find_one({'_id': assigned_to_id})
             complaint['assigned_to_name'] = staff.get('name', 'Unknown') if staff else 'Unknown'
             complaint['assigned_to'] = str(assigned_to_id)
         else:
@@ -1308,6 +2053,141 @@ def admin_view_complaints():
                          priority_filter=priority,
                          search_filter=search)
 
+@app.route('/admin/export', methods=['POST'])
+@admin_required
+def admin_export_complaints():
+    """Start a background export of complaints using the admin list filters"""
+    if complaints_db is None:
+        return jsonify({'success': False, 'message': 'Database connection error'}), 500
+    
+    data = request.get_json(silent=True) or {}
+    export_format = (data.get('format') or request.args.get('format', 'csv')).lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'message': 'Invalid export format'}), 400
+    
+    category = request.args.get('category', '')
+    query = build_admin_complaint_query(request.args)
+    if category:
+        if category not in app.config['COMPLAINT_CATEGORIES']:
+            return jsonify({'success': False, 'message': 'Invalid category'}), 400
+        query['category'] = category
+        collections = [get_category_collection(category)]
+    else:
+        collections = [get_category_collection(cat) for cat in app.config['COMPLAINT_CATEGORIES']]
+    
+    params = {key: request.args.get(key, '') for key in ('category', 'status', 'priority', 'search')}
+    params['format'] = export_format
+    job_id = jobs.submit('export', run_export, params=params, user_id=session['user_id'],
+                         collections=collections,
+                         users_collection=users_db.users,
+                         query=query,
+                         export_format=export_format,
+                         exports_folder=app.config['EXPORTS_FOLDER'])
+    
+    log_activity(None, 'export_started', session['user_id'], {'job_id': job_id, 'format': export_format})
+    return jsonify({'success': True, 'job_id': job_id})
+
+@app.route('/admin/jobs/<job_id>')
+@admin_required
+def admin_job_status(job_id):
+    """Progress and result of a background job"""
+    job = jobs.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job_to_json(job)})
+
+@app.route('/admin/exports/<job_id>/download')
+@admin_required
+def admin_download_export(job_id):
+    """Download the file produced by a completed export job"""
+    job = jobs.get(job_id)
+    if not job or job.get('type') != 'export' or job.get('status') != 'completed':
+        flash('Export is not ready', 'warning')
+        return redirect(url_for('admin_view_complaints'))
+    
+    filename = secure_filename(job['result']['filename'])
+    filepath = os.path.abspath(os.path.join(app.config['EXPORTS_FOLDER'], filename))
+    if not os.path.exists(filepath):
+        flash('Export file no longer exists', 'warning')
+        return redirect(url_for('admin_view_complaints'))
+    return send_file(filepath, as_attachment=True, download_name=filename)
+
+@app.route('/admin/import', methods=['POST'])
+@admin_required
+def admin_import_complaints():
+    """Start a background bulk import from an uploaded CSV/JSONL file"""
+    if complaints_db is None or users_db is None:
+        return jsonify({'success': False, 'message': 'Database connection error'}), 500
+    
+    file = request.files.get('file')
+    if not file or not file.filename:
+        return jsonify({'success': False, 'message': 'Import file is required'}), 400
+    filename = secure_filename(file.filename)
+    if not filename.lower().endswith(IMPORT_FORMATS):
+        return jsonify({'success': False, 'message': 'Import file must be .csv or .jsonl'}), 400
+    
+    timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+    path = os.path.join(app.config['IMPORTS_FOLDER'], f"{timestamp}_{filename.lower()}")
+    file.save(path)
+    
+    job_id = start_import_job(path, resume=False)
+    log_activity(None, 'import_started', session['user_id'], {'job_id': job_id, 'file': filename})
+    return jsonify({'success': True, 'job_id': job_id})
+
+@app.route('/admin/import/<job_id>/resume', methods=['POST'])
+@admin_required
+def admin_resume_import(job_id):
+    """Resume an interrupted import from its last checkpoint"""
+    job = jobs.get(job_id)
+    if not job or job.get('type') != 'import':
+        return jsonify({'success': False, 'message': 'Import job not found'}), 404
+    if job.get('status') in ('queued', 'running'):
+        return jsonify({'success': False, 'message': 'Import is still running'}), 400
+    
+    path = job['params']['path']
+    if not os.path.exists(path):
+        return jsonify({'success': False, 'message': 'Import file no longer exists'}), 404
+    return jsonify({'success': True, 'job_id': start_import_job(path, resume=True)})
+
+@app.route('/admin/imports/<job_id>/errors')
+@admin_required
+def admin_import_errors(job_id):
+    """Download the per-row error report of an import"""
+    job = jobs.get(job_id)
+    if not job or job.get('type') != 'import':
+        flash('Import job not found', 'warning')
+        return redirect(url_for('admin_view_complaints'))
+    errors_file = os.path.abspath(job['params']['path'] + '.errors.csv')
+    if not os.path.exists(errors_file):
+        flash('No error report for this import', 'info')
+        return redirect(url_for('admin_view_complaints'))
+    return send_file(errors_file, mimetype='text/csv', as_attachment=True,
+                     download_name=os.path.basename(errors_file))
+
+def run_import_job(ctx, **kwargs):
+    """Import job: run_import, then reload the deadline scheduler so imported open complaints get alerts"""
+    result = run_import(ctx, **kwargs)
+    if result.get('inserted') and deadlines.loaded:
+        try:
+            deadlines.load([get_category_collection(category) for category in app.config['COMPLAINT_CATEGORIES']],
+                           get_open_statuses())
+        except Exception as e:
+            logger.error("Error reloading SLA deadlines after import: %s", e)
+    return result
+
+def start_import_job(path, resume=False):
+    """Queue an import job for a file in IMPORTS_FOLDER"""
+    return jobs.submit('import', run_import_job,
+                       params={'path': path, 'file': os.path.basename(path), 'resume': resume},
+                       user_id=session['user_id'],
+                       path=path,
+                       collection_for=get_category_collection,
+                       users_collection=users_db.users,
+                       config=app.config,
+                       default_user_id=ObjectId(session['user_id']),
+                       batch_size=app.config['IMPORT_BATCH_SIZE'],
+                       resume=resume)
+
 @app.route('/admin/staff/list', methods=['GET'])
 @admin_required
 def admin_staff_list():
@@ -1316,15 +2196,18 @@ def admin_staff_list():
         return jsonify({'success': False, 'message': 'Database connection error'}), 500
     
     try:
-        staff_members = list(users_db.users.find({'role': 'staff', 'is_active': True}))
         staff_list = []
-        for staff in staff_members:
+        for staff in get_roster().members(roles=('staff',), active_only=True):
             staff_list.append({
-                '_id': str(staff['_id']),
+                '_id': staff['_id'],
                 'name': staff.get('name', 'Unknown'),
                 'email': staff.get('email', ''),
                 'staff_id': staff.get('staff_id', ''),
-                'assigned_complaints': count_all_category_collections({'assigned_to': staff['_id']})
+                'departments': staff.get('departments', []),
+                'assigned_complaints': staff['counts']['assigned'],
+                'open_complaints': staff['counts']['open'],
+                'in_progress_complaints': staff['counts']['in_progress'],
+                'resolved_complaints': staff['counts']['resolved']
             })
         
         return jsonify({'success': True, 'staff': staff_list})
@@ -1363,9 +2246,13 @@ def admin_assign_complaint(complaint_id):
                     'assigned_to': ObjectId(staff_id),
                     'assigned_at': datetime.utcnow(),
                     'updated_at': datetime.utcnow()
-                }
+                },
+                '$inc': {'version': 1}
             }
         )
+        track_workload(complaint.get('assigned_to'), complaint.get('status'), staff_id, complaint.get('status'))
+        track_deadline(complaint, {'assigned_to': ObjectId(staff_id)})
+        track_reassignments([(complaint['_id'], complaint.get('assigned_to'), staff_id)])
         
         # Add comment about assignment
         comments = complaint.get('comments', [])
@@ -1379,7 +2266,7 @@ def admin_assign_complaint(complaint_id):
         })
         category_collection.update_one(
             {'_id': ObjectId(complaint_id)},
-            {'$set': {'comments': comments}}
+            {'$set': {'comments': comments}, '$inc': {'version': 1}}
         )
         
         # Log activity
@@ -1388,21 +2275,15 @@ def admin_assign_complaint(complaint_id):
         return jsonify({'success': True, 'message': 'Complaint assigned successfully'})
         
     except Exception as e:
-        print(f"Error assigning complaint: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error assigning complaint %s", complaint_id)
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @app.route('/admin/complaint/<complaint_id>')
 @admin_required
 def admin_complaint_details(complaint_id):
     """Admin view complaint details"""
-    print(f"\n{'='*70}")
-    print(f"DEBUG: admin_complaint_details called with ID: {complaint_id}")
-    print(f"{'='*70}")
-    
     if db is None:
-        print("ERROR: db is None")
+        logger.error("admin_complaint_details without a database connection")
         flash('Database connection error', 'danger')
         return render_template('admin_complaint_details.html', 
                              complaint=None,
@@ -1415,18 +2296,14 @@ def admin_complaint_details(complaint_id):
         # Convert complaint_id to ObjectId if it's a valid ObjectId string
         try:
             complaint_id_obj = ObjectId(complaint_id)
-            print(f"DEBUG: Valid ObjectId: {complaint_id_obj}")
         except Exception as e:
             # If not valid ObjectId, try to find by complaint_id field
-            print(f"DEBUG: Not a valid ObjectId format, will search by complaint_id field: {e}")
             complaint_id_obj = complaint_id
         
-        print(f"DEBUG: Calling get_complaint_from_all_collections with: {complaint_id}")
         complaint, category_collection = get_complaint_from_all_collections(complaint_id)
         
         if not complaint:
-            print(f"ERROR: Complaint not found for ID: {complaint_id}")
-            print(f"DEBUG: Returning template with complaint=None")
+            logger.info("Complaint not found for ID: %s", complaint_id)
             flash('Complaint not found', 'danger')
             return render_template('admin_complaint_details.html', 
                                  complaint=None,
@@ -1435,18 +2312,15 @@ def admin_complaint_details(complaint_id):
                                  statuses=app.config.get('STATUS_OPTIONS', []),
                                  priorities=list(app.config.get('PRIORITY_LEVELS', {}).keys()))
         
-        print(f"DEBUG: Found complaint!")
-        print(f"DEBUG: Complaint type: {type(complaint)}")
-        print(f"DEBUG: Complaint keys: {list(complaint.keys()) if hasattr(complaint, 'keys') else 'N/A'}")
-        print(f"DEBUG: Category: {complaint.get('category', 'N/A')}, Status: {complaint.get('status', 'N/A')}")
+        logger.debug("Found complaint %s in %s (status %s)", complaint_id, category_collection.name, complaint.get('status'))
         
         # Convert complaint to dict if it's not already
         if not isinstance(complaint, dict):
-            print(f"WARNING: Complaint is not a dict, converting...")
+            logger.warning("Complaint is not a dict, converting...")
             try:
                 complaint = dict(complaint)
             except Exception as e:
-                print(f"ERROR: Could not convert complaint to dict: {e}")
+                logger.error("Could not convert complaint to dict: %s", e)
                 flash('Invalid complaint data format', 'danger')
                 return render_template('admin_complaint_details.html', 
                                      complaint=None,
@@ -1457,7 +2331,7 @@ def admin_complaint_details(complaint_id):
         
         # Check if complaint is empty
         if not complaint or len(complaint) == 0:
-            print(f"ERROR: Complaint is empty")
+            logger.error("Complaint is empty")
             flash('Complaint data is empty', 'danger')
             return render_template('admin_complaint_details.html', 
                                  complaint=None,
@@ -1473,10 +2347,10 @@ def admin_complaint_details(complaint_id):
                 complaint_oid = ObjectId(complaint['_id']) if not isinstance(complaint['_id'], ObjectId) else complaint['_id']
                 complaint['_id'] = str(complaint['_id'])
             except Exception as e:
-                print(f"WARNING: Could not convert _id to ObjectId: {e}")
+                logger.warning("Could not convert _id to ObjectId: %s", e)
                 complaint['_id'] = str(complaint.get('_id', complaint_id))
         else:
-            print(f"ERROR: Complaint _id is missing or invalid: {complaint.get('_id')}")
+            logger.error("Complaint _id is missing or invalid: %s", complaint.get('_id'))
             complaint['_id'] = str(complaint_id)  # Use the ID from URL as fallback
             try:
                 complaint_oid = ObjectId(complaint_id)
@@ -1532,13 +2406,13 @@ def admin_complaint_details(complaint_id):
                 assigned_to_id = complaint['assigned_to']
                 if isinstance(assigned_to_id, str):
                     assigned_to_id = ObjectId(assigned_to_id)
-                staff = users_db.users.find_one({'_id': assigned_to_id})
+                staff = get_roster().get(assigned_to_id) or users_db.users.find_one({'_id': assigned_to_id})
                 if staff:
                     complaint['assigned_staff_name'] = staff.get('name', 'Unknown')
                     complaint['assigned_staff_email'] = staff.get('email', 'Unknown')
                     complaint['assigned_to'] = str(staff['_id'])  # Ensure it's a string
             except Exception as e:
-                print(f"Error getting assigned staff: {e}")
+                logger.error("Error getting assigned staff: %s", e)
                 complaint['assigned_staff_name'] = None
                 complaint['assigned_staff_email'] = None
         else:
@@ -1547,12 +2421,11 @@ def admin_complaint_details(complaint_id):
         # Get all staff members for assignment
         staff_members = []
         try:
-            staff_list = list(users_db.users.find({'role': {'$in': ['staff', 'admin']}}, {'name': 1, 'email': 1, 'role': 1}))
-            for staff in staff_list:
-                staff['_id'] = str(staff['_id'])
-                staff_members.append(staff)
+            for staff in get_roster().members():
+                staff_members.append({'_id': staff['_id'], 'name': staff.get('name'),
+                                      'email': staff.get('email'), 'role': staff.get('role')})
         except Exception as e:
-            print(f"Error getting staff members: {e}")
+            logger.error("Error getting staff members: %s", e)
         
         # Get activity log
         activities = []
@@ -1572,11 +2445,11 @@ def admin_complaint_details(complaint_id):
                     activity['user_name'] = 'Unknown'
                 activities.append(activity)
         except Exception as e:
-            print(f"Error getting activities: {e}")
+            logger.error("Error getting activities: %s", e)
         
         complaint['activities'] = activities
         complaint['age'] = get_complaint_age(complaint.get('created_at'))
-        complaint['sla_breached'] = is_sla_breached(complaint.get('sla_deadline'))
+        complaint['sla_breached'] = complaint.get('sla_breached', False)
         
         # Ensure comments and progress are lists
         if 'comments' not in complaint:
@@ -1586,33 +2459,29 @@ def admin_complaint_details(complaint_id):
         if 'proof_images' not in complaint:
             complaint['proof_images'] = []
         
-
-
-
-        print(f"DEBUG: Complaint data prepared - User: {complaint.get('user_name')}, Category: {complaint.get('category')}")
-        print(f"DEBUG: Rendering template with complaint data")
-        
-        # Get staff members for the dropdown even if error occurred earlier
-        try:
-            staff_list = list(users_db.users.find({'role': {'$in': ['staff', 'admin']}}, {'name': 1, 'email': 1, 'role': 1}))
-            staff_members = []
-            for staff in staff_list:
-                staff['_id'] = str(staff['_id'])
-                staff_members.append(staff)
-        except:
-            staff_members = []
+        # Duplicate links: the (probable) parent, and duplicates merged into this complaint
+        complaint['duplicate_parent'] = None
+        parent_oid = complaint.get('duplicate_of') or complaint.get('possible_duplicate_of')
+        if parent_oid:
+            parent, _ = get_complaint_from_all_collections(str(parent_oid),
+                                                           projection={'complaint_id': 1, 'status': 1, 'location': 1})
+            if parent:
+                complaint['duplicate_parent'] = {'_id': str(parent['_id']), 'complaint_id': parent.get('complaint_id'),
+                                                 'status': parent.get('status'), 'location': parent.get('location')}
+        complaint['merged_duplicates'] = [
+            {'_id': str(duplicate['_id']), 'complaint_id': duplicate.get('complaint_id')}
+            for duplicate, _ in find_complaints_by_ids(complaint.get('duplicates') or [], projection={'complaint_id': 1})
+        ]
         
         # Ensure complaint is a dict before passing to template
         if not isinstance(complaint, dict):
-            print(f"WARNING: Complaint is not a dict before template render, converting...")
+            logger.warning("Complaint is not a dict before template render, converting...")
             try:
                 complaint = dict(complaint)
             except:
-                print(f"ERROR: Could not convert complaint to dict")
+                logger.error("Could not convert complaint to dict")
                 complaint = {}
         
-        print(f"DEBUG: Final complaint object type: {type(complaint)}, keys: {list(complaint.keys())[:10] if complaint else 'empty'}")
-        
         return render_template('admin_complaint_details.html', 
                              complaint=complaint,
                              staff_members=staff_members,
@@ -1620,12 +2489,7 @@ def admin_complaint_details(complaint_id):
                              statuses=app.config.get('STATUS_OPTIONS', []),
                              priorities=list(app.config.get('PRIORITY_LEVELS', {}).keys()))
     except Exception as e:
-        import traceback
-        print(f"\n{'='*70}")
-        print(f"ERROR in admin_complaint_details: {e}")
-        print(f"{'='*70}")
-        traceback.print_exc()
-        print(f"{'='*70}\n")
+        logger.exception("Error in admin_complaint_details for %s", complaint_id)
         flash(f'Error loading complaint details: {str(e)}', 'danger')
         # Render template with error instead of redirecting
         return render_template('admin_complaint_details.html', 
@@ -1639,42 +2503,29 @@ def admin_complaint_details(complaint_id):
 @admin_required
 def admin_update_complaint(complaint_id):
     """Admin update complaint status"""
-    print(f"\n{'='*70}")
-    print(f"DEBUG: Admin updating complaint: {complaint_id}")
-    print(f"{'='*70}")
-    
     if db is None:
-        print("ERROR: Database connection is None")
+        logger.error("admin_update_complaint without a database connection")
         return jsonify({'success': False, 'message': 'Database connection error'}), 500
     
     try:
         request_data = request.get_json()
-        print(f"DEBUG: Request data: {request_data}")
+        logger.debug("Admin update of %s: %s", complaint_id, request_data)
         
         status = request_data.get('status') if request_data else None
         priority = request_data.get('priority') if request_data else None
         assigned_to = request_data.get('assigned_to') if request_data else None
         comment = request_data.get('comment', '').strip() if request_data else ''
         
-        print(f"DEBUG: Status: {status}")
-        print(f"DEBUG: Priority: {priority}")
-        print(f"DEBUG: Assigned to: {assigned_to}")
-        print(f"DEBUG: Comment: {comment[:50]}...")
-        
         if status and status not in app.config['STATUS_OPTIONS']:
-            print(f"ERROR: Invalid status: {status}")
+            logger.info("Invalid status: %s", status)
             return jsonify({'success': False, 'message': 'Invalid status'}), 400
         
         # Get complaint before update (from category collection)
         complaint, category_collection = get_complaint_from_all_collections(complaint_id)
         if not complaint or category_collection is None:
-            print(f"ERROR: Complaint not found: {complaint_id}")
+            logger.info("Complaint not found: %s", complaint_id)
             return jsonify({'success': False, 'message': 'Complaint not found'}), 404
         
-        print(f"DEBUG: Found complaint in collection: {category_collection.name}")
-        print(f"DEBUG: Current status: {complaint.get('status')}")
-        print(f"DEBUG: Current category: {complaint.get('category')}")
-        
         old_status = complaint.get('status')
         old_assigned_to = complaint.get('assigned_to')
         
@@ -1684,40 +2535,41 @@ def admin_update_complaint(complaint_id):
         
         if status:
             update_data['status'] = status
-            print(f"DEBUG: Updating status from '{old_status}' to '{status}'")
             # Update status to "Acknowledged" if assigning to worker
             if assigned_to and not old_assigned_to and status == 'Pending':
                 update_data['status'] = 'Acknowledged'
         if priority:
             update_data['priority'] = priority
+            record_classification_corrections([(complaint, 'priority', priority, session['user_id'])])
             # Recalculate SLA deadline
             update_data['sla_deadline'] = calculate_sla_deadline(priority, complaint.get('created_at', datetime.utcnow()))
-            print(f"DEBUG: Updating priority to: {priority}")
+            update_data['sla_breached'] = is_sla_breached(update_data['sla_deadline'])
         if assigned_to is not None:
             if assigned_to and assigned_to != 'None':
                 update_data['assigned_to'] = ObjectId(assigned_to)
                 if not status or status == 'Pending':
                     update_data['status'] = 'Acknowledged'
-                print(f"DEBUG: Assigning to: {assigned_to}")
             else:
                 update_data['assigned_to'] = None
-                print(f"DEBUG: Removing assignment")
+        update_data.update(resolution_changes(old_status, update_data.get('status', old_status), update_data['updated_at']))
         
-        print(f"DEBUG: Update data: {update_data}")
+        logger.debug("Update of %s in %s: %s", complaint_id, category_collection.name, update_data)
         
         # Update in the correct category collection
         result = category_collection.update_one(
             {'_id': ObjectId(complaint_id)},
-            {'$set': update_data}
+            {'$set': update_data, '$inc': {'version': 1}}
         )
         
-        print(f"DEBUG: Update result - Modified count: {result.modified_count}")
-        print(f"DEBUG: Update result - Matched count: {result.matched_count}")
-        
         if result.matched_count == 0:
-            print(f"ERROR: No document matched for update")
+            logger.info("No document matched for update of %s", complaint_id)
             return jsonify({'success': False, 'message': 'Complaint not found for update'}), 404
         
+        track_workload(old_assigned_to, old_status,
+                       update_data.get('assigned_to', old_assigned_to), update_data.get('status', old_status))
+        track_deadline(complaint, update_data)
+        track_reassignments([(complaint['_id'], old_assigned_to, update_data.get('assigned_to', old_assigned_to))])
+        
         # Add comment if provided
         if comment:
             comments = complaint.get('comments', [])
@@ -1729,12 +2581,8 @@ def admin_update_complaint(complaint_id):
             })
             category_collection.update_one(
                 {'_id': ObjectId(complaint_id)},
-                {'$set': {'comments': comments}}
+                {'$set': {'comments': comments}, '$inc': {'version': 1}}
             )
-            print(f"DEBUG: Comment added")
-        
-        print(f"DEBUG: ✓ Complaint updated successfully")
-        print(f"{'='*70}\n")
         
         # Send email notifications
         try:
@@ -1774,7 +2622,7 @@ def admin_update_complaint(complaint_id):
                         status
                     )
         except Exception as e:
-            print(f"Email notification error: {e}")
+            logger.warning("Email notification error: %s", e)
         
         # Log activity
         log_activity(complaint_id, 'status_updated', session['user_id'], 
@@ -1782,8 +2630,254 @@ def admin_update_complaint(complaint_id):
         
         return jsonify({'success': True, 'message': 'Complaint updated successfully'})
     except Exception as e:
+        logger.exception("Error updating complaint %s", complaint_id)
         return jsonify({'success': False, 'message': str(e)}), 500
 
+@app.route('/admin/complaints/bulk', methods=['POST'])
+@admin_required
+def admin_bulk_update():
+    """Apply an assignment, status or priority change to many complaints at once"""
+    if complaints_db is None or users_db is None:
+        return jsonify({'success': False, 'message': 'Database connection error'}), 500
+    
+    data = request.get_json(silent=True) or {}
+    complaint_ids = data.get('complaint_ids') or []
+    action = data.get('action')
+    value = data.get('value')
+    comment = (data.get('comment') or '').strip()
+    
+    if not complaint_ids:
+        return jsonify({'success': False, 'message': 'No complaints selected'}), 400
+    if len(complaint_ids) > app.config['BULK_ACTION_LIMIT']:
+        return jsonify({'success': False, 'message': f"At most {app.config['BULK_ACTION_LIMIT']} complaints per bulk action"}), 400
+    if action not in ('assign', 'status', 'priority'):
+        return jsonify({'success': False, 'message': 'Invalid action'}), 400
+    if action == 'status' and value not in app.config['STATUS_OPTIONS']:
+        return jsonify({'success': False, 'message': 'Invalid status'}), 400
+    if action == 'priority' and value not in app.config['PRIORITY_LEVELS']:
+        return jsonify({'success': False, 'message': 'Invalid priority'}), 400
+    
+    staff = None
+    if action == 'assign':
+        try:
+            staff = users_db.users.find_one({'_id': ObjectId(value), 'role': 'staff', 'is_active': True})
+        except Exception:
+            staff = None
+        if not staff:
+            return jsonify({'success': False, 'message': 'Staff member not found'}), 404
+    
+    complaints = find_complaints_by_ids(complaint_ids, {
+        'complaint_id': 1, 'user_id': 1, 'category': 1, 'location': 1,
+        'status': 1, 'priority': 1, 'created_at': 1, 'assigned_to': 1, 'classification': 1
+    })
+    if not complaints:
+        return jsonify({'success': False, 'message': 'Complaints not found'}), 404
+    
+    now = datetime.utcnow()
+    admin_id = ObjectId(session['user_id'])
+    ops_by_collection = {}  # name -> (collection, ops, (complaint, update_set, activity) per op)
+    
+    for complaint, collection in complaints:
+        update_set = {'updated_at': now}
+        if action == 'status':
+            update_set['status'] = value
+        elif action == 'priority':
+            update_set['priority'] = value
+            update_set['sla_deadline'] = calculate_sla_deadline(value, complaint.get('created_at', now))
+            update_set['sla_breached'] = update_set['sla_deadline'] < now
+        else:
+            update_set['assigned_to'] = staff['_id']
+            update_set['assigned_at'] = now
+            if complaint.get('status', 'Pending') == 'Pending':
+                update_set['status'] = 'Acknowledged'
+        update_set.update(resolution_changes(complaint.get('status'), update_set.get('status', complaint.get('status')), now))
+        
+        update = {'$set': update_set, '$inc': {'version': 1}}
+        if comment:
+            update['$push'] = {'comments': {
+                'comment': comment,
+                'admin_name': session.get('user_name', 'Admin'),
+                'user_role': 'admin',
+                'timestamp': now
+            }}
+        
+        details = {'status': update_set.get('status'), 'priority': update_set.get('priority')}
+        if staff:
+            details.update({'assigned_to': str(staff['_id']), 'staff_name': staff.get('name')})
+        _, ops, entries = ops_by_collection.setdefault(collection.name, (collection, [], []))
+        ops.append(UpdateOne({'_id': complaint['_id']}, update))
+        entries.append((complaint, update_set, (complaint['_id'], f'bulk_{action}', admin_id, details)))
+    
+    # One bulk_write per category collection; only the writes that succeeded are
+    # tracked, logged and notified
+    matched = 0
+    modified = 0
+    errors = []
+    activities = []
+    changed = []
+    for collection, ops, entries in ops_by_collection.values():
+        failed = set()
+        try:
+            result = collection.bulk_write(ops, ordered=False)
+            matched += result.matched_count
+            modified += result.modified_count
+        except BulkWriteError as e:
+            matched += e.details.get('nMatched', 0)
+            modified += e.details.get('nModified', 0)
+            for error in e.details.get('writeErrors', []):
+                failed.add(error.get('index'))
+                errors.append(error.get('errmsg', 'Write error'))
+        for index, (complaint, update_set, activity) in enumerate(entries):
+            if index not in failed:
+                changed.append((complaint, update_set))
+                activities.append(activity)
+    
+    for complaint, update_set in changed:
+        track_workload(complaint.get('assigned_to'), complaint.get('status'),
+                       update_set.get('assigned_to', complaint.get('assigned_to')),
+                       update_set.get('status', complaint.get('status')))
+        track_deadline(complaint, update_set)
+    if action == 'assign':
+        track_reassignments([(complaint['_id'], complaint.get('assigned_to'), update_set.get('assigned_to'))
+                             for complaint, update_set in changed])
+    elif action == 'priority':
+        record_classification_corrections([(complaint, 'priority', value, admin_id) for complaint, _ in changed])
+    
+    log_activities(activities)
+    
+    # Queue notification emails as one background job
+    notifications = []
+    try:
+        if action == 'assign':
+            for complaint, _ in changed:
+                if str(complaint.get('assigned_to')) != str(staff['_id']):
+                    notifications.append({
+                        'type': 'assigned',
+                        'email': staff.get('email', ''),
+                        'name': staff.get('name', 'Worker'),
+                        'complaint_id': complaint.get('complaint_id', str(complaint['_id'])),
+                        'category': complaint.get('category', ''),
+                        'location': complaint.get('location', '')
+                    })
+        elif action == 'status':
+            status_changed = [complaint for complaint, _ in changed if complaint.get('status') != value]
+            user_ids = list({complaint['user_id'] for complaint in status_changed if complaint.get('user_id')})
+            users = {user['_id']: user for user in users_db.users.find({'_id': {'$in': user_ids}}, {'name': 1, 'email': 1})}
+            for complaint in status_changed:
+                user = users.get(complaint.get('user_id'))
+                if not user:
+                    continue
+                notifications.append({
+                    'type': 'resolved' if value == 'Resolved' else 'status',
+                    'email': user.get('email', ''),
+                    'name': user.get('name', 'User'),
+                    'complaint_id': complaint.get('complaint_id', str(complaint['_id'])),
+                    'category': complaint.get('category', ''),
+                    'status': value
+                })
+        if notifications:
+            from utils.email_service import send_notifications_batch
+            jobs.submit('notifications', send_notifications_batch, params={'count': len(notifications)},
+                        user_id=session['user_id'], app=app, notifications=notifications)
+    except Exception as e:
+        logger.error("Error queueing notifications: %s", e)
+    
+    return jsonify({
+        'success': not errors,
+        'message': f'{modified} complaint(s) updated',
+        'matched': matched,
+        'modified': modified,
+        'not_found': len(complaint_ids) - len(complaints),
+        'notifications': len(notifications),
+        'errors': errors[:20]
+    })
+
+@app.route('/admin/complaints/auto-assign', methods=['POST'])
+@admin_required
+def admin_auto_assign():
+    """Assign unassigned open complaints, oldest first, to the least-loaded staff members"""
+    if complaints_db is None or users_db is None:
+        return jsonify({'success': False, 'message': 'Database connection error'}), 500
+    
+    data = request.get_json(silent=True) or {}
+    category = data.get('category', '')
+    if category and category not in app.config['COMPLAINT_CATEGORIES']:
+        return jsonify({'success': False, 'message': 'Invalid category'}), 400
+    try:
+        limit = min(int(data.get('limit') or app.config['BULK_ACTION_LIMIT']), app.config['BULK_ACTION_LIMIT'])
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Invalid limit'}), 400
+    
+    query = {'assigned_to': None, 'status': {'$nin': list(CLOSED_STATUSES)}}
+    projection = {'complaint_id': 1, 'category': 1, 'location': 1, 'status': 1,
+                  'department_code': 1, 'created_at': 1}
+    pending = []
+    for cat in ([category] if category else app.config['COMPLAINT_CATEGORIES']):
+        collection = get_category_collection(cat)
+        for complaint in collection.find(query, projection).sort('created_at', 1).limit(limit):
+            pending.append((complaint, collection))
+    pending.sort(key=lambda item: item[0].get('created_at') or datetime.min)
+    pending = pending[:limit]
+    
+    engine = get_assigner()
+    now = datetime.utcnow()
+    now = now.replace(microsecond=now.microsecond // 1000 * 1000)  # As stored, so the re-read below matches
+    admin_id = ObjectId(session['user_id'])
+    planned_by_collection = {}
+    planned = 0
+    for complaint, collection in pending:
+        staff_id = engine.choose(complaint.get('department_code'),
+                                 affinity=app.config['AUTO_ASSIGN_DEPARTMENT_AFFINITY'],
+                                 slack=app.config['AUTO_ASSIGN_AFFINITY_SLACK'])
+        if staff_id is None:
+            break
+        update_set = {'assigned_to': ObjectId(staff_id), 'assigned_at': now, 'updated_at': now, 'auto_assigned': True}
+        if complaint.get('status', 'Pending') == 'Pending':
+            update_set['status'] = 'Acknowledged'
+        planned_by_collection.setdefault(collection.name, (collection, []))[1].append((complaint, staff_id, update_set))
+        planned += 1
+    
+    if pending and not planned:
+        return jsonify({'success': False, 'message': 'No active staff members available'}), 400
+    
+    activities = []
+    assignments = []
+    per_staff = {}
+    for collection, plan in planned_by_collection.values():
+        # Only assign if nobody else did in the meantime
+        ops = [UpdateOne({'_id': complaint['_id'], 'assigned_to': None}, {'$set': update_set, '$inc': {'version': 1}})
+               for complaint, _, update_set in plan]
+        try:
+            collection.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            logger.error("Error auto-assigning in %s: %s", collection.name, e.details.get('writeErrors', [])[:3])
+        # Rows assigned concurrently by someone else (or that failed) were skipped: no
+        # tracking, activity or email for those, and their reservation goes back
+        saved = {doc['_id']: str(doc['assigned_to']) for doc in collection.find(
+            {'_id': {'$in': [complaint['_id'] for complaint, _, _ in plan]}, 'assigned_at': now},
+            {'assigned_to': 1})}
+        for complaint, staff_id, update_set in plan:
+            if saved.get(complaint['_id']) != staff_id:
+                engine.release(staff_id)
+                continue
+            roster.track(None, None, staff_id, update_set.get('status', complaint.get('status')))
+            track_deadline(complaint, update_set)
+            activities.append((complaint['_id'], 'auto_assigned', admin_id, {'assigned_to': staff_id}))
+            assignments.append((complaint, staff_id))
+            per_staff[staff_id] = per_staff.get(staff_id, 0) + 1
+    
+    log_activities(activities)
+    queue_assignment_emails(assignments)
+    
+    assigned = len(assignments)
+    return jsonify({
+        'success': bool(assigned) or not pending,
+        'message': f'{assigned} complaint(s) auto-assigned',
+        'assigned': assigned,
+        'remaining': len(pending) - assigned,
+        'per_staff': per_staff
+    })
+
 @app.route('/admin/complaint/<complaint_id>/urgent', methods=['POST'])
 @admin_required
 def admin_toggle_urgent(complaint_id):
@@ -1813,7 +2907,7 @@ def admin_toggle_urgent(complaint_id):
         
         category_collection.update_one(
             {'_id': ObjectId(complaint_id)},
-            {'$set': update_data}
+            {'$set': update_data, '$inc': {'version': 1}}
         )
         
         log_activity(complaint_id, 'urgent_toggled', session['user_id'], {'is_urgent': is_urgent})
@@ -1822,6 +2916,150 @@ def admin_toggle_urgent(complaint_id):
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
+@app.route('/admin/complaint/<complaint_id>/merge', methods=['POST'])
+@admin_required
+def admin_merge_complaint(complaint_id):
+    """Merge a duplicate into its parent complaint: the duplicate is closed and linked to the parent"""
+    if complaints_db is None:
+        return jsonify({'success': False, 'message': 'Database connection error'}), 500
+    
+    data = request.get_json(silent=True) or {}
+    complaint, category_collection = get_complaint_from_all_collections(complaint_id)
+    if not complaint or category_collection is None:
+        return jsonify({'success': False, 'message': 'Complaint not found'}), 404
+    if complaint.get('duplicate_of'):
+        return jsonify({'success': False, 'message': 'Complaint is already merged'}), 400
+    
+    parent_id = data.get('parent_id') or complaint.get('possible_duplicate_of')
+    if not parent_id:
+        return jsonify({'success': False, 'message': 'Parent complaint is required'}), 400
+    parent, parent_collection = get_complaint_from_all_collections(str(parent_id))
+    if parent and parent.get('duplicate_of'):
+        # Merge into the root so duplicates never chain
+        parent, parent_collection = get_complaint_from_all_collections(str(parent['duplicate_of']))
+    if not parent or parent_collection is None:
+        return jsonify({'success': False, 'message': 'Parent complaint not found'}), 404
+    if parent['_id'] == complaint['_id']:
+        return jsonify({'success': False, 'message': 'A complaint cannot be merged into itself'}), 400
+    
+    now = datetime.utcnow()
+    admin_id = ObjectId(session['user_id'])
+    comment = {
+        'comment': f"Merged into complaint {parent.get('complaint_id')} as a duplicate",
+        'user_name': session.get('user_name', 'Admin'),
+        'user_role': 'admin',
+        'timestamp': now
+    }
+    result = category_collection.update_one(
+        {'_id': complaint['_id'], 'duplicate_of': None},
+        {
+            '$set': dict({'status': 'Closed', 'duplicate_of': parent['_id'], 'merged_at': now,
+                          'merged_by': admin_id, 'updated_at': now},
+                         **resolution_changes(complaint.get('status'), 'Closed', now)),
+            '$unset': {'possible_duplicate_of': '', 'duplicate_score': ''},
+            '$push': {'comments': comment},
+            '$inc': {'version': 1}
+        }
+    )
+    if result.modified_count == 0:
+        return jsonify({'success': False, 'message': 'Complaint is already merged'}), 409
+    parent_collection.update_one(
+        {'_id': parent['_id']},
+        {'$addToSet': {'duplicates': complaint['_id']}, '$set': {'updated_at': now}, '$inc': {'version': 1}}
+    )
+    
+    track_workload(complaint.get('assigned_to'), complaint.get('status'), complaint.get('assigned_to'), 'Closed')
+    track_deadline(complaint, {'status': 'Closed'})
+    log_activities([
+        (complaint['_id'], 'merged_into', admin_id, {'parent': parent.get('complaint_id')}),
+        (parent['_id'], 'duplicate_merged', admin_id, {'duplicate': complaint.get('complaint_id')})
+    ])
+    
+    # Let the citizen know their complaint is tracked under the parent
+    try:
+        user = users_db.users.find_one({'_id': complaint.get('user_id')}, {'email': 1, 'name': 1})
+        if user and user.get('email'):
+            from utils.email_service import send_notifications_batch
+            jobs.submit('notifications', send_notifications_batch, params={'count': 1},
+                        user_id=session.get('user_id'), app=app, notifications=[{
+                            'type': 'status',
+                            'email': user['email'],
+                            'name': user.get('name', 'User'),
+                            'complaint_id': complaint.get('complaint_id'),
+                            'status': f"Closed (merged into {parent.get('complaint_id')})"
+                        }])
+    except Exception as e:
+        logger.error("Error queueing merge notification: %s", e)
+    
+    return jsonify({'success': True, 'message': f"Merged into {parent.get('complaint_id')}",
+                    'parent_id': str(parent['_id'])})
+
+@app.route('/admin/complaint/<complaint_id>/not-duplicate', methods=['POST'])
+@admin_required
+def admin_dismiss_duplicate(complaint_id):
+    """Clear a probable-duplicate flag; the complaint becomes a merge target itself"""
+    if complaints_db is None:
+        return jsonify({'success': False, 'message': 'Database connection error'}), 500
+    
+    complaint, category_collection = get_complaint_from_all_collections(complaint_id)
+    if not complaint or category_collection is None:
+        return jsonify({'success': False, 'message': 'Complaint not found'}), 404
+    if not complaint.get('possible_duplicate_of'):
+        return jsonify({'success': False, 'message': 'Complaint is not flagged as a duplicate'}), 400
+    
+    category_collection.update_one(
+        {'_id': complaint['_id']},
+        {'$unset': {'possible_duplicate_of': '', 'duplicate_score': ''},
+         '$set': {'updated_at': datetime.utcnow()}, '$inc': {'version': 1}}
+    )
+    log_activity(complaint['_id'], 'duplicate_dismissed', session['user_id'],
+                 {'possible_duplicate_of': str(complaint['possible_duplicate_of'])})
+    if is_open(complaint.get('status')) and get_duplicate_index().loaded:
+        duplicates.add(complaint.get('category'), complaint)
+    
+    return jsonify({'success': True, 'message': 'Duplicate flag cleared'})
+
+@app.route('/admin/complaint/<complaint_id>/category', methods=['POST'])
+@admin_required
+def admin_change_category(complaint_id):
+    """Move a miscategorized complaint to the right category collection and department"""
+    if complaints_db is None:
+        return jsonify({'success': False, 'message': 'Database connection error'}), 500
+    
+    data = request.get_json(silent=True) or {}
+    category = data.get('category')
+    if category not in app.config['COMPLAINT_CATEGORIES']:
+        return jsonify({'success': False, 'message': 'Invalid category'}), 400
+    complaint, category_collection = get_complaint_from_all_collections(complaint_id)
+    if not complaint or category_collection is None:
+        return jsonify({'success': False, 'message': 'Complaint not found'}), 404
+    target_collection = get_category_collection(category)
+    if target_collection.name == category_collection.name:
+        return jsonify({'success': False, 'message': 'Complaint is already in this category'}), 400
+    
+    now = datetime.utcnow()
+    department_info = app.config['DEPARTMENTS'].get(category, app.config['DEPARTMENTS'].get('Other', {'name': 'General Department', 'code': 'GEN'}))
+    moved = dict(complaint, category=category, updated_at=now, version=complaint.get('version', 1) + 1,
+                 department=department_info.get('name', 'General Department'),
+                 department_code=department_info.get('code', 'GEN'))
+    target_collection.insert_one(moved)
+    # Only remove the original if nobody changed it meanwhile; otherwise undo the copy
+    result = category_collection.delete_one({'_id': complaint['_id'], 'version': complaint.get('version')})
+    if result.deleted_count == 0:
+        target_collection.delete_one({'_id': complaint['_id']})
+        return jsonify({'success': False, 'message': 'Complaint was modified, please reload and try again'}), 409
+    
+    record_classification_corrections([(complaint, 'category', category, session['user_id'])])
+    if duplicates.loaded:
+        duplicates.remove(complaint.get('category'), complaint['_id'])
+        if is_open(complaint.get('status')) and not complaint.get('possible_duplicate_of') and not complaint.get('duplicate_of'):
+            duplicates.add(category, moved)
+    track_deadline(moved)
+    log_activity(complaint['_id'], 'category_changed', session['user_id'],
+                 {'from': complaint.get('category'), 'to': category})
+    
+    return jsonify({'success': True, 'message': f'Complaint moved to {category}'})
+
 @app.route('/admin/analytics')
 @admin_required
 def admin_analytics():
@@ -1862,7 +3100,8 @@ def admin_analytics():
         monthly_data[month_name] = count
     
     # Resolution time (average days to resolve, across all category collections)
-    resolved_complaints = query_all_category_collections({'status': 'Resolved'})
+    resolved_complaints = query_all_category_collections({'status': 'Resolved'},
+                                                         projection={'created_at': 1, 'updated_at': 1})
     resolution_times = []
     for complaint in resolved_complaints:
         if complaint.get('created_at') and complaint.get('updated_at'):
@@ -1881,6 +3120,62 @@ def admin_analytics():
     
     return render_template('admin_analytics.html', analytics=analytics_data)
 
+@app.route('/admin/reports')
+@admin_required
+def admin_reports():
+    """Department performance reports (cached PDFs)"""
+    reports = list_cached_reports(app.config['REPORTS_FOLDER'])
+    default_month = (datetime.utcnow().replace(day=1) - timedelta(days=1)).strftime('%Y-%m')
+    return render_template('admin_reports.html', reports=reports, default_month=default_month)
+
+@app.route('/admin/reports/generate', methods=['POST'])
+@admin_required
+def admin_generate_report():
+    """Serve a cached report or start a background job to build it"""
+    if complaints_db is None:
+        return jsonify({'success': False, 'message': 'Database connection error'}), 500
+    
+    data = request.get_json(silent=True) or {}
+    month = data.get('month') or request.form.get('month', '')
+    try:
+        month_range(month)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Month must be in YYYY-MM format'}), 400
+    
+    collections = [get_category_collection(cat) for cat in app.config['COMPLAINT_CATEGORIES']]
+    filename = report_filename('department_performance', month, data_version(collections))
+    if os.path.exists(os.path.join(app.config['REPORTS_FOLDER'], filename)):
+        cache_lookups.inc('report', 'hit')
+        return jsonify({'success': True, 'ready': True,
+                        'url': url_for('admin_download_report', filename=filename)})
+    
+    cache_lookups.inc('report', 'miss')
+    
+    # Reuse a job that is already building the same report
+    for job in jobs.list_jobs('report'):
+        if job.get('params', {}).get('filename') == filename and job.get('status') in ('queued', 'running'):
+            return jsonify({'success': True, 'ready': False, 'job_id': str(job['_id'])})
+    
+    job_id = jobs.submit('report', run_performance_report,
+                         params={'month': month, 'filename': filename},
+                         user_id=session['user_id'],
+                         collections=collections,
+                         month=month,
+                         filename=filename,
+                         reports_folder=app.config['REPORTS_FOLDER'])
+    return jsonify({'success': True, 'ready': False, 'job_id': job_id})
+
+@app.route('/admin/reports/download/<filename>')
+@admin_required
+def admin_download_report(filename):
+    """Download a generated report"""
+    filename = secure_filename(filename)
+    filepath = os.path.abspath(os.path.join(app.config['REPORTS_FOLDER'], filename))
+    if not os.path.exists(filepath):
+        flash('Report not found', 'warning')
+        return redirect(url_for('admin_reports'))
+    return send_file(filepath, mimetype='application/pdf', as_attachment=True, download_name=filename)
+
 @app.route('/admin/staff')
 @admin_required
 def admin_staff():
@@ -1889,13 +3184,16 @@ def admin_staff():
         flash('Database connection error', 'danger')
         return redirect(url_for('index'))
     
-    staff_members = list(users_db.users.find({'role': {'$in': ['admin', 'staff']}}))
+    # Rendered from the roster cache instead of counting every collection per member
+    staff_members = get_roster().members()
     for staff in staff_members:
-        staff['_id'] = str(staff['_id'])
-        # Get assigned complaints count (across all category collections)
-        staff['assigned_complaints'] = count_all_category_collections({'assigned_to': ObjectId(staff['_id'])})
+        staff['assigned_complaints'] = staff['counts']['assigned']
+        staff['open_complaints'] = staff['counts']['open']
+        staff['in_progress_complaints'] = staff['counts']['in_progress']
+        staff['resolved_complaints'] = staff['counts']['resolved']
     
-    return render_template('admin_staff.html', staff_members=staff_members)
+    departments = sorted({(info['code'], info['name']) for info in app.config['DEPARTMENTS'].values()})
+    return render_template('admin_staff.html', staff_members=staff_members, departments=departments)
 
 @app.route('/admin/staff/add', methods=['POST'])
 @admin_required
@@ -1910,6 +3208,8 @@ def admin_add_staff():
         email = request.form.get('email', '').strip().lower()
         phone = request.form.get('phone', '').strip()
         password = request.form.get('password', '').strip()
+        valid_codes = {info.get('code') for info in app.config['DEPARTMENTS'].values()}
+        departments = [code for code in request.form.getlist('departments') if code in valid_codes]
         
         # Validation
         if not staff_id or not name or not email or not password:
@@ -1926,6 +3226,7 @@ def admin_add_staff():
             return jsonify({'success': False, 'message': 'Email already registered'}), 400
         
         # Hash password
+        import bcrypt
         hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
         
         # Create staff member
@@ -1936,6 +3237,7 @@ def admin_add_staff():
             'phone': phone if phone else '',
             'password': hashed_password,
             'role': 'staff',
+            'departments': departments,  # Department codes for auto-assignment affinity (empty = any)
             'created_at': datetime.utcnow(),
             'is_active': True,
             'profile': {}
@@ -1944,6 +3246,8 @@ def admin_add_staff():
         result = users_db.users.insert_one(staff_data)
         
         if result.inserted_id:
+            roster.upsert_member(dict(staff_data, _id=result.inserted_id))
+            assigner.add_staff(result.inserted_id, departments)
             # Log activity
             log_activity(str(result.inserted_id), 'staff_created', ObjectId(session['user_id']), {'staff_id': staff_id, 'name': name})
             return jsonify({'success': True, 'message': 'Staff member created successfully'})
@@ -1951,9 +3255,7 @@ def admin_add_staff():
             return jsonify({'success': False, 'message': 'Failed to create staff member'}), 500
             
     except Exception as e:
-        print(f"Error creating staff member: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error creating staff member: %s", e)
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @app.route('/admin/users')
@@ -2016,13 +3318,14 @@ def staff_dashboard():
     resolved = count_all_category_collections({'assigned_to': staff_id, 'status': 'Resolved'})
     
     # Get recent assigned complaints (across all category collections)
-    recent_complaints = query_all_category_collections({'assigned_to': staff_id}, sort=('created_at', -1), limit=10)
+    recent_complaints = query_all_category_collections({'assigned_to': staff_id}, sort=('created_at', -1), limit=10,
+                                                       projection=get_projection('list_row'))
     
     for complaint in recent_complaints:
         complaint['_id'] = str(complaint['_id'])
         complaint['user_id'] = str(complaint['user_id'])
         complaint['age'] = get_complaint_age(complaint.get('created_at'))
-        complaint['sla_breached'] = is_sla_breached(complaint.get('sla_deadline'))
+        complaint['sla_breached'] = complaint.get('sla_breached', False)
         
         # Get user info
         user = users_db.users.find_one({'_id': ObjectId(complaint['user_id'])})
@@ -2067,12 +3370,7 @@ def worker_update_status():
         if 'proof_image' in request.files:
             file = request.files['proof_image']
             if file and file.filename and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-                filename = f"proof_{timestamp}_{filename}"
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                file.save(filepath)
-                proof_path = f"uploads/{filename}"
+                proof_path = save_upload(file, prefix='proof_')
         
         old_status = complaint.get('status')
         
@@ -2081,6 +3379,7 @@ def worker_update_status():
             'status': status,
             'updated_at': datetime.utcnow()
         }
+        update_data.update(resolution_changes(old_status, status, update_data['updated_at']))
         
         if proof_path:
             if 'proof_images' not in complaint:
@@ -2095,8 +3394,10 @@ def worker_update_status():
         
         category_collection.update_one(
             {'_id': ObjectId(complaint_id)},
-            {'$set': update_data}
+            {'$set': update_data, '$inc': {'version': 1}}
         )
+        track_workload(worker_id, old_status, worker_id, status)
+        track_deadline(complaint, {'status': status})
         
         # Add comment/note
         if comment:
@@ -2109,7 +3410,7 @@ def worker_update_status():
             })
             category_collection.update_one(
                 {'_id': ObjectId(complaint_id)},
-                {'$set': {'comments': comments}}
+                {'$set': {'comments': comments}, '$inc': {'version': 1}}
             )
         
         # Add to progress log
@@ -2123,7 +3424,7 @@ def worker_update_status():
         })
         category_collection.update_one(
             {'_id': ObjectId(complaint_id)},
-            {'$set': {'progress': progress}}
+            {'$set': {'progress': progress}, '$inc': {'version': 1}}
         )
         
         # Send email notification if resolved
@@ -2139,7 +3440,7 @@ def worker_update_status():
                         complaint.get('category', '')
                     )
             except Exception as e:
-                print(f"Email notification error: {e}")
+                logger.warning("Email notification error: %s", e)
         
         # Log activity
         log_activity(complaint_id, 'worker_status_update', worker_id, {'status': status, 'has_proof': bool(proof_path)})
@@ -2171,14 +3472,15 @@ def staff_complaints():
     # Get complaints (across all category collections)
     total = count_all_category_collections(query)
     skip = (page - 1) * app.config['ITEMS_PER_PAGE']
-    complaints = query_all_category_collections(query, sort=('created_at', -1), skip=skip, limit=app.config['ITEMS_PER_PAGE'])
+    complaints = query_all_category_collections(query, sort=('created_at', -1), skip=skip, limit=app.config['ITEMS_PER_PAGE'],
+                                                projection=get_projection('staff_row'))
     
     # Convert ObjectIds and enrich data
     for complaint in complaints:
         complaint['_id'] = str(complaint['_id'])
         complaint['user_id'] = str(complaint['user_id'])
         complaint['age'] = get_complaint_age(complaint.get('created_at'))
-        complaint['sla_breached'] = is_sla_breached(complaint.get('sla_deadline'))
+        complaint['sla_breached'] = complaint.get('sla_breached', False)
         
         # Handle photo/image_path field
         if 'image_path' in complaint and not complaint.get('photo'):
@@ -2267,7 +3569,7 @@ def complaint_feedback(complaint_id):
             
             category_collection.update_one(
                 {'_id': ObjectId(complaint_id)},
-                {'$set': {'feedback': feedback_data}}
+                {'$set': {'feedback': feedback_data}, '$inc': {'version': 1}}
             )
             
             # Log activity
@@ -2281,52 +3583,373 @@ def complaint_feedback(complaint_id):
                              complaint_id=complaint_id,
                              complaint=complaint)
     except Exception as e:
-        print(f"Error in complaint_feedback: {e}")
+        logger.error("Error in complaint_feedback: %s", e)
         flash('Error loading feedback page', 'danger')
         return redirect(url_for('dashboard'))
 
+# ==================== UPLOAD ROUTES ====================
+
+@app.route('/uploads/<path:filename>')
+@login_required
+def uploaded_file(filename):
+    """Serve an uploaded file from the storage backend"""
+    stream = storage.get_stream(filename)
+    if stream is None:
+        return jsonify({'success': False, 'message': 'File not found'}), 404
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    return send_file(stream, mimetype=mimetype, download_name=os.path.basename(filename), max_age=86400)
+
 # API Routes
 @app.route('/api/complaint/<complaint_id>')
 @login_required
 def api_get_complaint(complaint_id):
     """API to get complaint details"""
+    fields = request.args.get('fields', '')
+    profile = request.args.get('profile', 'detail')
     try:
-        complaint, _ = get_complaint_from_all_collections(complaint_id)
+        projection = parse_fields_param(fields) if fields else get_projection(profile)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    try:
+        validators, category_collection = get_complaint_from_all_collections(complaint_id, projection=VALIDATOR_FIELDS)
+        if not validators:
+            return jsonify({'success': False}), 404
+        
+        etag = complaint_etag(validators, fields or profile)
+        if is_not_modified(etag, validators.get('updated_at')):
+            return not_modified_response(etag, validators.get('updated_at'))
+        
+        complaint = category_collection.find_one({'_id': validators['_id']}, projection)
         if not complaint:
             return jsonify({'success': False}), 404
         
         complaint['_id'] = str(complaint['_id'])
         complaint['user_id'] = str(complaint['user_id'])
         
-        return jsonify({'success': True, 'complaint': complaint})
+        response = jsonify({'success': True, 'complaint': complaint})
+        return set_validators(response, etag, validators.get('updated_at'))
     except:
         return jsonify({'success': False}), 400
 
-if __name__ == '__main__':
-    if users_db is None or complaints_db is None:
-        print("\n⚠️  WARNING: Cannot start application without MongoDB connection!")
-        print("Please set up MongoDB before running the application.\n")
-        exit(1)
-    
-    # Verify database connections are working
+@app.route('/api/deadlines')
+@login_required
+def api_deadlines():
+    """
+    Next SLA deadlines for a staff member (default: yourself) or a department
+    Read from the answering worker's in-memory scheduler, which only sees that worker's own
+    writes right away; changes made through other workers show up once it reloads or an
+    alert re-reads the complaint, so answers can differ between workers
+    """
+    role = session.get('user_role')
+    if role not in ('staff', 'admin'):
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+    
+    staff_id = request.args.get('staff_id', '')
+    department = request.args.get('department', '')
+    if role == 'staff':
+        # Staff only see their own queue
+        staff_id, department = session['user_id'], ''
+    elif not staff_id and not department:
+        return jsonify({'success': False, 'message': 'staff_id or department is required'}), 400
     try:
-        users_db.command('ping')
-        complaints_db.command('ping')
-        print("✓ Database connections verified")
-        print(f"  - Users Database: {app.config['USERS_DATABASE_NAME']}")
-        print(f"  - Complaints Database: {app.config['COMPLAINTS_DATABASE_NAME']}")
-    except Exception as e:
-        print(f"✗ Database connection verification failed: {e}")
-        exit(1)
+        limit = max(1, min(int(request.args.get('limit', 10)), 100))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid limit'}), 400
+    
+    now = datetime.utcnow()
+    upcoming = get_deadlines().next_deadlines(staff_id=staff_id or None, department_code=department or None,
+                                              limit=limit, now=now)
+    for entry in upcoming:
+        entry['hours_left'] = round((entry['sla_deadline'] - now).total_seconds() / 3600.0, 1)
+        entry['assigned_to'] = str(entry['assigned_to']) if entry.get('assigned_to') else None
+        entry['sla_deadline'] = entry['sla_deadline'].isoformat()
+    # pid: the answer comes from this worker's scheduler (see the docstring)
+    return jsonify({'success': True, 'deadlines': upcoming, 'pid': os.getpid()})
+
+def geo_query_filter():
+    """Status/category filter shared by the geospatial APIs (?status=open|all|<status>, ?category=)"""
+    status = request.args.get('status', 'open')
+    query = {}
+    if status == 'open':
+        query['status'] = {'$in': get_open_statuses()}
+    elif status != 'all':
+        if status not in app.config['STATUS_OPTIONS']:
+            raise ValueError('Invalid status')
+        query['status'] = status
+    categories = app.config['COMPLAINT_CATEGORIES']
+    category = request.args.get('category', '')
+    if category:
+        if category not in categories:
+            raise ValueError('Invalid category')
+        categories = [category]
+    return query, [get_category_collection(name) for name in categories]
+
+def geo_results(complaints):
+    """JSON-ready complaint summaries"""
+    for complaint in complaints:
+        for field in ('_id', 'user_id', 'assigned_to'):
+            if complaint.get(field):
+                complaint[field] = str(complaint[field])
+        if 'distance' in complaint:
+            complaint['distance'] = round(complaint['distance'], 1)
+    return complaints
+
+@app.route('/api/complaints/nearby')
+@login_required
+def api_complaints_nearby():
+    """Complaints within ?radius= metres of ?lat=&lng=, nearest first"""
+    if session.get('user_role') not in ('staff', 'admin'):
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+    if complaints_db is None:
+        return jsonify({'success': False, 'message': 'Database connection error'}), 500
+    try:
+        point = parse_point(request.args.get('lat', ''), request.args.get('lng', ''))
+        radius = float(request.args.get('radius', 500))
+        if not 0 < radius <= app.config['GEO_NEARBY_MAX_RADIUS']:
+            raise ValueError(f"radius must be between 0 and {app.config['GEO_NEARBY_MAX_RADIUS']} metres")
+        limit = max(1, min(int(request.args.get('limit', 50)), app.config['GEO_RESULTS_LIMIT']))
+        query, collections = geo_query_filter()
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    complaints = find_nearby(collections, point, radius, query, get_projection('api_summary'), limit)
+    return jsonify({'success': True, 'complaints': geo_results(complaints)})
+
+@app.route('/api/complaints/within', methods=['GET', 'POST'])
+@login_required
+def api_complaints_within():
+    """Complaints inside a ward (?ward=) or a posted GeoJSON polygon ({"geometry": ...})"""
+    if session.get('user_role') not in ('staff', 'admin'):
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+    if complaints_db is None:
+        return jsonify({'success': False, 'message': 'Database connection error'}), 500
+    try:
+        ward_name = request.args.get('ward', '')
+        if ward_name:
+            ward = complaints_db.wards.find_one({'name': ward_name}, {'geo': 1})
+            if not ward:
+                return jsonify({'success': False, 'message': 'Ward not found'}), 404
+            geometry = ward['geo']
+        else:
+            geometry = validate_polygon((request.get_json(silent=True) or {}).get('geometry'))
+        limit = max(1, min(int(request.args.get('limit', 100)), app.config['GEO_RESULTS_LIMIT']))
+        query, collections = geo_query_filter()
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    complaints, total = find_within(collections, geometry, query, get_projection('api_summary'), limit)
+    return jsonify({'success': True, 'total': total, 'complaints': geo_results(complaints)})
+
+@app.route('/api/complaints/hotspots')
+@admin_required
+def api_complaint_hotspots():
+    """Complaint counts per geohash cell for the admin map (?precision=, ?days=, ?bbox=minLng,minLat,maxLng,maxLat)"""
+    if complaints_db is None:
+        return jsonify({'success': False, 'message': 'Database connection error'}), 500
+    try:
+        precision = int(request.args.get('precision', app.config['GEO_HOTSPOT_PRECISION']))
+        if not 1 <= precision <= 9:
+            raise ValueError('precision must be between 1 and 9')
+        days = int(request.args.get('days', app.config['GEO_HOTSPOT_DAYS']))
+        limit = max(1, min(int(request.args.get('limit', 100)), app.config['GEO_RESULTS_LIMIT']))
+        query, collections = geo_query_filter()
+        if days > 0:
+            query['created_at'] = {'$gte': datetime.utcnow() - timedelta(days=days)}
+        bbox = request.args.get('bbox', '')
+        if bbox:
+            values = bbox.split(',')
+            if len(values) != 4:
+                raise ValueError('bbox must be minLng,minLat,maxLng,maxLat')
+            min_lng, min_lat, max_lng, max_lat = [float(value) for value in values]
+            query['geo'] = {'$geoWithin': {'$geometry': bbox_polygon(min_lng, min_lat, max_lng, max_lat)}}
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    cells = hotspots(collections, precision, query, limit)
+    return jsonify({'success': True, 'precision': precision, 'cells': cells})
+
+@app.route('/api/wards')
+@login_required
+def api_wards():
+    """Ward names available to ?ward= queries"""
+    if complaints_db is None:
+        return jsonify({'success': False, 'message': 'Database connection error'}), 500
+    return jsonify({'success': True, 'wards': sorted(ward['name'] for ward in complaints_db.wards.find({}, {'name': 1}))})
+
+@app.route('/api/staff/sync')
+@login_required
+def api_staff_sync():
+    """Delta sync: complaints assigned to you that changed since ?token=, plus ids no longer assigned to you"""
+    if session.get('user_role') != 'staff':
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+    if complaints_db is None:
+        return jsonify({'success': False, 'message': 'Database connection error'}), 500
     
-    # Initialize database structure
-    print("\n🔧 Initializing database structure...")
-    initialize_database()
+    page_size = app.config['SYNC_PAGE_SIZE']
+    try:
+        limit = max(1, min(int(request.args.get('limit', page_size)), page_size))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid limit'}), 400
     
-    # Create default admin user if doesn't exist
+    try:
+        changes, removed, token, has_more = changes_since(
+            [get_category_collection(category) for category in app.config['COMPLAINT_CATEGORIES']],
+            complaints_db.sync_tombstones,
+            ObjectId(session['user_id']),
+            token=request.args.get('token') or None,
+            limit=limit,
+            projection=get_projection('staff_sync'),
+            overlap_seconds=app.config['SYNC_OVERLAP_SECONDS'],
+            max_age_days=app.config['SYNC_TOMBSTONE_DAYS']
+        )
+    except InvalidSyncToken as e:
+        # The client should discard its copy and sync again without a token
+        return jsonify({'success': False, 'message': str(e), 'full_sync_required': True}), 410
+    
+    for complaint in changes:
+        for field in ('_id', 'user_id', 'assigned_to'):
+            if complaint.get(field):
+                complaint[field] = str(complaint[field])
+        for field in ('created_at', 'updated_at', 'assigned_at', 'sla_deadline'):
+            if isinstance(complaint.get(field), datetime):
+                complaint[field] = complaint[field].isoformat()
+    return jsonify({
+        'success': True,
+        'full_sync': not request.args.get('token'),
+        'changes': changes,
+        'removed': removed,
+        'sync_token': token,
+        'has_more': has_more
+    })
+
+@app.route('/events/dashboard')
+@login_required
+def dashboard_events():
+    """Server-Sent Events stream of complaint changes and counters for the admin/staff dashboards"""
+    role = session.get('user_role')
+    if role not in ('staff', 'admin'):
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+    if live_feed is None or not app.config['LIVE_UPDATES_ENABLED']:
+        return jsonify({'success': False, 'message': 'Live updates are disabled'}), 503
+    
+    subscriber = live_feed.subscribe(role, session['user_id'])
+    if subscriber is None:
+        # A non-200 answer makes EventSource give up instead of reconnecting; the page still works without it
+        response = jsonify({'success': False, 'message': 'Too many live dashboards open, try again later'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(app.config['SSE_MAX_STREAM_SECONDS'])
+        return response
+    heartbeat = app.config['SSE_HEARTBEAT_SECONDS']
+    max_seconds = app.config['SSE_MAX_STREAM_SECONDS']
+    
+    def generate():
+        started = datetime.utcnow()
+        try:
+            # Browsers reconnect after this many milliseconds when the stream ends
+            yield 'retry: 3000\n\n'
+            while (datetime.utcnow() - started).total_seconds() < max_seconds and not subscriber.dropped:
+                message = subscriber.get(timeout=heartbeat)
+                # Comment lines keep proxies from closing an idle connection
+                yield message if message is not None else ': heartbeat\n\n'
+        finally:
+            live_feed.unsubscribe(subscriber)
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+# ==================== HEALTH ROUTES ====================
+
+@app.route('/healthz')
+def healthz():
+    """Liveness: answers without touching the database; pool counters come from memory"""
+    response = jsonify({
+        'status': 'ok',
+        'pid': os.getpid(),
+        'uptime_seconds': round(time.monotonic() - process_started, 1),
+        'database_ready': database_status['ready'],
+        'pool': pool_monitor.snapshot(),
+        'log_records_dropped': dropped_records()
+    })
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/readyz')
+def readyz():
+    """Readiness: MongoDB round-trip latency and pool saturation; 503 while the database is unreachable"""
+    body = {'pid': os.getpid()}
+    status_code = 200
+    if not database_ready():
+        body.update(status='unavailable', error=database_status['error'])
+        status_code = 503
+    else:
+        started = time.perf_counter()
+        try:
+            client.admin.command('ping')
+            body['db_latency_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        except Exception as e:
+            body.update(status='unavailable', error=str(e))
+            status_code = 503
+    body['pool'] = pool_monitor.snapshot()
+    if status_code == 200:
+        # Still serving, but a saturated pool means requests queue for connections
+        body['status'] = 'degraded' if body['pool']['saturation'] >= app.config['HEALTH_SATURATION_WARNING'] else 'ok'
+    response = jsonify(body)
+    response.status_code = status_code
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/admin/api/db-profile')
+@admin_required
+def admin_db_profile():
+    """Database commands per route (this worker process, since it started)"""
+    return jsonify({'success': True, 'pid': os.getpid(), 'enabled': app.config['DB_TRACE_ENABLED'],
+                    'routes': command_monitor.route_summaries()})
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text format, all worker processes combined"""
+    if not app.config['METRICS_ENABLED']:
+        return make_response('Metrics are disabled', 404)
+    token = app.config['METRICS_TOKEN']
+    if not token and not app.config['DEBUG']:
+        logger.warning("/metrics refused: set METRICS_TOKEN to serve metrics outside debug mode")
+        return make_response('Metrics need METRICS_TOKEN', 403)
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return make_response('Unauthorized', 401)
+    response = make_response(metrics.render())
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/admin/profiles')
+@admin_required
+def admin_profiles():
+    """Stored request profiles with their top cumulative functions"""
+    return render_template('admin_profiles.html', profiles=profile_store.list(),
+                           enabled=app.config['PROFILING_ENABLED'])
+
+@app.route('/admin/profiles/<profile_id>/download')
+@admin_required
+def admin_download_profile(profile_id):
+    """The pstats file (open with python -m pstats or snakeviz)"""
+    path = profile_store.stats_path(profile_id)
+    if path is None:
+        flash('Profile not found', 'warning')
+        return redirect(url_for('admin_profiles'))
+    return send_file(path, mimetype='application/octet-stream', as_attachment=True,
+                     download_name=f"{profile_id}.prof")
+
+# ==================== APPLICATION FACTORY ====================
+
+def ensure_default_admin():
+    """Create the default admin user if there is no admin yet"""
     try:
         existing_admin = users_db.users.find_one({'role': 'admin'})
         if not existing_admin:
+            import bcrypt
             admin_password = bcrypt.hashpw('admin123'.encode('utf-8'), bcrypt.gensalt())
             admin_result = users_db.users.insert_one({
                 'name': 'System Administrator',
@@ -2339,36 +3962,105 @@ if __name__ == '__main__':
                 'profile': {}
             })
             if admin_result.inserted_id:
-                print("✓ Default admin user created (admin@municipal.gov / admin123)")
+                logger.info("Default admin user created (admin@municipal.gov / admin123)")
             else:
-                print("⚠️  Failed to create admin user")
+                logger.warning("Failed to create admin user")
         else:
-            print("✓ Admin user already exists")
+            logger.info("Admin user already exists")
     except Exception as e:
-        print(f"⚠️  Error creating admin user: {e}")
-        import traceback
-        traceback.print_exc()
-    
-    # Print current counts
+        logger.exception("Error creating admin user: %s", e)
+
+def start_background_tasks():
+    """Start this process's metrics flusher, SLA sweeper and deadline alerts (threads do not survive a fork)"""
+    if metrics.directory:
+        metrics_flusher.start()
+    if complaints_db is None:
+        return
+    if app.config['SLA_SWEEP_ENABLED']:
+        sla_sweeper.start()
+        logger.info("SLA sweeper running every %ss (pid %s)", app.config['SLA_SWEEP_INTERVAL'], os.getpid())
+    if app.config['SLA_ALERTS_ENABLED']:
+        # Loading reads every open deadline, so it runs on its own thread instead of delaying start-up
+        threading.Thread(target=start_deadline_alerts, name='sla-deadlines-load', daemon=True).start()
+
+def start_deadline_alerts():
+    if database_ready():
+        get_deadlines()
+    deadlines.start()
+    logger.info("SLA deadline alerts armed for %s open complaints (pid %s)", len(deadlines), os.getpid())
+
+def shutdown_background_tasks(timeout=None):
+    """Stop background threads, then let queued jobs (e.g. notification emails) finish"""
+    timeout = app.config['SHUTDOWN_TIMEOUT'] if timeout is None else timeout
+    sla_sweeper.stop(timeout)
+    deadlines.stop(timeout)
+    if live_feed is not None:
+        live_feed.stop(timeout)
+    jobs.shutdown(wait=True)
+    metrics_flusher.stop(timeout)
     try:
-        user_count = users_db.users.count_documents({})
-        complaint_count = count_all_category_collections({})
-        print(f"✓ Total users in users database: {user_count}")
-        print(f"✓ Total complaints across all category collections: {complaint_count}")
-        # Print counts per category
-        for category in app.config['COMPLAINT_CATEGORIES']:
-            category_collection = get_category_collection(category)
-            if category_collection is not None:
-                cat_count = category_collection.count_documents({})
-                if cat_count > 0:
-                    print(f"  - {category}: {cat_count} complaints")
-    except Exception as e:
-        print(f"⚠️  Could not count records: {e}")
+        metrics.flush()  # Final counts, kept in the totals after this worker exits
+    except OSError as e:
+        logger.error("Error writing metrics: %s", e)
+    logger.info("Background work flushed (pid %s)", os.getpid())
+
+def reconnect_after_fork():
+    """
+    Give a forked worker its own MongoClient and the objects built on it
+    No-op in the process that opened the connection
+    """
+    global client, users_db, complaints_db, db, connected_pid, storage, jobs, live_feed
+    if connected_pid == os.getpid():
+        return
+    pool_monitor.reset()
+    command_monitor.reset()
+    metrics.reset()
+    client, users_db, complaints_db = open_database()
+    db = complaints_db
+    connected_pid = os.getpid()
+    database_status.update(ready=False, checked_at=None, error=None)
+    storage = create_storage_backend(app.config, complaints_db)
+    jobs = JobManager(complaints_db.jobs if complaints_db is not None else None,
+                      max_workers=app.config['JOB_WORKERS'])
+    live_feed = create_live_feed()
+
+def create_app(start_background=True):
+    """
+    Prepare the application for serving (WSGI servers call this once per process,
+    or once in the master with preloading) and return it
+    Routes are registered on the module-level app, so every call returns that app
+    """
+    if database_ready():
+        initialize_database()
+        ensure_default_admin()
+    else:
+        # Requests get 503 until the database answers; initialization runs then
+        logger.warning("MongoDB is not available yet; serving 503 until it is")
+        database_status['initialize'] = True
+    if start_background:
+        # A single serving process: metrics files of earlier runs are stale (gunicorn clears them in on_starting)
+        metrics.clear_directory()
+        start_background_tasks()
+        atexit.register(shutdown_background_tasks)
+    return app
+
+if __name__ == '__main__':
+    # Development server only; in production run a WSGI server:
+    #   gunicorn -c gunicorn.conf.py wsgi:application   (Linux/Mac)
+    #   python wsgi.py                                  (waitress, Windows)
+    # Collection counts: flask db-stats
+    if not database_ready():
+        print("\n⚠️  WARNING: Cannot start application without MongoDB connection!")
+        print("Please set up MongoDB before running the application.\n")
+        exit(1)
+    
+    create_app()
     
-    print("\n🚀 Starting Flask application...")
+    debug = app.config['DEBUG']
+    print("\n🚀 Starting Flask development server...")
     print("📍 Server running at: http://localhost:5000")
     print("📖 Default admin: admin@municipal.gov / admin123")
-    print("💡 Debug mode: ON - Check console for registration errors")
+    print(f"💡 Debug mode: {'ON' if debug else 'OFF'} (set FLASK_DEBUG=1 to enable)")
     print("\n💡 Tip: If you see socket errors on Windows, they're harmless")
     print("   and won't affect the application functionality.\n")
     
@@ -2376,9 +4068,7 @@ if __name__ == '__main__':
     # use_reloader=False prevents socket errors on Windows with the reloader
     # threaded=True allows handling multiple requests simultaneously
     # For Windows, disabling reloader prevents the common WinError 10038
-    import os
     if os.name == 'nt':  # Windows
-        app.run(debug=True, host='0.0.0.0', port=5000, use_reloader=False, threaded=True)
+        app.run(debug=debug, host='0.0.0.0', port=5000, use_reloader=False, threaded=True)
     else:  # Linux/Mac
-        app.run(debug=True, host='0.0.0.0', port=5000, threaded=True)
-
+        app.run(debug=debug, host='0.0.0.0', port=5000, threaded=True)
@@ -0,0 +1,140 @@
+"""
+Auto-Assignment
+Keeps a live open-workload counter per staff member and hands complaints to
+the least-loaded eligible one. Staff sit in min-heaps (one for everybody and
+one per department code they are tied to) with lazy invalidation, so picking
+a staff member and updating a counter are both O(log n)
+
+Counters are per process and seeded from the staff roster (utils.roster),
+which reconciles them with the database periodically. New staff become
+eligible straight away (add_staff); staff who are deactivated or deleted
+directly in the database stop being offered only at the next reconcile
+"""
+import heapq
+import itertools
+import threading
+
+CLOSED_STATUSES = ('Resolved', 'Closed', 'Rejected')
+ALL_STAFF = None
+
+
+def is_open(status):
+    """True if a complaint in this status still counts towards workload"""
+    return (status or 'Pending') not in CLOSED_STATUSES
+
+
+class AssignmentEngine:
+    """Least-loaded staff selection with optional department affinity"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self._load = {}         # staff_id -> open complaints
+        self._departments = {}  # staff_id -> department codes (empty = any department)
+        self._heaps = {}        # department code (or ALL_STAFF) -> [(load, seq, staff_id)]
+        self._members = {}      # department code (or ALL_STAFF) -> staff ids in that heap
+
+    # ---- loading ----
+
+    def rebuild(self, workloads):
+        """Reset counters from (staff_id, open complaints, department codes) tuples"""
+        with self._lock:
+            self._load = {}
+            self._departments = {}
+            self._heaps = {}
+            self._members = {}
+            for staff_id, load, departments in workloads:
+                staff_id = str(staff_id)
+                self._load[staff_id] = load
+                self._departments[staff_id] = set(departments or [])
+                for key in self._keys(staff_id):
+                    self._members.setdefault(key, set()).add(staff_id)
+                    self._push(key, staff_id)
+        return len(workloads)
+
+    def add_staff(self, staff_id, departments=None):
+        """Make a new (or re-activated) staff member eligible immediately"""
+        staff_id = str(staff_id)
+        with self._lock:
+            self._load.setdefault(staff_id, 0)
+            self._departments[staff_id] = set(departments or [])
+            for key in self._keys(staff_id):
+                self._members.setdefault(key, set()).add(staff_id)
+                self._push(key, staff_id)
+
+    # ---- heap internals (caller holds the lock) ----
+
+    def _keys(self, staff_id):
+        return [ALL_STAFF] + sorted(self._departments.get(staff_id, ()))
+
+    def _push(self, key, staff_id):
+        heap = self._heaps.setdefault(key, [])
+        heapq.heappush(heap, (self._load[staff_id], next(self._counter), staff_id))
+        # Stale entries pile up as counters change; rebuild once they dominate
+        if len(heap) > 4 * len(self._members.get(key, ())) + 16:
+            self._heaps[key] = [(self._load[member], next(self._counter), member)
+                                for member in self._members.get(key, ())]
+            heapq.heapify(self._heaps[key])
+
+    def _peek(self, key):
+        heap = self._heaps.get(key)
+        while heap:
+            load, _, staff_id = heap[0]
+            if staff_id in self._members.get(key, ()) and self._load.get(staff_id) == load:
+                return staff_id
+            heapq.heappop(heap)
+        return None
+
+    def _change(self, staff_id, delta):
+        if staff_id not in self._load:
+            return
+        self._load[staff_id] = max(self._load[staff_id] + delta, 0)
+        for key in self._keys(staff_id):
+            self._push(key, staff_id)
+
+    # ---- public API ----
+
+    def choose(self, department_code=None, affinity=True, slack=None):
+        """
+        Reserve the least-loaded staff member and return their id (or None)
+        Staff tied to department_code are preferred while their workload is
+        within slack of the least-loaded staff member overall (no limit if
+        slack is None). The counter is incremented straight away so
+        concurrent callers spread out; call release() if the assignment fails
+        """
+        with self._lock:
+            staff_id = self._peek(ALL_STAFF)
+            if affinity and department_code and staff_id is not None:
+                specialist = self._peek(department_code)
+                if specialist is not None and (slack is None or
+                                               self._load[specialist] <= self._load[staff_id] + slack):
+                    staff_id = specialist
+            if staff_id is not None:
+                self._change(staff_id, 1)
+            return staff_id
+
+    def release(self, staff_id):
+        """Undo a choose() whose assignment was not saved"""
+        with self._lock:
+            self._change(str(staff_id), -1)
+
+    def track(self, old_assigned, old_status, new_assigned, new_status):
+        """Update counters for a complaint whose assignee and/or status changed"""
+        old_key = str(old_assigned) if old_assigned and is_open(old_status) else None
+        new_key = str(new_assigned) if new_assigned and is_open(new_status) else None
+        if old_key == new_key:
+            return
+        with self._lock:
+            if old_key:
+                self._change(old_key, -1)
+            if new_key:
+                self._change(new_key, 1)
+
+    def workload(self, staff_id):
+        with self._lock:
+            return self._load.get(str(staff_id), 0)
+
+    def snapshot(self):
+        """staff_id -> open complaints"""
+        with self._lock:
+            return dict(self._load)
@@ -0,0 +1,308 @@
+"""
+Complaint Classifier
+TF-IDF features over the location and description with two softmax
+(multinomial logistic regression) heads, one for category and one for
+priority. Trained offline from historical complaints ('flask
+train-classifier'), saved as a single .npz file and loaded once per process.
+Prediction is a handful of vector operations on the complaint's own
+features, well under a millisecond
+
+NumPy is optional (and only imported once a model is used): without it the
+classifier stays disabled
+"""
+import json
+import logging
+import math
+import os
+import re
+import threading
+from datetime import datetime
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+np = None  # NumPy is imported on first use (see is_available); it is slow to import
+
+_WORD = re.compile(r'[a-z0-9]+')
+STOP_WORDS = frozenset(
+    'a an and are as at be been by for from has have in is it its near not of on or the there this to very '
+    'was were with'.split()
+)
+TRAINING_PROJECTION = {'description': 1, 'location': 1, 'category': 1, 'priority': 1}
+RESCORE_PROJECTION = {'description': 1, 'location': 1}
+
+
+def is_available():
+    """Import NumPy if needed; False when it is not installed"""
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            return False
+        np = numpy
+    return True
+
+
+def tokenize(description, location=''):
+    """Unigrams and bigrams of the normalized location + description"""
+    words = [word for word in _WORD.findall(f"{location} {description}".lower()) if word not in STOP_WORDS]
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+
+# ---- sparse helpers (CSR as indptr/indices/data arrays) ----
+
+def _vectorize(texts, vocabulary, idf):
+    """L2-normalized TF-IDF rows for a list of token lists, as CSR arrays"""
+    indptr = [0]
+    indices = []
+    data = []
+    for tokens in texts:
+        counts = {}
+        for token in tokens:
+            index = vocabulary.get(token)
+            if index is not None:
+                counts[index] = counts.get(index, 0) + 1
+        weights = {index: (1 + math.log(count)) * idf[index] for index, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+        for index, weight in weights.items():
+            indices.append(index)
+            data.append(weight / norm)
+        indptr.append(len(indices))
+    return np.array(indptr, dtype=np.int64), np.array(indices, dtype=np.int64), np.array(data, dtype=np.float64)
+
+
+def _rows(indptr):
+    return np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+
+
+def _dot(csr, weights):
+    """X @ W for CSR X (n x d) and dense W (d x k)"""
+    indptr, indices, data = csr
+    rows = _rows(indptr)
+    n = len(indptr) - 1
+    contributions = weights[indices] * data[:, None]
+    return np.stack([np.bincount(rows, weights=contributions[:, j], minlength=n)
+                     for j in range(weights.shape[1])], axis=1)
+
+
+def _dot_transposed(csr, gradient, n_features):
+    """X.T @ G for CSR X (n x d) and dense G (n x k)"""
+    indptr, indices, data = csr
+    rows = _rows(indptr)
+    return np.stack([np.bincount(indices, weights=data * gradient[rows, j], minlength=n_features)
+                     for j in range(gradient.shape[1])], axis=1)
+
+
+def _softmax(scores):
+    scores = scores - scores.max(axis=1, keepdims=True)
+    exp = np.exp(scores)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def _train_head(csr, labels, sample_weights, n_features, classes, epochs=150, learning_rate=0.1, l2=1e-4):
+    """Softmax regression by full-batch Adam"""
+    y = np.zeros((len(labels), len(classes)))
+    y[np.arange(len(labels)), [classes.index(label) for label in labels]] = 1.0
+    weights = np.zeros((n_features, len(classes)))
+    bias = np.zeros(len(classes))
+    moments = [np.zeros_like(weights), np.zeros_like(weights), np.zeros_like(bias), np.zeros_like(bias)]
+    sample_weights = sample_weights / sample_weights.sum()
+    for step in range(1, epochs + 1):
+        error = (_softmax(_dot(csr, weights) + bias) - y) * sample_weights[:, None]
+        grads = (_dot_transposed(csr, error, n_features) + l2 * weights, error.sum(axis=0))
+        for i, (param, grad) in enumerate(((weights, grads[0]), (bias, grads[1]))):
+            m, v = moments[2 * i], moments[2 * i + 1]
+            m *= 0.9
+            m += 0.1 * grad
+            v *= 0.999
+            v += 0.001 * grad * grad
+            param -= learning_rate * (m / (1 - 0.9 ** step)) / (np.sqrt(v / (1 - 0.999 ** step)) + 1e-8)
+    return weights, bias
+
+
+class ComplaintClassifier:
+    """Category and priority suggestions from complaint text"""
+
+    def __init__(self, vocabulary, idf, heads, metadata=None):
+        self.vocabulary = vocabulary  # token -> feature index
+        self.idf = idf
+        self.heads = heads  # name -> (classes, weights, bias)
+        self.metadata = metadata or {}
+
+    # ---- training ----
+
+    @classmethod
+    def train(cls, samples, max_features=20000, min_df=2, epochs=150):
+        """
+        Train from (description, location, category, priority, weight) samples
+        Returns (classifier, holdout accuracy per head)
+        """
+        if not is_available():
+            raise RuntimeError('NumPy is required to train the classifier')
+        samples = [sample for sample in samples if sample[0]]
+        if len(samples) < 20:
+            raise ValueError('Need at least 20 complaints to train')
+
+        texts = [tokenize(description, location) for description, location, _, _, _ in samples]
+        document_frequency = {}
+        for tokens in texts:
+            for token in set(tokens):
+                document_frequency[token] = document_frequency.get(token, 0) + 1
+        kept = sorted((token for token, df in document_frequency.items() if df >= min_df),
+                      key=lambda token: -document_frequency[token])[:max_features]
+        vocabulary = {token: index for index, token in enumerate(sorted(kept))}
+        n = len(texts)
+        idf = np.array([math.log((1 + n) / (1 + document_frequency[token])) + 1 for token in sorted(kept)])
+
+        # Every fifth complaint is held out to report accuracy
+        holdout = np.arange(n) % 5 == 0
+        accuracy = {}
+        heads = {}
+        for name, column in (('category', 2), ('priority', 3)):
+            labels = [sample[column] or '' for sample in samples]
+            classes = sorted(set(labels))
+            if len(classes) < 2:
+                continue
+            weights = np.array([sample[4] for sample in samples], dtype=np.float64)
+            train_rows = [i for i in range(n) if not holdout[i]]
+            test_rows = [i for i in range(n) if holdout[i]]
+            model = _train_head(_vectorize([texts[i] for i in train_rows], vocabulary, idf),
+                                [labels[i] for i in train_rows], weights[train_rows], len(vocabulary), classes, epochs)
+            if test_rows:
+                scores = _dot(_vectorize([texts[i] for i in test_rows], vocabulary, idf), model[0]) + model[1]
+                predicted = [classes[j] for j in scores.argmax(axis=1)]
+                accuracy[name] = sum(1 for i, label in zip(test_rows, predicted) if labels[i] == label) / len(test_rows)
+            # Final model uses everything
+            heads[name] = (classes,) + _train_head(_vectorize(texts, vocabulary, idf), labels, weights,
+                                                   len(vocabulary), classes, epochs)
+        metadata = {'trained_at': datetime.utcnow().isoformat(), 'samples': n,
+                    'features': len(vocabulary), 'accuracy': accuracy}
+        return cls(vocabulary, idf, heads, metadata), accuracy
+
+    # ---- persistence ----
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        arrays = {'idf': self.idf}
+        meta = dict(self.metadata, vocabulary=sorted(self.vocabulary, key=self.vocabulary.get),
+                    heads={name: head[0] for name, head in self.heads.items()})
+        for name, (_, weights, bias) in self.heads.items():
+            arrays[f'{name}_weights'] = weights
+            arrays[f'{name}_bias'] = bias
+        tmp_path = path + '.tmp.npz'
+        np.savez_compressed(tmp_path, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp_path, path)  # Running processes never see a half-written model
+
+    @classmethod
+    def load(cls, path):
+        if not is_available():
+            raise RuntimeError('NumPy is required to load the classifier')
+        with np.load(path, allow_pickle=False) as archive:
+            meta = json.loads(str(archive['meta']))
+            vocabulary = {token: index for index, token in enumerate(meta.pop('vocabulary'))}
+            heads = {name: (classes, archive[f'{name}_weights'], archive[f'{name}_bias'])
+                     for name, classes in meta.pop('heads').items()}
+            return cls(vocabulary, archive['idf'], heads, meta)
+
+    # ---- prediction ----
+
+    def _features(self, description, location):
+        counts = {}
+        for token in tokenize(description, location):
+            index = self.vocabulary.get(token)
+            if index is not None:
+                counts[index] = counts.get(index, 0) + 1
+        if not counts:
+            return None, None
+        indices = np.fromiter(counts, dtype=np.int64, count=len(counts))
+        values = (1 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))) * self.idf[indices]
+        return indices, values / np.linalg.norm(values)
+
+    def predict(self, description, location=''):
+        """{'category': ..., 'category_confidence': ..., 'priority': ..., ...}, or None if no known words"""
+        indices, values = self._features(description, location)
+        if indices is None:
+            return None
+        result = {}
+        for name, (classes, weights, bias) in self.heads.items():
+            probabilities = _softmax((values @ weights[indices] + bias)[None, :])[0]
+            best = int(probabilities.argmax())
+            result[name] = classes[best]
+            result[f'{name}_confidence'] = round(float(probabilities[best]), 3)
+        return result
+
+    def predict_many(self, complaints):
+        """Batch predict for (description, location) pairs (one sparse product per head)"""
+        csr = _vectorize([tokenize(description, location) for description, location in complaints],
+                         self.vocabulary, self.idf)
+        empty = np.diff(csr[0]) == 0
+        results = [{} for _ in complaints]
+        for name, (classes, weights, bias) in self.heads.items():
+            probabilities = _softmax(_dot(csr, weights) + bias)
+            best = probabilities.argmax(axis=1)
+            for i, result in enumerate(results):
+                result[name] = classes[best[i]]
+                result[f'{name}_confidence'] = round(float(probabilities[i, best[i]]), 3)
+        return [None if empty[i] else result for i, result in enumerate(results)]
+
+
+def rescore_collection(model, collection, query=None, batch_size=1000):
+    """
+    Batch re-score a collection's complaints; only the predicted fields of 'classification'
+    change, plus updated_at so delta sync and live polling pick up the new predictions
+    """
+    scored = 0
+    batch = []
+
+    def flush():
+        predictions = model.predict_many([(doc.get('description') or '', doc.get('location') or '') for doc in batch])
+        now = datetime.utcnow()
+        ops = [UpdateOne({'_id': doc['_id']},
+                         {'$set': dict({f'classification.{key}': value for key, value in prediction.items()},
+                                       updated_at=now),
+                          '$inc': {'version': 1}})
+               for doc, prediction in zip(batch, predictions) if prediction]
+        if ops:
+            collection.bulk_write(ops, ordered=False)
+        batch.clear()
+        return len(ops)
+
+    for doc in collection.find(query or {}, RESCORE_PROJECTION):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            scored += flush()
+    if batch:
+        scored += flush()
+    return scored
+
+
+class ClassifierHolder:
+    """Loads the model file once per process"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._model = None
+        self._attempted = False
+
+    def get(self):
+        if self._attempted:
+            return self._model
+        with self._lock:
+            if not self._attempted:
+                self._attempted = True
+                if os.path.exists(self.path):
+                    self._model = self._load()
+        return self._model
+
+    def _load(self):
+        if not is_available():
+            logger.info("Complaint classifier disabled: NumPy is not installed")
+            return None
+        try:
+            model = ComplaintClassifier.load(self.path)
+            logger.info("Complaint classifier loaded (%s samples)", model.metadata.get('samples'))
+            return model
+        except Exception as e:
+            logger.error("Could not load complaint classifier: %s", e)
+            return None
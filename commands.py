@@ -0,0 +1,204 @@
+"""
+Database Command Monitoring
+A pymongo CommandListener that attributes every command (name, collection,
+duration, query shape) to the Flask request running on the same thread.
+pymongo is synchronous, so a command starts and finishes on the thread that
+issued it, and the per-request trace lives in a thread-local
+
+Query shapes keep the structure of a filter and drop its values:
+{'status': {'$in': ['Pending']}, 'assigned_to': ObjectId(...)} becomes
+{"assigned_to": "?", "status": {"$in": "?"}}. The same shape repeating many
+times in one request is the signature of an N+1 loop
+"""
+import json
+import threading
+from collections import Counter
+
+from pymongo import monitoring
+
+# Where each command keeps its filter (or pipeline)
+FILTER_FIELDS = {
+    'find': 'filter',
+    'count': 'query',
+    'distinct': 'query',
+    'findAndModify': 'query',
+    'aggregate': 'pipeline'
+}
+# Statement lists: the first statement stands for the batch
+STATEMENT_FIELDS = {'update': ('updates', 'q'), 'delete': ('deletes', 'q')}
+
+
+def _shape(value):
+    if isinstance(value, dict):
+        return {key: _shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)) and value and all(isinstance(item, dict) for item in value):
+        return [_shape(item) for item in value]  # $or / $and branches and pipeline stages
+    return '?'
+
+
+def command_collection(command_name, command):
+    """The collection a command document targets, or None (admin commands)"""
+    collection = command.get('collection') if command_name == 'getMore' else command.get(command_name)
+    return collection if isinstance(collection, str) else None
+
+
+def query_shape(command_name, command):
+    """(collection, 'find complaints_roads {"status": "?"}' style key) for a command document"""
+    collection = command_collection(command_name, command)
+    if collection is None:
+        return None, command_name
+    query = None
+    if command_name in FILTER_FIELDS:
+        query = command.get(FILTER_FIELDS[command_name])
+    elif command_name in STATEMENT_FIELDS:
+        statements, field = STATEMENT_FIELDS[command_name]
+        statements = command.get(statements) or [{}]
+        query = statements[0].get(field)
+    shape = f"{command_name} {collection}"
+    if query:
+        shape += ' ' + json.dumps(_shape(query), sort_keys=True)
+    return collection, shape
+
+
+class RequestTrace:
+    """Commands issued while one request was being handled"""
+
+    def __init__(self):
+        self.commands = 0
+        self.failed = 0
+        self.duration = 0.0  # seconds
+        self.collections = {}  # collection -> [commands, seconds]
+        self.shapes = Counter()
+
+    def record(self, collection, shape, seconds, failed=False):
+        self.commands += 1
+        self.duration += seconds
+        if failed:
+            self.failed += 1
+        counts = self.collections.setdefault(collection or '-', [0, 0.0])
+        counts[0] += 1
+        counts[1] += seconds
+        self.shapes[shape] += 1
+
+    def repeated(self, threshold):
+        """(shape, count) for shapes issued more than threshold times, most repeated first"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+
+    def summary(self):
+        return {
+            'commands': self.commands,
+            'failed': self.failed,
+            'db_ms': round(self.duration * 1000, 2),
+            'collections': {name: {'commands': counts[0], 'ms': round(counts[1] * 1000, 2)}
+                            for name, counts in sorted(self.collections.items(), key=lambda item: -item[1][1])}
+        }
+
+
+class CommandMonitor(monitoring.CommandListener):
+    """
+    Per-request command traces plus running per-route totals. observer, when
+    given, is called as observer(command_name, collection, seconds, failed)
+    for every command, inside a traced request or not
+    """
+
+    def __init__(self, observer=None):
+        self.observer = observer
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._routes = {}
+
+    # ---- request scope ----
+
+    def begin(self):
+        """Start tracing the current thread's request"""
+        self._local.trace = RequestTrace()
+        self._local.pending = {}
+
+    def end(self):
+        """Stop tracing; returns the finished trace (or None)"""
+        trace = getattr(self._local, 'trace', None)
+        self._local.trace = None
+        self._local.pending = {}
+        return trace
+
+    def current(self):
+        return getattr(self._local, 'trace', None)
+
+    # ---- command events ----
+
+    def started(self, event):
+        if getattr(self._local, 'trace', None) is not None:
+            pending = query_shape(event.command_name, event.command)
+        elif self.observer is not None:
+            pending = (command_collection(event.command_name, event.command), None)
+        else:
+            return
+        if getattr(self._local, 'pending', None) is None:
+            self._local.pending = {}
+        self._local.pending[event.request_id] = pending
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed):
+        pending = getattr(self._local, 'pending', None)
+        pending = pending.pop(event.request_id, None) if pending else None
+        if pending is None:
+            return
+        seconds = event.duration_micros / 1e6
+        if self.observer is not None:
+            self.observer(event.command_name, pending[0], seconds, failed)
+        trace = getattr(self._local, 'trace', None)
+        if trace is not None and pending[1] is not None:
+            trace.record(pending[0], pending[1], seconds, failed)
+
+    # ---- per-route totals ----
+
+    def record_route(self, route, trace, elapsed):
+        """Add a finished request to its route's totals (elapsed: whole request, seconds)"""
+        with self._lock:
+            totals = self._routes.get(route)
+            if totals is None:
+                totals = self._routes[route] = {'requests': 0, 'commands': 0, 'max_commands': 0,
+                                                'db_seconds': 0.0, 'seconds': 0.0, 'collections': Counter()}
+            totals['requests'] += 1
+            totals['commands'] += trace.commands
+            totals['max_commands'] = max(totals['max_commands'], trace.commands)
+            totals['db_seconds'] += trace.duration
+            totals['seconds'] += elapsed
+            for collection, counts in trace.collections.items():
+                totals['collections'][collection] += counts[0]
+
+    def route_summaries(self):
+        """Per-route averages, routes with the most database time first"""
+        with self._lock:
+            routes = {route: dict(totals, collections=dict(totals['collections']))
+                      for route, totals in self._routes.items()}
+        summaries = []
+        for route, totals in routes.items():
+            requests = totals['requests']
+            summaries.append({
+                'route': route,
+                'requests': requests,
+                'avg_commands': round(totals['commands'] / requests, 1),
+                'max_commands': totals['max_commands'],
+                'avg_db_ms': round(totals['db_seconds'] * 1000 / requests, 2),
+                'avg_ms': round(totals['seconds'] * 1000 / requests, 2),
+                'db_share': round(totals['db_seconds'] / totals['seconds'], 3) if totals['seconds'] else None,
+                'collections': totals['collections']
+            })
+        summaries.sort(key=lambda summary: -summary['avg_db_ms'] * summary['requests'])
+        return summaries
+
+
+def server_timing(trace, elapsed):
+    """Server-Timing header value: database time and command count, and the whole request"""
+    return (f'db;dur={trace.duration * 1000:.1f};desc="{trace.commands} commands", '
+            f'app;dur={elapsed * 1000:.1f}')
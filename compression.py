@@ -0,0 +1,147 @@
+"""
+Response Compression
+Compresses HTML and JSON responses with gzip (and brotli when installed)
+and serves precompressed .br/.gz variants of static CSS/JS files
+"""
+import os
+import gzip
+import mimetypes
+from flask import request, send_file
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+PRECOMPRESS_EXTENSIONS = ('.css', '.js', '.svg', '.html', '.json', '.txt')
+
+
+def parse_accept_encoding(header):
+    """Return a dict of encoding -> q-value from an Accept-Encoding header"""
+    encodings = {}
+    for part in (header or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, params = part.partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        encodings[name.strip().lower()] = q
+    return encodings
+
+
+def choose_encoding(header, available):
+    """Pick the best encoding from available (in server preference order)"""
+    accepted = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = accepted.get(encoding, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def available_encodings():
+    """Encodings this process can produce, preferred first"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress_bytes(data, encoding, level=6, br_quality=4):
+    """Compress data with the given content encoding"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=br_quality)
+    return gzip.compress(data, compresslevel=level)
+
+
+def init_compression(app):
+    """Register compression hooks on the Flask app"""
+    if not app.config.get('COMPRESS_ENABLED', True):
+        return
+
+    min_size = app.config.get('COMPRESS_MIN_SIZE', 500)
+    allowed_mimetypes = set(app.config.get('COMPRESS_MIMETYPES', []))
+    level = app.config.get('COMPRESS_LEVEL', 6)
+    br_quality = app.config.get('COMPRESS_BR_QUALITY', 4)
+
+    @app.before_request
+    def serve_precompressed_static():
+        """Serve a .br/.gz sibling of a static file when the client accepts it"""
+        if request.endpoint != 'static' or app.static_folder is None:
+            return None
+        filename = request.view_args.get('filename', '')
+        path = safe_join(app.static_folder, filename)
+        if path is None:
+            return None
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'), ('br', 'gzip'))
+        if encoding is None:
+            return None
+        suffix = '.br' if encoding == 'br' else '.gz'
+        compressed_path = path + suffix
+        if not os.path.isfile(compressed_path) or not os.path.isfile(path):
+            return None
+        if os.path.getmtime(compressed_path) < os.path.getmtime(path):
+            return None  # Stale variant, fall back to the original file
+        response = send_file(compressed_path, mimetype=_guess_mimetype(filename),
+                             max_age=app.get_send_file_max_age(filename), conditional=True)
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
+
+    @app.after_request
+    def compress_response(response):
+        if response.direct_passthrough or response.is_streamed:
+            return response  # File uploads and streamed bodies are left untouched
+        if response.status_code < 200 or response.status_code in (204, 206, 304):
+            return response
+        if 'Content-Encoding' in response.headers:
+            return response
+        if response.mimetype not in allowed_mimetypes:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'), available_encodings())
+        if encoding is None:
+            return response
+
+        response.set_data(compress_bytes(data, encoding, level, br_quality))
+        response.headers['Content-Encoding'] = encoding
+        # Compressed bodies differ byte-for-byte, so a strong ETag becomes weak
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+def _guess_mimetype(filename):
+    return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+
+def precompress_static(static_folder, level=9, br_quality=11):
+    """Write .gz (and .br) variants next to static CSS/JS files, returns count written"""
+    written = 0
+    for root, _, files in os.walk(static_folder):
+        for name in files:
+            if not name.endswith(PRECOMPRESS_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            for encoding in available_encodings():
+                suffix = '.br' if encoding == 'br' else '.gz'
+                compressed = compress_bytes(data, encoding, level, br_quality)
+                if len(compressed) >= len(data):
+                    continue
+                with open(path + suffix, 'wb') as f:
+                    f.write(compressed)
+                written += 1
+    return written
@@ -0,0 +1,60 @@
+"""
+Conditional Requests
+ETag / Last-Modified helpers so unchanged complaints can be answered with
+304 Not Modified before any enrichment or template rendering
+"""
+import hashlib
+from datetime import datetime, timezone
+from flask import request, make_response
+
+# Fields needed to compute validators for a complaint without loading it fully
+VALIDATOR_FIELDS = {'_id': 1, 'user_id': 1, 'updated_at': 1, 'version': 1, 'sla_deadline': 1}
+
+
+def make_etag(*parts):
+    """Build an opaque ETag value from the given parts"""
+    raw = ':'.join(str(part) for part in parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def complaint_etag(complaint, *extra):
+    """ETag for a complaint, derived from its _id, version and updated_at"""
+    updated_at = complaint.get('updated_at')
+    updated_at = updated_at.isoformat() if isinstance(updated_at, datetime) else ''
+    return make_etag(complaint.get('_id'), complaint.get('version', 0), updated_at, *extra)
+
+
+def _as_utc(dt):
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def is_not_modified(etag, last_modified=None):
+    """Check the current request's If-None-Match / If-Modified-Since headers"""
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if request.if_none_match:
+        # Weak comparison: compressed responses carry a weak form of the tag
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return _as_utc(last_modified).replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def set_validators(response, etag, last_modified=None):
+    """Attach ETag, Last-Modified and revalidation headers to a response"""
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = _as_utc(last_modified)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def not_modified_response(etag, last_modified=None):
+    """Empty 304 response carrying the validators"""
+    response = make_response('', 304)
+    return set_validators(response, etag, last_modified)
@@ -9,6 +9,24 @@ class Config:
     """Base configuration class"""
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'change-this-secret-key-in-production-2025'
     
+    # Development server only; production runs under a WSGI server (wsgi.py)
+    DEBUG = os.environ.get('FLASK_DEBUG', 'False').lower() in ('1', 'true')
+    
+    # WSGI server (gunicorn.conf.py / waitress in wsgi.py)
+    SERVER_BIND = os.environ.get('SERVER_BIND', '0.0.0.0:5000')
+    SERVER_WORKERS = int(os.environ.get('WEB_CONCURRENCY', '2'))  # Processes (gunicorn only)
+    SERVER_THREADS = int(os.environ.get('SERVER_THREADS', '8'))  # Per process; each live dashboard holds one
+    SERVER_PRELOAD = os.environ.get('SERVER_PRELOAD', 'True').lower() == 'true'  # Import once in the master, fork workers
+    SERVER_TIMEOUT = int(os.environ.get('SERVER_TIMEOUT', '60'))
+    SHUTDOWN_TIMEOUT = int(os.environ.get('SHUTDOWN_TIMEOUT', '30'))  # Seconds to flush background work on exit
+    DB_READY_RETRY_SECONDS = 5  # While MongoDB is unreachable, requests get 503 and it is re-pinged this often
+    
+    # Logging (one JSON object per line on stdout; LOG_FORMAT=text is easier to read in development)
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json').lower()
+    LOG_DEBUG_SAMPLE = int(os.environ.get('LOG_DEBUG_SAMPLE', '1'))  # At DEBUG, keep the debug lines of 1 request in N
+    LOG_QUEUE_SIZE = 10000  # Records waiting for the writer thread; beyond this they are dropped, never waited on
+    
     # MongoDB Configuration
     MONGODB_URI = os.environ.get('MONGODB_URI') or 'mongodb://localhost:27017/'
     # Separate databases for users and complaints
@@ -16,6 +34,31 @@ class Config:
     COMPLAINTS_DATABASE_NAME = os.environ.get('COMPLAINTS_DATABASE_NAME') or 'municipal_complaints'
     # Legacy support - if DATABASE_NAME is set, use it for complaints
     DATABASE_NAME = os.environ.get('DATABASE_NAME') or COMPLAINTS_DATABASE_NAME
+    # Connection pool and timeouts (per process; size the pool to SERVER_THREADS plus background threads)
+    MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '50'))
+    MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '0'))
+    MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '300000'))  # Close idle connections after 5 min
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '2000'))  # Fail fast on an exhausted pool
+    MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', '30000'))  # Per-operation network timeout
+    MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '5000'))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000'))
+    HEALTH_SATURATION_WARNING = 0.8  # /readyz reports 'degraded' when this share of the pool is checked out
+    # Per-request command tracing: totals per route, optional Server-Timing header, N+1 warnings (opt-in)
+    DB_TRACE_ENABLED = os.environ.get('DB_TRACE_ENABLED', 'False').lower() == 'true'
+    DB_TRACE_SERVER_TIMING = os.environ.get('DB_TRACE_SERVER_TIMING', str(DEBUG)).lower() == 'true'
+    DB_TRACE_REPEAT_WARNINGS = os.environ.get('DB_TRACE_REPEAT_WARNINGS', str(DEBUG)).lower() == 'true'
+    DB_TRACE_REPEAT_THRESHOLD = int(os.environ.get('DB_TRACE_REPEAT_THRESHOLD', '10'))  # Same query shape more often per request: N+1
+    # Prometheus metrics on /metrics; each worker process writes its values to METRICS_DIR for the others
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'False').lower() == 'true'
+    METRICS_DIR = os.environ.get('METRICS_DIR', 'data/metrics')
+    METRICS_FLUSH_INTERVAL = int(os.environ.get('METRICS_FLUSH_INTERVAL', '5'))  # Seconds; other workers' values lag by up to this
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # Scrapers send 'Authorization: Bearer <token>'; required outside DEBUG
+    METRICS_SESSION_WINDOW = 900  # Signed-in users seen within this many seconds count as active sessions
+    # Request profiling for admins: header 'X-Profile: 1' ('mem' also traces allocations) or ?_profile=1
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'False').lower() == 'true'  # Off: no hooks at all
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '1.0'))  # Share of flagged requests profiled
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', 'data/profiles')
+    PROFILE_MAX_STORED = 50  # Oldest profiles are deleted beyond this
     
     # Session Configuration
     PERMANENT_SESSION_LIFETIME = timedelta(hours=24)
@@ -28,6 +71,28 @@ class Config:
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf', 'doc', 'docx', 'mp4', 'mov', 'avi'}
     
+    # Upload Storage Backend ('local' or 'gridfs' for multi-node deployments)
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'local').lower()
+    GRIDFS_BUCKET = os.environ.get('GRIDFS_BUCKET', 'uploads')
+    GRIDFS_CHUNK_SIZE = int(os.environ.get('GRIDFS_CHUNK_SIZE', str(255 * 1024)))
+    GRIDFS_CACHE_FOLDER = os.environ.get('GRIDFS_CACHE_FOLDER', '')  # Empty disables local read-through cache
+    
+    # Response Compression (brotli is used when the 'brotli' package is installed)
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'True').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', '500'))  # bytes
+    COMPRESS_LEVEL = 6
+    COMPRESS_BR_QUALITY = 4
+    COMPRESS_MIMETYPES = [
+        'text/html',
+        'text/css',
+        'text/plain',
+        'text/csv',
+        'application/json',
+        'application/javascript',
+        'text/javascript',
+        'image/svg+xml'
+    ]
+    
     # Email Configuration (Optional - Set via environment variables)
     ENABLE_EMAIL_NOTIFICATIONS = os.environ.get('ENABLE_EMAIL_NOTIFICATIONS', 'False').lower() == 'true'
     SMTP_SERVER = os.environ.get('SMTP_SERVER', 'smtp.gmail.com')
@@ -153,9 +218,88 @@ class Config:
     ITEMS_PER_PAGE = 10
     ADMIN_ITEMS_PER_PAGE = 20
     
+    # Maximum complaints per admin bulk action
+    BULK_ACTION_LIMIT = 500
+    
+    # Auto-assignment of complaints to the least-loaded staff member
+    AUTO_ASSIGN_ENABLED = os.environ.get('AUTO_ASSIGN_ENABLED', 'True').lower() == 'true'
+    AUTO_ASSIGN_DEPARTMENT_AFFINITY = True  # Prefer staff tied to the complaint's department_code
+    AUTO_ASSIGN_AFFINITY_SLACK = 5  # ...unless they have this many more open complaints than the least-loaded
+    
+    # Staff roster cache: counters are rebuilt from the database this often
+    ROSTER_RECONCILE_SECONDS = int(os.environ.get('ROSTER_RECONCILE_SECONDS', '300'))
+    
+    # SLA sweeper: flags breached complaints and escalates them
+    SLA_SWEEP_ENABLED = os.environ.get('SLA_SWEEP_ENABLED', 'True').lower() == 'true'
+    SLA_SWEEP_INTERVAL = int(os.environ.get('SLA_SWEEP_INTERVAL', '300'))  # seconds
+    SLA_ESCALATE_PRIORITY = True  # Raise priority one level on breach
+    SLA_NOTIFY_DEPARTMENT = True  # Email each department a digest of its breaches
+    
+    # Near-breach alerts ("due in X hours") from the in-memory deadline scheduler
+    SLA_ALERTS_ENABLED = os.environ.get('SLA_ALERTS_ENABLED', 'True').lower() == 'true'
+    SLA_ALERT_HOURS = [24, 4]
+    
+    # Live dashboard updates (Server-Sent Events)
+    LIVE_UPDATES_ENABLED = os.environ.get('LIVE_UPDATES_ENABLED', 'True').lower() == 'true'
+    LIVE_POLL_INTERVAL = 5  # seconds; fallback when change streams are unavailable (standalone server)
+    LIVE_STATS_INTERVAL = 2  # seconds; counters are recomputed at most this often after a change
+    SSE_HEARTBEAT_SECONDS = 15
+    SSE_MAX_STREAM_SECONDS = 300  # Close long streams so browsers reconnect and workers recycle
+    # Open streams per process; each holds a server thread, so this stays below SERVER_THREADS
+    LIVE_MAX_SUBSCRIBERS = int(os.environ.get('LIVE_MAX_SUBSCRIBERS', str(max(1, SERVER_THREADS // 2))))
+    
+    # Staff delta sync API
+    SYNC_PAGE_SIZE = 200  # Default (and maximum) changes per sync response
+    SYNC_OVERLAP_SECONDS = 5  # Each sync re-reads this window so in-flight writes are not missed
+    SYNC_TOMBSTONE_DAYS = 30  # Clients offline longer than this should do a full sync
+    
+    # Near-duplicate detection at submission (MinHash/LSH over location + description)
+    DUPLICATE_DETECTION_ENABLED = os.environ.get('DUPLICATE_DETECTION_ENABLED', 'True').lower() == 'true'
+    DUPLICATE_WINDOW_HOURS = 72  # Only recent complaints are compared
+    DUPLICATE_THRESHOLD = 0.5  # Estimated similarity at which a complaint is flagged
+    
+    # Geospatial queries (optional coordinates captured at submission)
+    GEO_NEARBY_MAX_RADIUS = 5000  # metres
+    GEO_RESULTS_LIMIT = 200
+    GEO_HOTSPOT_PRECISION = 6  # Geohash length: 5 = ~4.9km cells, 6 = ~1.2km x 0.6km, 7 = ~150m
+    GEO_HOTSPOT_DAYS = 30
+    
+    # Category/priority suggestions at intake (TF-IDF + linear model, needs NumPy)
+    CLASSIFIER_ENABLED = os.environ.get('CLASSIFIER_ENABLED', 'True').lower() == 'true'
+    CLASSIFIER_MODEL_PATH = os.environ.get('CLASSIFIER_MODEL_PATH', 'data/models/complaint_classifier.npz')
+    CLASSIFIER_AUTO_APPLY_CONFIDENCE = 0.85  # Re-route 'Other' / raise priority only above this confidence
+    CLASSIFIER_CORRECTION_WEIGHT = 3.0  # Admin-corrected complaints count this much more in training
+    
+    # Keyword escalation at submission (whole-word phrases in the description -> minimum priority)
+    ESCALATION_KEYWORDS = {
+        'live wire': 'Urgent',
+        'exposed wire': 'Urgent',
+        'electric shock': 'Urgent',
+        'sparking': 'Urgent',
+        'gas smell': 'Urgent',
+        'gas leak': 'Urgent',
+        'on fire': 'Urgent',
+        'caught fire': 'Urgent',
+        'fire outbreak': 'Urgent',
+        'building fire': 'Urgent',
+        'collapsed': 'Urgent',
+        'sewage overflow': 'High',
+        'sewage overflowing': 'High',
+        'open manhole': 'High',
+        'fallen tree': 'High',
+        'contaminated water': 'High',
+        'no water supply': 'High'
+    }
+    
     # File Paths
-    REPORTS_FOLDER = 'static/reports'
-    EXPORTS_FOLDER = 'static/exports'
+    REPORTS_FOLDER = 'data/reports'  # Outside static/: served only by the admin download route
+    EXPORTS_FOLDER = 'data/exports'  # Outside static/: exports hold citizen data, served only by the admin download route
+    
+    IMPORTS_FOLDER = 'data/imports'  # Outside static/ so uploaded import files are not public
+    
+    # Background Jobs (exports, reports, imports)
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+    IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', '1000'))
     
     # Application Info
     APP_NAME = 'Municipal Complaint Management System'
@@ -0,0 +1,201 @@
+"""
+SLA Deadline Scheduler
+Keeps every open complaint in memory in min-heaps keyed by sla_deadline: one
+global heap for alerts plus one per staff member and per department for
+"next N deadlines" queries. A single thread sleeps until the next alert is
+due ("due in X hours"), so near-breach warnings fire on time without polling
+the database. Entries are replaced lazily: stale heap items are skipped and
+compacted away
+"""
+import heapq
+import itertools
+import logging
+import threading
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+ENTRY_FIELDS = ('complaint_id', 'category', 'location', 'priority', 'assigned_to',
+                'department_code', 'sla_deadline', 'sla_alerts_sent')
+LOAD_PROJECTION = {field: 1 for field in ENTRY_FIELDS}
+MAX_SLEEP = 3600  # seconds; re-check now and then in case the clock jumps
+
+
+class DeadlineScheduler:
+    """Open-complaint deadlines with near-breach alerts and per-owner queries"""
+
+    def __init__(self, alert_hours=(24, 4), on_alert=None):
+        self.alert_hours = sorted(alert_hours, reverse=True)
+        self.on_alert = on_alert
+        self._cond = threading.Condition()
+        self._counter = itertools.count()
+        self._entries = {}  # key (_id as str) -> entry dict (with 'seq')
+        self._alerts = []   # [(fire_at, seq, key, hours)]; hours == 0 marks the deadline itself
+        self._by_owner = {}  # ('staff', id) / ('department', code) -> [(deadline, seq, key)]
+        self._loaded = False
+        self._thread = None
+        self._stopped = False
+
+    # ---- loading ----
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def load(self, collections, open_statuses, now=None):
+        """Fill the heaps from the open complaints (served by the (status, sla_deadline) index)"""
+        now = now or datetime.utcnow()
+        query = {'status': {'$in': list(open_statuses)}, 'sla_deadline': {'$gte': now}}
+        with self._cond:
+            self._entries = {}
+            self._alerts = []
+            self._by_owner = {}
+            for collection in collections:
+                for doc in collection.find(query, LOAD_PROJECTION):
+                    self._add(doc, now)
+            self._loaded = True
+            self._cond.notify()
+        return len(self._entries)
+
+    # ---- updates ----
+
+    def upsert(self, doc, now=None):
+        """Add or refresh a complaint; fields missing from doc keep their current values"""
+        now = now or datetime.utcnow()
+        with self._cond:
+            current = self._entries.get(str(doc['_id']))
+            if current:
+                doc = dict(current, **{key: value for key, value in doc.items() if key != 'seq'})
+            self._add(doc, now)
+            self._cond.notify()
+
+    def remove(self, complaint_oid):
+        """Forget a complaint (resolved, closed or deleted); heap items go stale"""
+        with self._cond:
+            self._entries.pop(str(complaint_oid), None)
+
+    def _add(self, doc, now):
+        key = str(doc['_id'])
+        deadline = doc.get('sla_deadline')
+        if not isinstance(deadline, datetime) or deadline < now:
+            self._entries.pop(key, None)
+            return
+        entry = {field: doc.get(field) for field in ENTRY_FIELDS}
+        entry['_id'] = key
+        entry['seq'] = next(self._counter)
+        entry['sla_alerts_sent'] = list(doc.get('sla_alerts_sent') or [])
+        self._entries[key] = entry
+
+        for hours in self.alert_hours + [0]:
+            if hours and hours in entry['sla_alerts_sent']:
+                continue
+            fire_at = deadline - timedelta(hours=hours)
+            heapq.heappush(self._alerts, (fire_at, entry['seq'], key, hours))
+        for owner in self._owners(entry):
+            heap = self._by_owner.setdefault(owner, [])
+            heapq.heappush(heap, (deadline, entry['seq'], key))
+            if len(heap) > 64 and len(heap) > 4 * self._live_count(owner):
+                self._compact(owner)
+
+    def _owners(self, entry):
+        owners = []
+        if entry.get('assigned_to'):
+            owners.append(('staff', str(entry['assigned_to'])))
+        if entry.get('department_code'):
+            owners.append(('department', entry['department_code']))
+        return owners
+
+    def _is_live(self, key, seq):
+        entry = self._entries.get(key)
+        return entry is not None and entry['seq'] == seq
+
+    def _live_count(self, owner):
+        return sum(1 for _, seq, key in self._by_owner.get(owner, ()) if self._is_live(key, seq))
+
+    def _compact(self, owner):
+        heap = [item for item in self._by_owner.get(owner, ()) if self._is_live(item[2], item[1])]
+        heapq.heapify(heap)
+        self._by_owner[owner] = heap
+
+    # ---- queries ----
+
+    def next_deadlines(self, staff_id=None, department_code=None, limit=10, now=None):
+        """
+        The next `limit` deadlines for a staff member or department
+        Walks the heap as a tree with a small frontier heap, so it costs
+        O(k log k) for k visited items instead of sorting the whole heap
+        """
+        now = now or datetime.utcnow()
+        owner = ('staff', str(staff_id)) if staff_id else ('department', department_code)
+        results = []
+        with self._cond:
+            heap = self._by_owner.get(owner, [])
+            frontier = [(heap[0], 0)] if heap else []
+            while frontier and len(results) < limit:
+                (deadline, seq, key), index = heapq.heappop(frontier)
+                entry = self._entries.get(key)
+                if entry is not None and entry['seq'] == seq and deadline >= now:
+                    results.append(dict(entry))
+                for child in (2 * index + 1, 2 * index + 2):
+                    if child < len(heap):
+                        heapq.heappush(frontier, (heap[child], child))
+        for entry in results:
+            entry.pop('seq', None)
+        return results
+
+    def __len__(self):
+        return len(self._entries)
+
+    # ---- alert thread ----
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='sla-deadlines', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+                due = self._pop_due(datetime.utcnow())
+                if not due:
+                    timeout = MAX_SLEEP
+                    if self._alerts:
+                        timeout = min(max((self._alerts[0][0] - datetime.utcnow()).total_seconds(), 0.05), MAX_SLEEP)
+                    self._cond.wait(timeout)
+                    continue
+            # Callbacks run outside the lock so they can touch the database
+            for entry, hours in due:
+                try:
+                    if self.on_alert:
+                        self.on_alert(entry, hours)
+                except Exception as e:
+                    logger.exception("SLA alert for %s failed: %s", entry.get('complaint_id'), e)
+
+    def _pop_due(self, now):
+        due = []
+        while self._alerts and self._alerts[0][0] <= now:
+            _, seq, key, hours = heapq.heappop(self._alerts)
+            entry = self._entries.get(key)
+            if entry is None or entry['seq'] != seq:
+                continue
+            if hours == 0:
+                # Deadline reached: the SLA sweeper takes over from here
+                self._entries.pop(key, None)
+                continue
+            entry['sla_alerts_sent'].append(hours)
+            # Skip warnings superseded by a later, closer one (e.g. after a restart)
+            if any(other < hours and entry['sla_deadline'] - timedelta(hours=other) <= now
+                   for other in self.alert_hours):
+                continue
+            due.append((dict(entry), hours))
+        return due
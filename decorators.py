@@ -1,9 +1,12 @@
 """
 Decorators for route protection and validation
 """
+import logging
 from functools import wraps
 from flask import session, redirect, url_for, flash, request, jsonify
 
+logger = logging.getLogger(__name__)
+
 def login_required(f):
     """Decorator for routes that require login"""
     @wraps(f)
@@ -41,7 +44,7 @@ def admin_required(f):
                 flash('Admin access required', 'danger')
                 return redirect(url_for('index'))
         except Exception as e:
-            print(f"Admin check error: {e}")
+            logger.error("Admin check error: %s", e)
             flash('Error verifying admin access', 'danger')
             return redirect(url_for('index'))
         return f(*args, **kwargs)
@@ -72,7 +75,7 @@ def staff_required(f):
                 flash('Staff access required', 'danger')
                 return redirect(url_for('index'))
         except Exception as e:
-            print(f"Staff check error: {e}")
+            logger.error("Staff check error: %s", e)
             flash('Error verifying staff access', 'danger')
             return redirect(url_for('index'))
         return f(*args, **kwargs)
@@ -0,0 +1,208 @@
+"""
+Near-Duplicate Detection
+MinHash signatures over character shingles of the normalized location and
+description, indexed per category in an in-memory LSH table that covers the
+recent window. A lookup only compares the complaints sharing an LSH band
+with the new one, so it stays well under a millisecond however many recent
+complaints there are
+
+Signatures are stored on the complaint ('minhash') so the index reloads
+without rehashing, and each category catches up on complaints inserted by
+other processes (one indexed created_at query) before it is searched
+"""
+import logging
+import random
+import re
+import threading
+import zlib
+from collections import deque
+from datetime import datetime, timedelta
+
+from utils.assignment import CLOSED_STATUSES
+
+logger = logging.getLogger(__name__)
+NUM_PERM = 96
+BANDS = 32
+ROWS = NUM_PERM // BANDS  # Pairs at 50% similarity share a band ~99% of the time, at 10% ~3%
+SHINGLE_SIZE = 4
+MERSENNE_PRIME = (1 << 61) - 1
+INDEX_PROJECTION = {'complaint_id': 1, 'location': 1, 'description': 1, 'status': 1,
+                    'created_at': 1, 'minhash': 1}
+
+# Fixed seed: signatures stored in the database must stay comparable across restarts
+_rng = random.Random(20240601)
+PERMUTATIONS = [(_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(0, MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+STOP_WORDS = frozenset('a an and are at by for from in is it near of on or the there this to very was were with'.split())
+
+
+def ensure_duplicate_indexes(collections):
+    """created_at index for loading the window and catching up between processes; False if any failed"""
+    ok = True
+    for collection in collections:
+        try:
+            collection.create_index([('created_at', 1)], name='created_at')
+        except Exception as e:
+            logger.warning("Could not create duplicate-detection index on %s: %s", collection.name, e)
+            ok = False
+    return ok
+
+
+def normalize(text):
+    """Lowercase words without punctuation or stop words"""
+    return ' '.join(word for word in _NON_WORD.sub(' ', (text or '').lower()).split() if word not in STOP_WORDS)
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Hashed character shingles of normalized text"""
+    text = normalize(text)
+    if len(text) <= size:
+        return {zlib.crc32(text.encode('utf-8'))} if text else set()
+    return {zlib.crc32(text[i:i + size].encode('utf-8')) for i in range(len(text) - size + 1)}
+
+
+def minhash_signature(description, location=''):
+    """MinHash signature (NUM_PERM ints) of a complaint's location + description"""
+    hashed = shingles(f"{location} {description}")
+    if not hashed:
+        return [MERSENNE_PRIME] * NUM_PERM
+    return [min((a * value + b) % MERSENNE_PRIME for value in hashed) for a, b in PERMUTATIONS]
+
+
+def similarity(signature, other):
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(1 for x, y in zip(signature, other) if x == y) / float(NUM_PERM)
+
+
+def _bands(signature):
+    return [tuple(signature[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+
+
+class DuplicateIndex:
+    """Per-category LSH tables of recent, open, non-duplicate complaints"""
+
+    def __init__(self, window_hours=72, threshold=0.5):
+        self.window = timedelta(hours=window_hours)
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._tables = {}  # category -> {'buckets', 'entries', 'order', 'watermark'}
+        self._loaded = False
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def _table(self, category):
+        table = self._tables.get(category)
+        if table is None:
+            table = self._tables[category] = {
+                'buckets': [{} for _ in range(BANDS)],  # band -> {band values: {keys}}
+                'entries': {},                          # key -> entry
+                'order': deque(),                       # (created_at, key), oldest first
+                'watermark': None                       # newest created_at seen
+            }
+        return table
+
+    # ---- loading ----
+
+    @staticmethod
+    def index_query(since):
+        return {'created_at': {'$gte': since}, 'status': {'$nin': list(CLOSED_STATUSES)},
+                'duplicate_of': None, 'possible_duplicate_of': None}
+
+    def load(self, collections_by_category, now=None):
+        """Index the open complaints of the recent window, per category"""
+        now = now or datetime.utcnow()
+        with self._lock:
+            self._tables = {}
+        total = 0
+        for category, collection in collections_by_category.items():
+            for doc in collection.find(self.index_query(now - self.window), INDEX_PROJECTION).sort('created_at', 1):
+                self.add(category, doc)
+                total += 1
+            with self._lock:
+                self._table(category)['watermark'] = self._table(category)['watermark'] or now - self.window
+        self._loaded = True
+        return total
+
+    def catch_up(self, category, collection):
+        """Pick up complaints other processes inserted since this table was last updated"""
+        with self._lock:
+            since = self._table(category)['watermark']
+        if since is None:
+            return 0
+        added = 0
+        for doc in collection.find(self.index_query(since), INDEX_PROJECTION).sort('created_at', 1):
+            if self.add(category, doc):
+                added += 1
+        return added
+
+    # ---- updates ----
+
+    def add(self, category, doc):
+        """Index a complaint; returns False if it was already indexed"""
+        key = str(doc['_id'])
+        signature = doc.get('minhash') or minhash_signature(doc.get('description'), doc.get('location'))
+        created_at = doc.get('created_at') or datetime.utcnow()
+        with self._lock:
+            table = self._table(category)
+            if key in table['entries']:
+                return False
+            table['entries'][key] = {
+                '_id': key,
+                'complaint_id': doc.get('complaint_id'),
+                'location': doc.get('location'),
+                'created_at': created_at,
+                'signature': signature
+            }
+            for band, values in enumerate(_bands(signature)):
+                table['buckets'][band].setdefault(values, set()).add(key)
+            table['order'].append((created_at, key))
+            if table['watermark'] is None or created_at > table['watermark']:
+                table['watermark'] = created_at
+        return True
+
+    def remove(self, category, complaint_oid):
+        with self._lock:
+            self._remove(self._table(category), str(complaint_oid))
+
+    def _remove(self, table, key):
+        entry = table['entries'].pop(key, None)
+        if entry is None:
+            return
+        for band, values in enumerate(_bands(entry['signature'])):
+            bucket = table['buckets'][band].get(values)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del table['buckets'][band][values]
+
+    def _prune(self, table, now):
+        cutoff = now - self.window
+        while table['order'] and table['order'][0][0] < cutoff:
+            _, key = table['order'].popleft()
+            self._remove(table, key)
+
+    # ---- queries ----
+
+    def find(self, category, signature, now=None, limit=3):
+        """Probable duplicates as (score, entry) pairs, best first"""
+        now = now or datetime.utcnow()
+        with self._lock:
+            table = self._table(category)
+            self._prune(table, now)
+            candidates = set()
+            for band, values in enumerate(_bands(signature)):
+                candidates.update(table['buckets'][band].get(values, ()))
+            matches = []
+            for key in candidates:
+                entry = table['entries'][key]
+                score = similarity(signature, entry['signature'])
+                if score >= self.threshold:
+                    matches.append((score, {k: v for k, v in entry.items() if k != 'signature'}))
+        matches.sort(key=lambda match: (-match[0], match[1]['created_at']))
+        return matches[:limit]
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(table['entries']) for table in self._tables.values())
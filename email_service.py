@@ -2,11 +2,14 @@
 Email Notification Service
 Handles sending emails for complaint notifications
 """
+import logging
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from flask import current_app
 
+logger = logging.getLogger(__name__)
+
 def send_email(to_email, subject, message, html_content=None):
     """
     Send email notification
@@ -21,7 +24,7 @@ def send_email(to_email, subject, message, html_content=None):
     try:
         # Check if email notifications are enabled
         if not current_app.config.get('ENABLE_EMAIL_NOTIFICATIONS', False):
-            print(f"Email notifications disabled. Would send to {to_email}: {subject}")
+            logger.debug("Email notifications disabled. Would send to %s: %s", to_email, subject)
             return True  # Return True to not break the flow
         
         # Get SMTP configuration
@@ -31,7 +34,7 @@ def send_email(to_email, subject, message, html_content=None):
         smtp_password = current_app.config.get('SMTP_PASSWORD', '')
         
         if not smtp_user or not smtp_password:
-            print(f"SMTP credentials not configured. Email not sent to {to_email}")
+            logger.warning("SMTP credentials not configured. Email not sent to %s", to_email)
             return False
         
         # Create message
@@ -54,13 +57,11 @@ def send_email(to_email, subject, message, html_content=None):
             server.login(smtp_user, smtp_password)
             server.send_message(msg)
         
-        print(f"✓ Email sent successfully to {to_email}: {subject}")
+        logger.info("Email sent successfully to %s: %s", to_email, subject)
         return True
         
     except Exception as e:
-        print(f"✗ Error sending email to {to_email}: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error sending email to %s: %s", to_email, e)
         return False
 
 def send_complaint_submitted_email(user_email, user_name, complaint_id, category):
@@ -201,3 +202,83 @@ Municipal Services Team
     
     return send_email(user_email, subject, message)
 
+
+def send_notifications_batch(ctx, app, notifications):
+    """
+    Job function: send a batch of queued notifications
+    Each notification is a dict with a 'type' of 'assigned', 'resolved', 'status',
+    'sla_digest' or 'sla_warning'
+    """
+    sent = 0
+    failed = 0
+    with app.app_context():
+        for count, notification in enumerate(notifications, 1):
+            kind = notification.get('type')
+            if kind == 'assigned':
+                ok = send_complaint_assigned_email(notification['email'], notification['name'],
+                                                   notification['complaint_id'], notification.get('category', ''),
+                                                   notification.get('location', ''))
+            elif kind == 'resolved':
+                ok = send_complaint_resolved_email(notification['email'], notification['name'],
+                                                   notification['complaint_id'], notification.get('category', ''))
+            elif kind == 'status':
+                ok = send_status_update_email(notification['email'], notification['name'],
+                                              notification['complaint_id'], notification.get('status', ''))
+            elif kind == 'sla_warning':
+                ok = send_sla_warning_email(notification['email'], notification.get('name', 'Team'),
+                                            notification['complaint_id'], notification.get('category', ''),
+                                            notification.get('location', ''), notification['hours'])
+            elif kind == 'sla_digest':
+                ok = send_sla_breach_digest(notification['email'], notification.get('name'),
+                                            notification['complaints'])
+            else:
+                logger.warning("Unknown notification type: %s", kind)
+                ok = False
+            if ok:
+                sent += 1
+            else:
+                failed += 1
+            ctx.update_progress(count, len(notifications))
+    return {'sent': sent, 'failed': failed}
+
+def send_sla_breach_digest(department_email, department_name, complaints):
+    """Send a department the complaints that just breached their SLA"""
+    subject = f"SLA Breach Alert - {len(complaints)} complaint(s)"
+    lines = '\n'.join(
+        f"- {c['complaint_id']} | {c['category']} | {c['location']} | Priority: {c['priority']}"
+        for c in complaints
+    )
+    message = f"""
+Dear {department_name or 'Department'},
+
+The following complaints have passed their SLA deadline and were escalated:
+
+{lines}
+
+Please log in to review and act on them.
+
+Best regards,
+Municipal Services Team
+    """
+    
+    return send_email(department_email, subject, message)
+
+def send_sla_warning_email(to_email, name, complaint_id, category, location, hours):
+    """Warn the assignee (or department) that a complaint's SLA deadline is near"""
+    subject = f"SLA Deadline in {hours} Hours - {complaint_id}"
+    message = f"""
+Dear {name},
+
+The following complaint is due in less than {hours} hours:
+
+Complaint ID: {complaint_id}
+Category: {category}
+Location: {location}
+
+Please log in and update its status before the SLA deadline.
+
+Best regards,
+Municipal Services Team
+    """
+    
+    return send_email(to_email, subject, message)
@@ -0,0 +1,141 @@
+"""
+Complaint Exports
+Streams complaints from the category collections into CSV or XLSX files
+in EXPORTS_FOLDER with constant memory, for use as background jobs
+"""
+import os
+import csv
+import heapq
+import tempfile
+from datetime import datetime
+from functools import lru_cache
+
+EXPORT_FORMATS = ('csv', 'xlsx')
+
+# (column header, document field)
+EXPORT_COLUMNS = [
+    ('Complaint ID', 'complaint_id'),
+    ('Category', 'category'),
+    ('Status', 'status'),
+    ('Priority', 'priority'),
+    ('Urgent', 'is_urgent'),
+    ('Department', 'department'),
+    ('Location', 'location'),
+    ('Description', 'description'),
+    ('Citizen', 'user_name'),
+    ('Assigned To', 'assigned_to_name'),
+    ('Created At', 'created_at'),
+    ('Updated At', 'updated_at'),
+    ('SLA Deadline', 'sla_deadline'),
+    ('SLA Breached', 'sla_breached')
+]
+
+EXPORT_PROJECTION = {
+    'complaint_id': 1, 'category': 1, 'status': 1, 'priority': 1, 'is_urgent': 1,
+    'department': 1, 'location': 1, 'description': 1, 'user_id': 1, 'assigned_to': 1,
+    'created_at': 1, 'updated_at': 1, 'sla_deadline': 1, 'sla_breached': 1
+}
+
+BATCH_SIZE = 1000
+
+
+def iter_complaints(collections, query):
+    """
+    Yield complaints from several collections newest first
+    Each cursor is already sorted, so heapq.merge keeps only one document
+    per collection in memory at a time
+    """
+    cursors = [
+        collection.find(query, EXPORT_PROJECTION).sort('created_at', -1).batch_size(BATCH_SIZE)
+        for collection in collections
+    ]
+    return heapq.merge(*cursors, key=lambda doc: doc.get('created_at') or datetime.min, reverse=True)
+
+
+def make_name_lookup(users_collection, maxsize=10000):
+    """Cached user-id -> name lookup with bounded memory"""
+    @lru_cache(maxsize=maxsize)
+    def lookup(user_id):
+        if not user_id or users_collection is None:
+            return ''
+        user = users_collection.find_one({'_id': user_id}, {'name': 1})
+        return user.get('name', '') if user else ''
+    return lookup
+
+
+def export_row(doc, lookup_name):
+    """Convert a complaint document into a list of cell values"""
+    doc['user_name'] = lookup_name(doc.get('user_id'))
+    doc['assigned_to_name'] = lookup_name(doc.get('assigned_to'))
+    return [doc.get(field) for _, field in EXPORT_COLUMNS]
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return value
+
+
+def write_csv(path, rows, on_row=None):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow([header for header, _ in EXPORT_COLUMNS])
+        for count, row in enumerate(rows, 1):
+            writer.writerow([_csv_value(value) for value in row])
+            if on_row:
+                on_row(count)
+
+
+def write_xlsx(path, rows, on_row=None):
+    # openpyxl is only needed for XLSX exports, import it on demand
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Complaints')
+    sheet.append([header for header, _ in EXPORT_COLUMNS])
+    for count, row in enumerate(rows, 1):
+        sheet.append(['' if value is None else value for value in row])
+        if on_row:
+            on_row(count)
+    workbook.save(path)
+
+
+def run_export(ctx, collections, users_collection, query, export_format, exports_folder):
+    """
+    Job function: export complaints matching query to EXPORTS_FOLDER
+    Returns the result stored on the job (file name and row count)
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {export_format}")
+
+    total = sum(collection.count_documents(query) for collection in collections)
+    ctx.update_progress(0, total, force=True)
+
+    os.makedirs(exports_folder, exist_ok=True)
+    filename = f"complaints_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{ctx.job_id[-6:]}.{export_format}"
+    final_path = os.path.join(exports_folder, filename)
+
+    lookup_name = make_name_lookup(users_collection)
+    rows = (export_row(doc, lookup_name) for doc in iter_complaints(collections, query))
+    written = {'rows': 0}
+
+    def on_row(count):
+        written['rows'] = count
+        ctx.update_progress(count)
+
+    # Write to a temp file first so a partial export is never downloadable
+    fd, tmp_path = tempfile.mkstemp(dir=exports_folder, suffix=f".{export_format}.part")
+    os.close(fd)
+    try:
+        if export_format == 'csv':
+            write_csv(tmp_path, rows, on_row)
+        else:
+            write_xlsx(tmp_path, rows, on_row)
+        os.replace(tmp_path, final_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    ctx.update_progress(written['rows'], force=True)
+    return {'filename': filename, 'rows': written['rows'], 'format': export_format}
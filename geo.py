@@ -0,0 +1,197 @@
+"""
+Geospatial Queries
+Optional GeoJSON point per complaint ('geo', [longitude, latitude]) with a
+2dsphere index on each category collection, plus a geohash ('geohash') so
+hotspots are a $group on a geohash prefix. Nearby and within-polygon queries
+run through the index ($geoNear / $geoWithin) rather than scanning
+"""
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+GEO_INDEX = [('geo', '2dsphere')]
+GEOHASH_PRECISION = 9  # ~5m cells; hotspots group on a shorter prefix
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+POLYGON_TYPES = ('Polygon', 'MultiPolygon')
+
+
+def ensure_geo_indexes(collections, wards=None):
+    """
+    2dsphere index on each category collection and the wards (complaints without coordinates are skipped)
+    Returns False if any index failed (e.g. a legacy document with malformed geo data)
+    """
+    ok = True
+    for collection in list(collections) + ([wards] if wards is not None else []):
+        try:
+            collection.create_index(GEO_INDEX, name='geo_2dsphere')
+        except Exception as e:
+            logger.warning("Could not create geo index on %s: %s", collection.name, e)
+            ok = False
+    if wards is not None:
+        try:
+            wards.create_index('name', name='ward_name', unique=True)
+        except Exception as e:
+            logger.warning("Could not create ward index: %s", e)
+            ok = False
+    return ok
+
+
+def parse_point(latitude, longitude):
+    """GeoJSON point from latitude/longitude values; raises ValueError"""
+    try:
+        latitude = float(latitude)
+        longitude = float(longitude)
+    except (TypeError, ValueError):
+        raise ValueError('Latitude and longitude must be numbers')
+    if not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+        raise ValueError('Coordinates out of range')
+    return {'type': 'Point', 'coordinates': [longitude, latitude]}
+
+
+def validate_polygon(geometry):
+    """Check a GeoJSON Polygon/MultiPolygon enough to give a clear error; raises ValueError"""
+    if not isinstance(geometry, dict) or geometry.get('type') not in POLYGON_TYPES:
+        raise ValueError('Geometry must be a GeoJSON Polygon or MultiPolygon')
+    polygons = geometry.get('coordinates')
+    if geometry['type'] == 'Polygon':
+        polygons = [polygons]
+    if not isinstance(polygons, list) or not polygons:
+        raise ValueError('Polygon has no coordinates')
+    for rings in polygons:
+        if not isinstance(rings, list) or not rings:
+            raise ValueError('Polygon has no rings')
+        for ring in rings:
+            if not isinstance(ring, list) or len(ring) < 4 or ring[0] != ring[-1]:
+                raise ValueError('Polygon rings need at least four positions and must be closed')
+    return geometry
+
+
+def bbox_polygon(min_lng, min_lat, max_lng, max_lat):
+    """GeoJSON polygon for a bounding box (e.g. the visible map area)"""
+    return {'type': 'Polygon', 'coordinates': [[
+        [min_lng, min_lat], [max_lng, min_lat], [max_lng, max_lat], [min_lng, max_lat], [min_lng, min_lat]
+    ]]}
+
+
+# ---- geohash ----
+
+def geohash_encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Standard base-32 geohash of a point"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        value, bounds = (longitude, lng_range) if even else (latitude, lat_range)
+        middle = (bounds[0] + bounds[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            bounds[0] = middle
+        else:
+            bounds[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def geohash_bounds(geohash):
+    """(min_lat, min_lng, max_lat, max_lng) of a geohash cell"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            bounds = lng_range if even else lat_range
+            middle = (bounds[0] + bounds[1]) / 2
+            if value >> shift & 1:
+                bounds[0] = middle
+            else:
+                bounds[1] = middle
+            even = not even
+    return lat_range[0], lng_range[0], lat_range[1], lng_range[1]
+
+
+# ---- queries ----
+
+def find_nearby(collections, point, radius_m, query=None, projection=None, limit=50):
+    """Complaints within radius_m of point, nearest first, with 'distance' in metres"""
+    results = []
+    for collection in collections:
+        pipeline = [{'$geoNear': {
+            'near': point,
+            'distanceField': 'distance',
+            'maxDistance': radius_m,
+            'spherical': True,
+            'key': 'geo',
+            'query': query or {}
+        }}, {'$limit': limit}]
+        if projection:
+            pipeline.append({'$project': dict(projection, distance=1)})
+        results.extend(collection.aggregate(pipeline))
+    results.sort(key=lambda doc: doc['distance'])
+    return results[:limit]
+
+
+def find_within(collections, geometry, query=None, projection=None, limit=200):
+    """(complaints inside a polygon, total matching) across the category collections"""
+    query = dict(query or {}, geo={'$geoWithin': {'$geometry': geometry}})
+    complaints = []
+    total = 0
+    for collection in collections:
+        total += collection.count_documents(query)
+        if len(complaints) < limit:
+            complaints.extend(collection.find(query, projection).sort('created_at', -1).limit(limit - len(complaints)))
+    return complaints, total
+
+
+def hotspots(collections, precision=6, query=None, limit=100):
+    """Complaint counts per geohash cell of the given precision, busiest first"""
+    match = dict(query or {})
+    match.setdefault('geohash', {'$exists': True})
+    pipeline = [
+        {'$match': match},
+        {'$group': {
+            '_id': {'$substrCP': ['$geohash', 0, precision]},
+            'count': {'$sum': 1},
+            'urgent': {'$sum': {'$cond': [{'$eq': ['$is_urgent', True]}, 1, 0]}}
+        }}
+    ]
+    cells = {}
+    for collection in collections:
+        for group in collection.aggregate(pipeline):
+            cell = cells.setdefault(group['_id'], {'count': 0, 'urgent': 0})
+            cell['count'] += group['count']
+            cell['urgent'] += group['urgent']
+    result = []
+    for geohash, cell in sorted(cells.items(), key=lambda item: -item[1]['count'])[:limit]:
+        min_lat, min_lng, max_lat, max_lng = geohash_bounds(geohash)
+        result.append({
+            'geohash': geohash,
+            'count': cell['count'],
+            'urgent': cell['urgent'],
+            'center': {'lat': (min_lat + max_lat) / 2, 'lng': (min_lng + max_lng) / 2},
+            'bounds': [min_lng, min_lat, max_lng, max_lat]
+        })
+    return result
+
+
+def read_wards(path, name_property='name'):
+    """Ward documents ({'name', 'geo'}) from a GeoJSON FeatureCollection file"""
+    with open(path, encoding='utf-8') as handle:
+        data = json.load(handle)
+    features = data.get('features', []) if data.get('type') == 'FeatureCollection' else [data]
+    wards = []
+    for number, feature in enumerate(features, 1):
+        name = (feature.get('properties') or {}).get(name_property)
+        if not name:
+            raise ValueError(f"Feature {number} has no '{name_property}' property")
+        wards.append({'name': str(name), 'geo': validate_polygon(feature.get('geometry'))})
+    return wards
@@ -0,0 +1,42 @@
+"""
+Gunicorn settings: gunicorn -c gunicorn.conf.py wsgi:application
+Values come from Config (environment variables SERVER_BIND, WEB_CONCURRENCY,
+SERVER_THREADS, SERVER_PRELOAD, SERVER_TIMEOUT, SHUTDOWN_TIMEOUT)
+"""
+import os
+
+from config import Config
+
+os.environ['WSGI_SERVER'] = 'gunicorn'
+
+bind = Config.SERVER_BIND
+workers = Config.SERVER_WORKERS
+# Threaded workers: live dashboards (Server-Sent Events) hold a thread for the whole stream
+worker_class = 'gthread'
+threads = Config.SERVER_THREADS
+timeout = Config.SERVER_TIMEOUT
+graceful_timeout = Config.SHUTDOWN_TIMEOUT
+# Preloading imports the app once in the master, so workers fork ready to serve
+preload_app = Config.SERVER_PRELOAD
+max_requests = 5000
+max_requests_jitter = 500
+
+
+def on_starting(server):
+    """Start every run with empty /metrics totals (worker files of an earlier run are stale)"""
+    from utils.metrics import MetricsRegistry
+    if Config.METRICS_ENABLED:
+        MetricsRegistry(Config.METRICS_DIR).clear_directory()
+
+
+def post_fork(server, worker):
+    """Each worker gets its own MongoClient and background threads"""
+    import app as application_module
+    application_module.reconnect_after_fork()
+    application_module.start_background_tasks()
+
+
+def worker_exit(server, worker):
+    """Flush pending background work (e.g. queued notification emails) before the worker exits"""
+    import app as application_module
+    application_module.shutdown_background_tasks()
@@ -0,0 +1,272 @@
+"""
+Bulk Complaint Import
+Loads legacy complaints from CSV or JSONL files, validates them against the
+configured categories/priorities and writes them to the category collections
+with batched insert_many(ordered=False). Imports checkpoint after every batch
+so an interrupted run can resume where it stopped
+"""
+import logging
+import os
+import csv
+import json
+import hashlib
+from datetime import datetime
+from functools import lru_cache
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from utils.helpers import calculate_sla_deadline
+from utils.reports import RESOLVED_STATUSES
+
+logger = logging.getLogger(__name__)
+IMPORT_FORMATS = ('.csv', '.jsonl')
+DUPLICATE_KEY_ERROR = 11000
+MAX_INLINE_ERRORS = 100
+
+
+def checkpoint_path(path):
+    return f"{path}.checkpoint"
+
+
+def errors_path(path):
+    return f"{path}.errors.csv"
+
+
+def read_checkpoint(path):
+    """Last source line fully written by a previous run (0 if none)"""
+    try:
+        with open(checkpoint_path(path)) as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def write_checkpoint(path, line_no):
+    tmp = checkpoint_path(path) + '.tmp'
+    with open(tmp, 'w') as f:
+        f.write(str(line_no))
+    os.replace(tmp, checkpoint_path(path))
+
+
+def count_rows(path):
+    """Approximate number of data rows, used for progress only"""
+    with open(path, 'rb') as f:
+        lines = sum(1 for _ in f)
+    return max(lines - 1, 0) if path.endswith('.csv') else lines
+
+
+def iter_rows(path):
+    """Yield (line_no, row dict) from a CSV or JSONL file"""
+    if path.endswith('.csv'):
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+    elif path.endswith('.jsonl'):
+        with open(path, encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield line_no, json.loads(line)
+                except ValueError as e:
+                    yield line_no, ValueError(f"Invalid JSON: {e}")
+    else:
+        raise ValueError(f"Unsupported import file type (use {', '.join(IMPORT_FORMATS)})")
+
+
+def _parse_datetime(value):
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    value = str(value).strip().replace('Z', '')
+    for fmt in ('%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid date: {value}")
+
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value or '').strip().lower() in ('true', '1', 'yes', 'on')
+
+
+def build_complaint_doc(row, line_no, source_name, config, resolve_user):
+    """Validate a source row and turn it into a complaint document (raises ValueError)"""
+    def field(name, default=''):
+        value = row.get(name)
+        return default if value is None else str(value).strip()
+
+    category = field('category')
+    if category not in config['COMPLAINT_CATEGORIES']:
+        raise ValueError(f"Invalid category: '{category}'")
+    location = field('location')
+    description = field('description')
+    if not location or not description:
+        raise ValueError('Location and description are required')
+
+    is_urgent = _parse_bool(row.get('is_urgent'))
+    priority = field('priority', 'Normal') or 'Normal'
+    if priority not in config['PRIORITY_LEVELS']:
+        raise ValueError(f"Invalid priority: '{priority}'")
+    if is_urgent:
+        priority = 'Urgent'
+    status = field('status', 'Pending') or 'Pending'
+    if status not in config['STATUS_OPTIONS']:
+        raise ValueError(f"Invalid status: '{status}'")
+
+    created_at = _parse_datetime(row.get('created_at')) or datetime.utcnow()
+    updated_at = _parse_datetime(row.get('updated_at')) or created_at
+    sla_deadline = calculate_sla_deadline(priority, created_at)
+    user_id = resolve_user(field('user_id'), field('user_email').lower())
+    if user_id is None:
+        raise ValueError('Unknown user')
+
+    # Deterministic ID for rows without one, so re-running an import is idempotent
+    complaint_id = field('complaint_id') or field('legacy_id')
+    if not complaint_id:
+        digest = hashlib.sha1(f"{source_name}:{line_no}".encode('utf-8')).hexdigest()[:10].upper()
+        complaint_id = f"IMP-{digest}"
+
+    department_info = config['DEPARTMENTS'].get(category, config['DEPARTMENTS'].get('Other', {'name': 'General Department', 'code': 'GEN'}))
+    return {
+        'complaint_id': complaint_id,
+        'user_id': user_id,
+        'category': category,
+        'location': location,
+        'description': description,
+        'status': status,
+        'priority': priority,
+        'is_urgent': is_urgent,
+        'department': department_info.get('name', 'General Department'),
+        'department_code': department_info.get('code', 'GEN'),
+        'assigned_to': None,
+        'created_at': created_at,
+        'updated_at': updated_at,
+        'resolved_at': updated_at if status in RESOLVED_STATUSES else None,
+        'version': 1,
+        'sla_deadline': sla_deadline,
+        'sla_breached': status not in ('Resolved', 'Closed') and sla_deadline < datetime.utcnow(),
+        'comments': [],
+        'progress': [],
+        'proof_images': [],
+        'feedback': None,
+        'imported_from': source_name
+    }
+
+
+def make_user_resolver(users_collection, default_user_id):
+    """Resolve user_id / user_email columns to an ObjectId, cached"""
+    @lru_cache(maxsize=10000)
+    def by_email(email):
+        user = users_collection.find_one({'email': email}, {'_id': 1})
+        return user['_id'] if user else None
+
+    def resolve(user_id, user_email):
+        if user_id:
+            try:
+                return ObjectId(user_id)
+            except Exception:
+                raise ValueError(f"Invalid user_id: '{user_id}'")
+        if user_email:
+            return by_email(user_email)
+        return default_user_id
+    return resolve
+
+
+def ensure_import_indexes(collections):
+    """Unique complaint_id, so re-imported rows are rejected as duplicates; False if any failed"""
+    ok = True
+    for collection in collections:
+        try:
+            collection.create_index('complaint_id', unique=True, sparse=True)
+        except Exception as e:
+            logger.warning("Could not create complaint_id index on %s: %s", collection.name, e)
+            ok = False
+    return ok
+
+
+def run_import(ctx, path, collection_for, users_collection, config, default_user_id,
+               batch_size=1000, resume=False):
+    """
+    Job function: import complaints from path
+    collection_for(category) returns the category collection
+    Returns counts of inserted, duplicate and invalid rows
+    """
+    source_name = os.path.basename(path)
+    start_after = read_checkpoint(path) if resume else 0
+    total = count_rows(path)
+    ctx.update_progress(0, total, force=True)
+
+    resolve_user = make_user_resolver(users_collection, default_user_id)
+    counts = {'inserted': 0, 'duplicates': 0, 'errors': 0, 'skipped': 0}
+    inline_errors = []
+    buffers = {}
+    buffered = 0
+    last_line = start_after
+
+    error_file = open(errors_path(path), 'a' if resume else 'w', newline='', encoding='utf-8')
+    error_writer = csv.writer(error_file)
+    if not resume or error_file.tell() == 0:
+        error_writer.writerow(['line', 'error'])
+
+    def record_error(line_no, message):
+        counts['errors'] += 1
+        error_writer.writerow([line_no, message])
+        if len(inline_errors) < MAX_INLINE_ERRORS:
+            inline_errors.append({'line': line_no, 'error': message})
+
+    def flush(checkpoint_line):
+        for category, batch in buffers.items():
+            if not batch:
+                continue
+            docs = [doc for _, doc in batch]
+            try:
+                result = collection_for(category).insert_many(docs, ordered=False)
+                counts['inserted'] += len(result.inserted_ids)
+            except BulkWriteError as e:
+                details = e.details
+                counts['inserted'] += details.get('nInserted', 0)
+                for write_error in details.get('writeErrors', []):
+                    line_no = batch[write_error['index']][0]
+                    if write_error.get('code') == DUPLICATE_KEY_ERROR:
+                        counts['duplicates'] += 1
+                    else:
+                        record_error(line_no, write_error.get('errmsg', 'Write error'))
+        buffers.clear()
+        error_file.flush()
+        write_checkpoint(path, checkpoint_line)
+        ctx.save(checkpoint=checkpoint_line)
+
+    try:
+        processed = 0
+        for line_no, row in iter_rows(path):
+            processed += 1
+            if line_no <= start_after:
+                counts['skipped'] += 1
+                continue
+            last_line = line_no
+            if isinstance(row, Exception):
+                record_error(line_no, str(row))
+                continue
+            try:
+                doc = build_complaint_doc(row, line_no, source_name, config, resolve_user)
+            except ValueError as e:
+                record_error(line_no, str(e))
+                continue
+            buffers.setdefault(doc['category'], []).append((line_no, doc))
+            buffered += 1
+            if buffered >= batch_size:
+                flush(line_no)
+                buffered = 0
+            ctx.update_progress(processed, total)
+        flush(last_line)
+    finally:
+        error_file.close()
+
+    ctx.update_progress(total, total, force=True)
+    return dict(counts, errors_file=os.path.basename(errors_path(path)), sample_errors=inline_errors)
@@ -0,0 +1,235 @@
+"""
+Background Jobs
+Small thread-pool job runner for long tasks (exports, reports, imports)
+Job state is kept in the 'jobs' collection so any app node can report progress
+"""
+import logging
+import time
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+
+class JobContext:
+    """Handed to job functions so they can report progress"""
+
+    def __init__(self, manager, job_id, min_interval=1.0):
+        self.manager = manager
+        self.job_id = job_id
+        self.min_interval = min_interval
+        self._last_update = 0.0
+
+    def update_progress(self, processed, total=None, force=False):
+        """Record progress, throttled to one write per min_interval seconds"""
+        now = time.monotonic()
+        if not force and now - self._last_update < self.min_interval:
+            return
+        self._last_update = now
+        changes = {'processed': processed}
+        if total is not None:
+            changes['total'] = total
+        self.manager._update(self.job_id, changes)
+
+    def save(self, **changes):
+        """Store extra fields (e.g. checkpoints) on the job document"""
+        self.manager._update(self.job_id, changes)
+
+
+class ConsoleContext:
+    """Stand-in for JobContext when a job function runs from the command line"""
+
+    def __init__(self, job_id='cli', min_interval=2.0):
+        self.job_id = job_id
+        self.min_interval = min_interval
+        self._last_update = 0.0
+        self.fields = {}
+
+    def update_progress(self, processed, total=None, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_update < self.min_interval:
+            return
+        self._last_update = now
+        if total:
+            print(f"  ... {processed}/{total} ({100.0 * processed / total:.1f}%)")
+        else:
+            print(f"  ... {processed}")
+
+    def save(self, **changes):
+        self.fields.update(changes)
+
+
+class JobManager:
+    """Runs job functions on a thread pool and tracks their state"""
+
+    def __init__(self, collection=None, max_workers=2):
+        self.collection = collection
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = {}
+        self._active = {}  # job type -> queued or running jobs
+        self._lock = threading.Lock()
+
+    def submit(self, job_type, func, params=None, user_id=None, **kwargs):
+        """
+        Queue func(ctx, **kwargs) and return the job id
+        params is stored with the job for display; kwargs are passed to func
+        """
+        job = {
+            '_id': ObjectId(),
+            'type': job_type,
+            'status': 'queued',
+            'params': params or {},
+            'processed': 0,
+            'total': None,
+            'result': None,
+            'error': None,
+            'created_by': ObjectId(user_id) if isinstance(user_id, str) else user_id,
+            'created_at': datetime.utcnow(),
+            'started_at': None,
+            'finished_at': None
+        }
+        job_id = str(job['_id'])
+        with self._lock:
+            self._jobs[job_id] = job
+            self._active[job_type] = self._active.get(job_type, 0) + 1
+        if self.collection is not None:
+            try:
+                self.collection.insert_one(dict(job))
+            except Exception as e:
+                logger.error("Error saving job %s: %s", job_id, e)
+        self.executor.submit(self._run, job_id, job_type, func, kwargs)
+        return job_id
+
+    def _run(self, job_id, job_type, func, kwargs):
+        self._update(job_id, {'status': 'running', 'started_at': datetime.utcnow()})
+        ctx = JobContext(self, job_id)
+        try:
+            result = func(ctx, **kwargs)
+            self._update(job_id, {
+                'status': 'completed',
+                'result': result,
+                'finished_at': datetime.utcnow()
+            })
+        except Exception as e:
+            logger.exception("Job %s failed: %s", job_id, e)
+            self._update(job_id, {
+                'status': 'failed',
+                'error': str(e),
+                'finished_at': datetime.utcnow()
+            })
+        finally:
+            with self._lock:
+                self._active[job_type] -= 1
+
+    def active_counts(self):
+        """job type -> jobs queued or running in this process"""
+        with self._lock:
+            return dict(self._active)
+
+    def _update(self, job_id, changes):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(changes)
+        if self.collection is not None:
+            try:
+                self.collection.update_one({'_id': ObjectId(job_id)}, {'$set': changes})
+            except Exception as e:
+                logger.error("Error updating job %s: %s", job_id, e)
+
+    def get(self, job_id):
+        """Return the job document, or None"""
+        if self.collection is not None:
+            try:
+                job = self.collection.find_one({'_id': ObjectId(job_id)})
+                if job:
+                    return job
+            except Exception:
+                pass
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list_jobs(self, job_type=None, limit=20):
+        """Most recent jobs, optionally of one type"""
+        query = {'type': job_type} if job_type else {}
+        if self.collection is not None:
+            try:
+                return list(self.collection.find(query).sort('created_at', -1).limit(limit))
+            except Exception as e:
+                logger.error("Error listing jobs: %s", e)
+        with self._lock:
+            jobs = [dict(job) for job in self._jobs.values()
+                    if not job_type or job['type'] == job_type]
+        jobs.sort(key=lambda job: job['created_at'], reverse=True)
+        return jobs[:limit]
+
+    def shutdown(self, wait=True):
+        """Stop accepting jobs; with wait=True, let running jobs finish"""
+        self.executor.shutdown(wait=wait)
+
+
+class PeriodicTask:
+    """Calls func() every interval seconds on a daemon thread until stopped"""
+
+    def __init__(self, name, func, interval):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.func()
+            except Exception as e:
+                logger.exception("Periodic task %s failed: %s", self.name, e)
+
+
+def acquire_lease(collection, name, seconds, owner=None):
+    """
+    Try to take a named lease for the given number of seconds
+    Returns True for exactly one caller across processes until it expires;
+    used so periodic tasks run once per interval however many workers start them
+    """
+    if collection is None:
+        return True
+    now = datetime.utcnow()
+    try:
+        collection.update_one(
+            {'_id': name, 'expires_at': {'$lt': now}},
+            {'$set': {'expires_at': now + timedelta(seconds=seconds), 'owner': owner, 'acquired_at': now}},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        # Lease exists and has not expired
+        return False
+
+
+def job_to_json(job):
+    """Serialize a job document for JSON responses"""
+    if not job:
+        return None
+    data = dict(job)
+    data['_id'] = str(data['_id'])
+    if data.get('created_by'):
+        data['created_by'] = str(data['created_by'])
+    total = data.get('total')
+    data['percent'] = round(100.0 * data.get('processed', 0) / total, 1) if total else None
+    return data
@@ -0,0 +1,152 @@
+"""
+Keyword Escalation
+Complaints whose description mentions a hazard ("live wire", "gas smell",
+"sewage overflow", ...) are escalated at submission. All keywords are
+compiled once into an Aho-Corasick automaton, so a description is scanned
+in a single pass however long the keyword list grows
+
+Matching works on normalized text (lowercase words separated by single
+spaces), and keywords only match whole words: "gas leak" does not match
+"gas leakage"
+"""
+import re
+from collections import deque
+from datetime import datetime
+from pymongo import UpdateOne
+
+from utils.helpers import calculate_sla_deadline
+
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+RESCAN_PROJECTION = {'complaint_id': 1, 'description': 1, 'priority': 1, 'is_urgent': 1,
+                     'created_at': 1, 'escalation_keywords': 1, 'category': 1, 'status': 1, 'assigned_to': 1}
+
+
+def normalize(text):
+    """Lowercase words separated by single spaces, padded so keywords match whole words"""
+    return f" {' '.join(_NON_WORD.sub(' ', (text or '').lower()).split())} "
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over keyword -> priority"""
+
+    def __init__(self, keywords):
+        self.keywords = {}
+        self._goto = [{}]    # state -> {char: state}
+        self._fail = [0]
+        self._output = [[]]  # state -> keywords ending here
+        for keyword, priority in (keywords or {}).items():
+            pattern = normalize(keyword)
+            if pattern.strip():
+                self.keywords[pattern.strip()] = priority
+                self._insert(pattern)
+        self._build_failure_links()
+
+    def _insert(self, pattern):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = next_state
+            state = next_state
+        self._output[state].append(pattern.strip())
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                if self._fail[next_state] == next_state:
+                    self._fail[next_state] = 0
+                # Inherit the matches of the longest proper suffix
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def scan(self, text):
+        """Sorted keywords found in text (one pass over the normalized text)"""
+        if not self.keywords:
+            return []
+        found = set()
+        state = 0
+        goto, fail, output = self._goto, self._fail, self._output
+        for char in normalize(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return sorted(found)
+
+    def escalation(self, matches, priority_levels):
+        """The most severe (shortest SLA) priority among the matched keywords, or None"""
+        priorities = [self.keywords[match] for match in matches if self.keywords.get(match) in priority_levels]
+        if not priorities:
+            return None
+        return min(priorities, key=lambda priority: priority_levels[priority].get('days', 0))
+
+    def __len__(self):
+        return len(self.keywords)
+
+
+def is_more_severe(priority, current, priority_levels):
+    """True if priority has a shorter SLA than current"""
+    if priority not in priority_levels:
+        return False
+    current_days = priority_levels.get(current, {}).get('days', float('inf'))
+    return priority_levels[priority].get('days', 0) < current_days
+
+
+def escalation_update(doc, matches, priority, now):
+    """$set fields for escalating a complaint to priority because of matches"""
+    sla_deadline = calculate_sla_deadline(priority, doc.get('created_at') or now)
+    update_set = {
+        'priority': priority,
+        'sla_deadline': sla_deadline,
+        'sla_breached': sla_deadline < now,
+        'escalation_keywords': matches,
+        'escalated_from': doc.get('priority'),
+        'escalated_at': now,
+        'updated_at': now
+    }
+    if priority == 'Urgent':
+        update_set['is_urgent'] = True
+    return update_set
+
+
+def rescan_collection(matcher, collection, query, priority_levels, batch_size=500, now=None):
+    """
+    Rescan complaints (e.g. after the keyword list changed), escalating newly
+    matching ones and refreshing keyword tags. Priorities are never lowered
+    Returns (complaint, update_set) for each escalated complaint
+    """
+    now = now or datetime.utcnow()
+    escalated = []
+    ops = []
+
+    def flush():
+        if ops:
+            collection.bulk_write(ops, ordered=False)
+            ops.clear()
+
+    for doc in collection.find(query, RESCAN_PROJECTION):
+        matches = matcher.scan(doc.get('description'))
+        priority = matcher.escalation(matches, priority_levels)
+        if priority and is_more_severe(priority, doc.get('priority'), priority_levels):
+            update_set = escalation_update(doc, matches, priority, now)
+            escalated.append((doc, update_set))
+        elif matches != (doc.get('escalation_keywords') or []):
+            update_set = {'escalation_keywords': matches}
+        else:
+            continue
+        ops.append(UpdateOne({'_id': doc['_id']}, {'$set': update_set, '$inc': {'version': 1}}))
+        if len(ops) >= batch_size:
+            flush()
+    flush()
+    return escalated
@@ -0,0 +1,298 @@
+"""
+Live Dashboard Updates
+One background feed per process watches the category collections (a MongoDB
+change stream on the complaints database, or polling on updated_at when the
+server is standalone) and fans events out to Server-Sent Events subscribers.
+Counters are recomputed at most once per stats_interval and only after a
+change, so database load follows the change rate, not the number of open
+dashboards
+"""
+import json
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from pymongo.errors import OperationFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+EVENT_FIELDS = ('complaint_id', 'category', 'location', 'status', 'priority', 'is_urgent',
+                'assigned_to', 'created_at', 'updated_at')
+EVENT_PROJECTION = {field: 1 for field in EVENT_FIELDS}
+CLOSED_FOR_URGENT = ['Resolved', 'Closed']
+NOT_REPLICA_SET = 40573
+
+
+def format_sse(event, data):
+    """Encode one Server-Sent Event"""
+    payload = json.dumps(data, default=_json_default)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def complaint_event(doc, op):
+    """The subset of a complaint pushed to dashboards"""
+    event = {field: doc.get(field) for field in EVENT_FIELDS}
+    event['_id'] = str(doc['_id'])
+    event['assigned_to'] = str(doc['assigned_to']) if doc.get('assigned_to') else None
+    event['op'] = op
+    return event
+
+
+class Subscriber:
+    """One connected dashboard"""
+
+    def __init__(self, role, user_id, maxsize=100):
+        self.role = role
+        self.user_id = str(user_id)
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = False
+
+    def wants(self, complaint):
+        return self.role == 'admin' or complaint.get('assigned_to') == self.user_id
+
+    def put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            # Too slow to keep up; the client reconnects and gets a fresh snapshot
+            self.dropped = True
+
+    def get(self, timeout):
+        """Next queued message, or None after timeout"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class ChangeFeed:
+    """Watches complaint changes and pushes events and counters to subscribers"""
+
+    def __init__(self, database, collection_names, poll_interval=5, stats_interval=2, max_subscribers=None):
+        self.database = database
+        self.collection_names = list(collection_names)
+        self.poll_interval = poll_interval
+        self.stats_interval = stats_interval
+        self.max_subscribers = max_subscribers  # Each stream holds a server thread
+        self.mode = None  # 'change_stream' or 'polling'
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._stats = None
+        self._stats_dirty = True
+        self._last_stats_at = 0.0
+        self._thread = None
+        self._stop = threading.Event()
+
+    # ---- subscribers ----
+
+    def subscribe(self, role, user_id):
+        """A new subscriber, or None when max_subscribers streams are already open"""
+        subscriber = Subscriber(role, user_id)
+        with self._lock:
+            if self.max_subscribers is not None and len(self._subscribers) >= self.max_subscribers:
+                return None
+            self._subscribers.add(subscriber)
+        self.start()
+        snapshot = self.stats_for(subscriber)
+        if snapshot is not None:
+            subscriber.put(format_sse('stats', snapshot))
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def _broadcast_complaint(self, event):
+        message = format_sse('complaint', event)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            if subscriber.wants(event):
+                subscriber.put(message)
+
+    # ---- counters ----
+
+    def _collections(self):
+        return [self.database[name] for name in self.collection_names]
+
+    def compute_stats(self):
+        """Admin and per-staff counters from one $group per collection"""
+        pipeline = [{'$group': {
+            '_id': {'status': '$status', 'assigned_to': '$assigned_to', 'urgent': {'$eq': ['$is_urgent', True]}},
+            'count': {'$sum': 1}
+        }}]
+        admin = {'total': 0, 'pending': 0, 'in_progress': 0, 'resolved': 0, 'urgent': 0}
+        staff = {}
+        for collection in self._collections():
+            for group in collection.aggregate(pipeline):
+                status = group['_id'].get('status')
+                count = group['count']
+                admin['total'] += count
+                if group['_id'].get('urgent') and status not in CLOSED_FOR_URGENT:
+                    admin['urgent'] += count
+                key = {'Pending': 'pending', 'In Progress': 'in_progress', 'Resolved': 'resolved'}.get(status)
+                if key:
+                    admin[key] += count
+                assigned_to = group['_id'].get('assigned_to')
+                if assigned_to:
+                    counts = staff.setdefault(str(assigned_to),
+                                              {'assigned': 0, 'pending': 0, 'in_progress': 0, 'resolved': 0})
+                    counts['assigned'] += count
+                    if key:
+                        counts[key] += count
+        return {'admin': admin, 'staff': staff}
+
+    def stats_for(self, subscriber, stats=None):
+        stats = stats or self._stats
+        if stats is None:
+            try:
+                stats = self._stats = self.compute_stats()
+                self._last_stats_at = time.monotonic()
+                self._stats_dirty = False
+            except PyMongoError as e:
+                logger.warning("Live stats unavailable: %s", e)
+                return None
+        if subscriber.role == 'admin':
+            return stats['admin']
+        return stats['staff'].get(subscriber.user_id, {'assigned': 0, 'pending': 0, 'in_progress': 0, 'resolved': 0})
+
+    def _refresh_stats(self, force=False):
+        if not self._stats_dirty and not force:
+            return
+        if not force and time.monotonic() - self._last_stats_at < self.stats_interval:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if not subscribers:
+            # Nobody is watching; recompute when someone subscribes
+            self._stats = None
+            return
+        previous = self._stats
+        stats = self.compute_stats()
+        self._stats = stats
+        self._stats_dirty = False
+        self._last_stats_at = time.monotonic()
+        # Only send counters to dashboards whose numbers changed
+        for subscriber in subscribers:
+            current = self.stats_for(subscriber, stats)
+            if previous is None or self.stats_for(subscriber, previous) != current:
+                subscriber.put(format_sse('stats', current))
+
+    # ---- feed thread ----
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='live-feed', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _handle(self, doc, op):
+        self._stats_dirty = True
+        self._broadcast_complaint(complaint_event(doc, op))
+
+    def _run(self):
+        try:
+            self._watch()
+        except OperationFailure as e:
+            if e.code != NOT_REPLICA_SET and 'replica set' not in str(e):
+                logger.warning("Change stream failed, falling back to polling: %s", e)
+            self._poll()
+        except (PyMongoError, NotImplementedError) as e:
+            logger.warning("Change streams unavailable, falling back to polling: %s", e)
+            self._poll()
+
+    def _watch(self):
+        pipeline = [{'$match': {
+            'operationType': {'$in': ['insert', 'update', 'replace']},
+            'ns.coll': {'$in': self.collection_names}
+        }}]
+        resume_token = None
+        while not self._stop.is_set():
+            try:
+                with self.database.watch(pipeline, full_document='updateLookup',
+                                         resume_after=resume_token, max_await_time_ms=1000) as stream:
+                    self.mode = 'change_stream'
+                    while stream.alive and not self._stop.is_set():
+                        change = stream.try_next()
+                        if change is not None:
+                            resume_token = stream.resume_token
+                            if change.get('fullDocument'):
+                                self._handle(change['fullDocument'], change['operationType'])
+                        self._refresh_stats()
+            except OperationFailure:
+                if self.mode is None:
+                    raise
+                # Resume token too old or similar: start a fresh stream
+                resume_token = None
+                self._stats_dirty = True
+            except PyMongoError as e:
+                if self.mode is None:
+                    raise
+                logger.warning("Change stream interrupted, resuming: %s", e)
+                self._stop.wait(1)
+
+    def _poll(self):
+        """Fallback for standalone servers: (updated_at, _id) paging per collection per interval"""
+        self.mode = 'polling'
+        watermarks = {}
+        for collection in self._collections():
+            try:
+                collection.create_index([('updated_at', 1), ('_id', 1)])
+                watermarks[collection.name] = latest_watermark(collection)
+            except PyMongoError as e:
+                logger.warning("Live polling could not read %s: %s", collection.name, e)
+        while not self._stop.wait(self.poll_interval):
+            try:
+                for collection in self._collections():
+                    if collection.name not in watermarks:
+                        watermarks[collection.name] = latest_watermark(collection)
+                        continue
+                    docs, watermarks[collection.name] = changes_after(collection, watermarks[collection.name])
+                    for doc in docs:
+                        op = 'insert' if doc.get('created_at') == doc.get('updated_at') else 'update'
+                        self._handle(doc, op)
+                self._refresh_stats()
+            except PyMongoError as e:
+                logger.error("Live polling failed: %s", e)
+
+
+def latest_watermark(collection):
+    """Polling watermark: (updated_at, _id) of the most recently updated document"""
+    latest = collection.find_one({'updated_at': {'$ne': None}}, {'updated_at': 1},
+                                 sort=[('updated_at', -1), ('_id', -1)])
+    if not latest:
+        return datetime(1970, 1, 1), None
+    return latest['updated_at'], latest['_id']
+
+
+def changes_after(collection, watermark, page_size=500):
+    """
+    Documents updated after watermark, oldest first, and the new watermark
+    Pages on (updated_at, _id), so any number of documents sharing one
+    updated_at (bulk actions, SLA sweeps) are read once each and never stall the feed
+    """
+    docs = []
+    since, last_id = watermark
+    while True:
+        query = {'updated_at': {'$gt': since}}
+        if last_id is not None:
+            query = {'$or': [query, {'updated_at': since, '_id': {'$gt': last_id}}]}
+        page = list(collection.find(query, EVENT_PROJECTION).sort([('updated_at', 1), ('_id', 1)]).limit(page_size))
+        docs.extend(page)
+        if page:
+            since, last_id = page[-1]['updated_at'], page[-1]['_id']
+        if len(page) < page_size:
+            return docs, (since, last_id)
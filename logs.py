@@ -0,0 +1,199 @@
+"""
+Structured Logging
+Every record goes to a bounded in-memory queue (QueueHandler) and a single
+writer thread (QueueListener) formats it and writes it to stdout, so a
+request thread never waits on I/O to log. Records carry the request ID of
+the request that emitted them (X-Request-ID, generated when absent)
+
+Output is one JSON object per line, or plain text for development. Call
+sites use %-style arguments (logger.debug("... %s", value)), so a disabled
+level costs one level check and nothing is formatted. At DEBUG,
+LOG_DEBUG_SAMPLE keeps the debug lines of one request in N
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import uuid
+import zlib
+from datetime import datetime
+
+from flask import g, has_request_context
+
+_REQUEST_ID = re.compile(r'^[A-Za-z0-9._:-]{1,64}$')
+
+# LogRecord attributes that are not 'extra' fields
+_RECORD_FIELDS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'request_id'}
+
+# Chatty libraries stay at WARNING even when the app logs at DEBUG
+QUIET_LOGGERS = ('pymongo', 'urllib3', 'PIL')
+
+
+def new_request_id(header_value=None):
+    """The caller's X-Request-ID if it looks sane, otherwise a fresh one"""
+    if header_value and _REQUEST_ID.match(header_value):
+        return header_value
+    return uuid.uuid4().hex
+
+
+def current_request_id():
+    if has_request_context():
+        return getattr(g, 'request_id', None)
+    return None
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps records with the current request ID (runs on the emitting thread)"""
+
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = current_request_id()
+        return True
+
+
+class DebugSampler(logging.Filter):
+    """
+    Keeps DEBUG records of one request in every_n (decided by request ID, so a
+    kept request logs all of its debug lines) and, outside requests, every
+    n-th record from each call site. Other levels always pass
+    """
+
+    def __init__(self, every_n=1):
+        super().__init__()
+        self.every_n = max(1, int(every_n))
+        self._counts = {}
+
+    def filter(self, record):
+        if self.every_n == 1 or record.levelno > logging.DEBUG:
+            return True
+        request_id = getattr(record, 'request_id', None)
+        if request_id:
+            return zlib.crc32(request_id.encode()) % self.every_n == 0
+        site = (record.pathname, record.lineno)
+        count = self._counts.get(site, 0)
+        self._counts[site] = count + 1  # Racy across threads, which only shifts the sample
+        return count % self.every_n == 0
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records when the queue is full instead of blocking"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        # Resolve the message now (arguments may change after this returns) but leave the
+        # formatting into JSON/text to the writer thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; extra={...} fields are included as-is"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.utcfromtimestamp(record.created).isoformat(timespec='milliseconds') + 'Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+            'pid': record.process,
+            'thread': record.threadName
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+TEXT_FORMAT = '%(asctime)s %(levelname)-7s [%(request_id)s] %(name)s: %(message)s'
+
+
+class _Pipeline:
+    """The queue handler installed on the root logger and the writer thread behind it"""
+
+    def __init__(self):
+        self.handler = None
+        self.listener = None
+        self.output = None
+        self.queue_size = 0
+
+    def start(self):
+        self.handler.queue = queue.Queue(maxsize=self.queue_size)
+        self.listener = logging.handlers.QueueListener(self.handler.queue, self.output, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self):
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            try:
+                listener.stop()  # Writes out whatever is still queued
+            except queue.Full:
+                pass
+
+    def restart_in_child(self):
+        # The writer thread does not survive fork(); a forked worker gets its own queue and thread
+        self.listener = None
+        self.start()
+
+
+_pipeline = _Pipeline()
+
+
+def setup_logging(config):
+    """Route all logging through the queue pipeline (once per process; forked children restart it)"""
+    if _pipeline.handler is not None:
+        return _pipeline.handler
+
+    output = logging.StreamHandler(sys.stdout)
+    if config.get('LOG_FORMAT') == 'text':
+        output.setFormatter(logging.Formatter(TEXT_FORMAT))
+    else:
+        output.setFormatter(JsonFormatter())
+
+    handler = NonBlockingQueueHandler(queue.Queue())
+    handler.addFilter(RequestIdFilter())
+    handler.addFilter(DebugSampler(config.get('LOG_DEBUG_SAMPLE', 1)))
+
+    _pipeline.handler = handler
+    _pipeline.output = output
+    _pipeline.queue_size = config.get('LOG_QUEUE_SIZE', 10000)
+    _pipeline.start()
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(config.get('LOG_LEVEL', 'INFO'))
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(max(logging.WARNING, root.level))
+
+    atexit.register(_pipeline.stop)
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_pipeline.restart_in_child)
+    return handler
+
+
+def dropped_records():
+    """Records dropped because the queue was full (this process)"""
+    return _pipeline.handler.dropped if _pipeline.handler is not None else 0
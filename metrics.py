@@ -0,0 +1,364 @@
+"""
+Metrics
+Counters, gauges and histograms exposed in the Prometheus text format
+(/metrics). Recording is a dict update under one lock in the current process
+
+With several worker processes (gunicorn) each process writes its values to
+METRICS_DIR every few seconds, and /metrics (answered by whichever worker
+gets the scrape) adds up the files of all workers: counters and histograms
+include workers that have exited (folded into one archive file), so totals
+never go backwards, while gauges and active-session sets only count processes
+that are still running
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FILE_PREFIX = 'metrics-'
+ARCHIVE_FILE = 'metrics-archive.json'  # Totals of workers that have exited
+LOCK_FILE = '.lock'
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, registry, name, help_text, labels=()):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}  # label values tuple -> value
+
+    def _describe(self):
+        return {'kind': self.kind, 'help': self.help, 'labels': list(self.labels)}
+
+    def snapshot(self):
+        with self.registry.lock:
+            values = [[list(key), value] for key, value in self._values.items()]
+        return dict(self._describe(), values=values)
+
+    def reset(self):
+        self._values = {}
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *label_values, amount=1):
+        with self.registry.lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+
+class Gauge(_Metric):
+    """Set directly, or computed by callback() when values are collected"""
+    kind = 'gauge'
+
+    def __init__(self, registry, name, help_text, labels=(), callback=None):
+        super().__init__(registry, name, help_text, labels)
+        self.callback = callback
+
+    def set(self, value, *label_values):
+        with self.registry.lock:
+            self._values[label_values] = value
+
+    def snapshot(self):
+        if self.callback is not None:
+            try:
+                value = self.callback()  # Outside the registry lock: callbacks take their own locks
+            except Exception:
+                value = None
+            if isinstance(value, dict):
+                values = {key if isinstance(key, tuple) else (key,): count for key, count in value.items()}
+            else:
+                values = {(): value} if value is not None else {}
+            with self.registry.lock:
+                self._values = values
+        return super().snapshot()
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)  # Buckets are upper bounds (le)
+        with self.registry.lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def _describe(self):
+        return dict(super()._describe(), buckets=list(self.buckets))
+
+    def snapshot(self):
+        with self.registry.lock:
+            values = [[list(key), [list(entry[0]), entry[1], entry[2]]] for key, entry in self._values.items()]
+        return dict(self._describe(), values=values)
+
+
+class ActiveSet(_Metric):
+    """Distinct keys (e.g. user IDs) seen within the last window seconds, exported as a gauge"""
+    kind = 'set'
+
+    def __init__(self, registry, name, help_text, window=900):
+        super().__init__(registry, name, help_text)
+        self.window = window
+
+    def touch(self, key):
+        self._values[key] = time.time()  # A plain dict store; no lock needed
+
+    def snapshot(self):
+        cutoff = time.time() - self.window
+        with self.registry.lock:
+            self._values = {key: seen for key, seen in list(self._values.items()) if seen >= cutoff}
+            keys = list(self._values)
+        return dict(self._describe(), values=keys)
+
+
+class MetricsRegistry:
+    """All metrics of this process, plus the files of sibling worker processes"""
+
+    def __init__(self, directory=None):
+        self.directory = directory or None
+        self.lock = threading.Lock()
+        self._metrics = {}
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def _add(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._add(Counter(self, name, help_text, labels))
+
+    def gauge(self, name, help_text, labels=(), callback=None):
+        return self._add(Gauge(self, name, help_text, labels, callback))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(self, name, help_text, labels, buckets))
+
+    def active_set(self, name, help_text, window=900):
+        return self._add(ActiveSet(self, name, help_text, window))
+
+    def reset(self):
+        """Forget recorded values (a forked worker must not report its parent's counts)"""
+        with self.lock:
+            for metric in self._metrics.values():
+                metric.reset()
+
+    def snapshot(self):
+        metrics = {name: metric.snapshot() for name, metric in list(self._metrics.items())}
+        return {'pid': os.getpid(), 'written_at': time.time(), 'metrics': metrics}
+
+    # ---- multi-process ----
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f"{FILE_PREFIX}{pid}.json")
+
+    def flush(self):
+        """Write this process's values for the other workers to read, then fold in exited workers"""
+        if not self.directory:
+            return
+        _write_json(self._path(os.getpid()), self.snapshot())
+        self.compact()
+
+    def clear_directory(self):
+        """Remove files left by earlier runs (call once before any worker starts)"""
+        if not self.directory:
+            return
+        for filename in os.listdir(self.directory):
+            if filename.startswith(FILE_PREFIX):
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                except OSError:
+                    pass
+
+    def _worker_files(self):
+        """(pid, path) for each worker file in the directory"""
+        for filename in os.listdir(self.directory):
+            if not (filename.startswith(FILE_PREFIX) and filename.endswith('.json')):
+                continue
+            try:
+                pid = int(filename[len(FILE_PREFIX):-len('.json')])
+            except ValueError:
+                continue  # The archive
+            yield pid, os.path.join(self.directory, filename)
+
+    def collect(self):
+        """Merged snapshots: this process live, other workers from their last flush"""
+        own = self.snapshot()
+        own['alive'] = True
+        snapshots = [own]
+        if self.directory:
+            with _directory_lock(self.directory, exclusive=False):
+                archive = _read_json(os.path.join(self.directory, ARCHIVE_FILE))
+                if archive is not None:
+                    snapshots.append(archive)
+                for pid, path in self._worker_files():
+                    snapshot = _read_json(path) if pid != own['pid'] else None
+                    if snapshot is not None:
+                        snapshot['alive'] = _pid_alive(pid)
+                        snapshots.append(snapshot)
+        return merge(snapshots)
+
+    def compact(self):
+        """
+        Fold the counters and histograms of exited workers into one archive file,
+        so recycled workers (gunicorn max_requests) do not pile up files
+        """
+        if not self.directory or fcntl is None:
+            return
+        with _directory_lock(self.directory, exclusive=True):
+            dead = [path for pid, path in self._worker_files() if not _pid_alive(pid)]
+            if not dead:
+                return
+            archive_path = os.path.join(self.directory, ARCHIVE_FILE)
+            snapshots = [_read_json(path) for path in [archive_path] + dead]
+            merged = merge([snapshot for snapshot in snapshots if snapshot is not None])
+            _write_json(archive_path, {'pid': None, 'written_at': time.time(), 'metrics': _as_snapshot(merged)})
+            for path in dead:
+                os.remove(path)
+
+    def render(self):
+        return render(self.collect())
+
+
+@contextmanager
+def _directory_lock(directory, exclusive):
+    if fcntl is None:
+        yield  # Windows: a single process, nothing to coordinate
+        return
+    with open(os.path.join(directory, LOCK_FILE), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)  # Readers see the old file or the new one, never half of one
+
+
+def _pid_alive(pid):
+    if os.name == 'nt':
+        return pid == os.getpid()  # Windows runs a single process (waitress)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def merge(snapshots):
+    """name -> metric description with values summed (or unioned) across processes"""
+    merged = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot['metrics'].items():
+            kind = metric['kind']
+            if kind in ('gauge', 'set') and not snapshot.get('alive'):
+                continue
+            target = merged.get(name)
+            if target is None:
+                target = merged[name] = dict(metric, values={} if kind != 'set' else set())
+            if kind == 'set':
+                target['values'].update(metric['values'])
+                continue
+            for labels, value in metric['values']:
+                key = tuple(labels)
+                current = target['values'].get(key)
+                if kind == 'histogram':
+                    if current is None or len(current[0]) != len(value[0]):
+                        target['values'][key] = [list(value[0]), value[1], value[2]]
+                    else:
+                        current[0] = [a + b for a, b in zip(current[0], value[0])]
+                        current[1] += value[1]
+                        current[2] += value[2]
+                else:
+                    target['values'][key] = (current or 0) + value
+    return merged
+
+
+def _as_snapshot(merged):
+    """Merged metrics back in the per-process file format"""
+    metrics = {}
+    for name, metric in merged.items():
+        values = metric['values']
+        values = list(values) if metric['kind'] == 'set' else [[list(key), value] for key, value in values.items()]
+        metrics[name] = dict(metric, values=values)
+    return metrics
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _label_text(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def render(merged):
+    """Prometheus text exposition format (version 0.0.4)"""
+    lines = []
+    for name in sorted(merged):
+        metric = merged[name]
+        kind = metric['kind']
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {'gauge' if kind == 'set' else kind}")
+        if kind == 'set':
+            lines.append(f"{name} {len(metric['values'])}")
+            continue
+        labels = metric['labels']
+        for key in sorted(metric['values'], key=lambda values: [str(value) for value in values]):
+            value = metric['values'][key]
+            if kind == 'histogram':
+                cumulative = 0
+                for bound, count in zip(list(metric['buckets']) + [float('inf')], value[0]):
+                    cumulative += count
+                    le = 'le="%s"' % _number(float(bound))
+                    lines.append(f"{name}_bucket{_label_text(labels, key, le)} {cumulative}")
+                lines.append(f"{name}_sum{_label_text(labels, key)} {_number(round(value[1], 6))}")
+                lines.append(f"{name}_count{_label_text(labels, key)} {value[2]}")
+            else:
+                lines.append(f"{name}{_label_text(labels, key)} {_number(value)}")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,140 @@
+"""
+Connection Pool Monitoring
+A pymongo ConnectionPoolListener that keeps per-server pool counters
+(connections open / checked out, checkout failures) and recent checkout
+wait times, so /healthz and /readyz can show how close the pool is to
+exhaustion. Checkouts happen on the requesting thread, so the wait is
+measured between the started and finished events with a thread-local
+"""
+import threading
+import time
+from collections import deque
+
+from pymongo import monitoring
+
+WAIT_SAMPLES = 1000  # Recent checkout waits kept per process for percentiles
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Pool counters and checkout wait times, per server address"""
+
+    def __init__(self, max_pool_size=100):
+        self.max_pool_size = max_pool_size
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        """Forget everything (a forked worker starts with a new client)"""
+        with self._lock:
+            self._servers = {}
+            self._waits = deque(maxlen=WAIT_SAMPLES)
+            self._max_wait = 0.0
+            self._checkouts = 0
+            self._failures = {}
+
+    @staticmethod
+    def _key(address):
+        return f"{address[0]}:{address[1]}" if isinstance(address, tuple) else str(address)
+
+    def _server(self, address):
+        key = self._key(address)
+        server = self._servers.get(key)
+        if server is None:
+            server = self._servers[key] = {'open': 0, 'in_use': 0, 'peak_in_use': 0}
+        return server
+
+    # ---- pool events ----
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        with self._lock:
+            self._servers.pop(self._key(event.address), None)
+
+    # ---- connection events ----
+
+    def connection_created(self, event):
+        with self._lock:
+            self._server(event.address)['open'] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            server = self._server(event.address)
+            server['open'] = max(0, server['open'] - 1)
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        wait = self._finish_wait()
+        with self._lock:
+            server = self._server(event.address)
+            server['in_use'] += 1
+            server['peak_in_use'] = max(server['peak_in_use'], server['in_use'])
+            self._checkouts += 1
+            if wait is not None:
+                self._waits.append(wait)
+                self._max_wait = max(self._max_wait, wait)
+
+    def connection_check_out_failed(self, event):
+        self._finish_wait()
+        with self._lock:
+            reason = str(event.reason)
+            self._failures[reason] = self._failures.get(reason, 0) + 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            server = self._server(event.address)
+            server['in_use'] = max(0, server['in_use'] - 1)
+
+    def _finish_wait(self):
+        started = getattr(self._local, 'started', None)
+        self._local.started = None
+        return time.perf_counter() - started if started is not None else None
+
+    # ---- reporting ----
+
+    def snapshot(self):
+        """Pool state for health endpoints (wait times in milliseconds)"""
+        with self._lock:
+            waits = list(self._waits)
+            servers = {address: dict(counts, saturation=round(counts['in_use'] / float(self.max_pool_size), 3))
+                       for address, counts in self._servers.items()}
+            failures = dict(self._failures)
+            checkouts = self._checkouts
+            max_wait = self._max_wait
+
+        def ms(value):
+            return round(value * 1000, 2) if value is not None else None
+
+        return {
+            'max_pool_size': self.max_pool_size,
+            'servers': servers,
+            'saturation': max((server['saturation'] for server in servers.values()), default=0.0),
+            'checkouts': checkouts,
+            'checkout_failures': failures,
+            'wait_ms': {
+                'p50': ms(_percentile(waits, 0.5)),
+                'p95': ms(_percentile(waits, 0.95)),
+                'p99': ms(_percentile(waits, 0.99)),
+                'max': ms(max_wait) if checkouts else None
+            }
+        }
@@ -0,0 +1,156 @@
+"""
+Request Profiling
+Opt-in cProfile (and optionally tracemalloc) around a single request, with the
+results kept in a bounded on-disk store: <id>.prof (pstats, open it with
+snakeviz or pstats.Stats) and <id>.json (request details, top cumulative
+functions, top allocations) for the admin page
+
+One request per process is profiled at a time: cProfile allows a single
+active profiler, and tracemalloc sees every thread's allocations anyway
+"""
+import cProfile
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+
+PROFILE_ID = re.compile(r'^[0-9]{8}T[0-9]{12}-[0-9a-f]{8}$')  # Sorts by creation time
+
+_active = threading.Lock()
+
+
+class RequestProfiler:
+    """cProfile around one request; memory=True also traces allocations"""
+
+    def __init__(self, memory=False, frames=10):
+        self.memory = memory
+        self.frames = frames
+        self.profile = cProfile.Profile()
+        self.started = None
+        self.duration = None
+        self.allocations = None
+
+    @classmethod
+    def start(cls, memory=False, frames=10):
+        """A running profiler, or None while another request is being profiled"""
+        if not _active.acquire(blocking=False):
+            return None
+        profiler = cls(memory, frames)
+        try:
+            if memory and not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            else:
+                profiler.memory = False  # Someone else owns tracemalloc
+            profiler.started = time.perf_counter()
+            profiler.profile.enable()
+        except Exception:
+            _active.release()
+            raise
+        return profiler
+
+    def stop(self, top_allocations=15):
+        try:
+            self.profile.disable()
+            self.duration = time.perf_counter() - self.started
+            if self.memory:
+                snapshot = tracemalloc.take_snapshot()
+                current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                self.allocations = {
+                    'current_kb': round(current / 1024, 1),
+                    'peak_kb': round(peak / 1024, 1),
+                    'top': [{'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                             'size_kb': round(stat.size / 1024, 1), 'count': stat.count}
+                            for stat in snapshot.statistics('lineno')[:top_allocations]]
+                }
+        finally:
+            _active.release()
+        return self
+
+
+def top_functions(stats, limit=25):
+    """The functions with the most cumulative time"""
+    rows = []
+    for (filename, lineno, name), (primitive_calls, calls, own, cumulative, callers) in stats.stats.items():
+        rows.append({
+            'function': f"{filename}:{lineno}({name})" if lineno else name,
+            'calls': calls if calls == primitive_calls else f"{calls}/{primitive_calls}",
+            'tottime_ms': round(own * 1000, 2),
+            'cumtime_ms': round(cumulative * 1000, 2)
+        })
+    rows.sort(key=lambda row: -row['cumtime_ms'])
+    return rows[:limit]
+
+
+class ProfileStore:
+    """The newest max_profiles profiles in a directory shared by all worker processes"""
+
+    def __init__(self, directory, max_profiles=50):
+        self.directory = directory
+        self.max_profiles = max_profiles
+
+    def _path(self, profile_id, extension):
+        return os.path.join(self.directory, f"{profile_id}.{extension}")
+
+    def save(self, profiler, details, top=25):
+        """Write a finished profile and drop the oldest beyond max_profiles; returns its ID"""
+        os.makedirs(self.directory, exist_ok=True)
+        created_at = datetime.utcnow()
+        profile_id = f"{created_at.strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+        profiler.profile.dump_stats(self._path(profile_id, 'prof'))
+        stats = pstats.Stats(profiler.profile)
+        summary = dict(details, id=profile_id, created_at=created_at.isoformat(), pid=os.getpid(),
+                       duration_ms=round(profiler.duration * 1000, 2), function_calls=stats.total_calls,
+                       functions=top_functions(stats, top), allocations=profiler.allocations)
+        tmp_path = self._path(profile_id, 'json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(summary, f, default=str)
+        os.replace(tmp_path, self._path(profile_id, 'json'))
+        self.prune()
+        return profile_id
+
+    def _ids(self):
+        if not os.path.isdir(self.directory):
+            return []
+        ids = [name[:-len('.json')] for name in os.listdir(self.directory) if name.endswith('.json')]
+        return sorted((profile_id for profile_id in ids if PROFILE_ID.match(profile_id)), reverse=True)
+
+    def prune(self):
+        for profile_id in self._ids()[self.max_profiles:]:
+            for extension in ('json', 'prof'):
+                try:
+                    os.remove(self._path(profile_id, extension))
+                except OSError:
+                    pass
+
+    def list(self):
+        """Stored profile summaries, newest first"""
+        profiles = []
+        for profile_id in self._ids():
+            profile = self.get(profile_id)
+            if profile is not None:
+                profiles.append(profile)
+        return profiles
+
+    def get(self, profile_id):
+        if not PROFILE_ID.match(profile_id or ''):
+            return None
+        try:
+            with open(self._path(profile_id, 'json')) as f:
+                profile = json.load(f)
+        except (OSError, ValueError):
+            return None
+        profile['created_at'] = datetime.fromisoformat(profile['created_at'])
+        return profile
+
+    def stats_path(self, profile_id):
+        """The pstats file of a stored profile, or None"""
+        if not PROFILE_ID.match(profile_id or ''):
+            return None
+        path = os.path.abspath(self._path(profile_id, 'prof'))
+        return path if os.path.exists(path) else None
@@ -0,0 +1,62 @@
+"""
+Field Projection Profiles
+Named MongoDB projections so list pages and the API only fetch the
+complaint fields they actually display
+"""
+
+# Fields shown in complaint list rows (dashboard, admin list, recent lists)
+LIST_ROW_FIELDS = [
+    'complaint_id', 'user_id', 'category', 'location', 'description',
+    'status', 'priority', 'is_urgent', 'department', 'department_code',
+    'assigned_to', 'created_at', 'updated_at', 'sla_deadline', 'sla_breached',
+    'photo', 'image_path'
+]
+
+# Compact representation for API clients that poll
+API_SUMMARY_FIELDS = [
+    'complaint_id', 'user_id', 'category', 'location', 'status', 'priority',
+    'is_urgent', 'department', 'department_code', 'assigned_to',
+    'created_at', 'updated_at', 'sla_deadline', 'sla_breached', 'version', 'geo'
+]
+
+# What offline staff clients keep per assigned complaint (delta sync)
+STAFF_SYNC_FIELDS = API_SUMMARY_FIELDS + ['description', 'photo', 'assigned_at']
+
+# Every field a complaint document may carry (whitelist for ?fields=)
+COMPLAINT_FIELDS = set(LIST_ROW_FIELDS) | set(API_SUMMARY_FIELDS) | {
+    'comments', 'progress', 'proof_images', 'feedback', 'assigned_at'
+}
+
+PROJECTION_PROFILES = {
+    'list_row': LIST_ROW_FIELDS,
+    'staff_row': LIST_ROW_FIELDS + ['proof_images'],
+    'api_summary': API_SUMMARY_FIELDS,
+    'staff_sync': STAFF_SYNC_FIELDS,
+    'detail': None  # Full document
+}
+
+
+def get_projection(profile):
+    """Return the MongoDB projection dict for a named profile (None = all fields)"""
+    if profile not in PROJECTION_PROFILES:
+        raise ValueError(f"Unknown projection profile: {profile}")
+    fields = PROJECTION_PROFILES[profile]
+    if fields is None:
+        return None
+    return {field: 1 for field in fields}
+
+
+def parse_fields_param(fields_param):
+    """
+    Build a projection from a comma-separated ?fields= value
+    Returns None when no fields are requested, raises ValueError on unknown fields
+    """
+    if not fields_param:
+        return None
+    fields = [field.strip() for field in fields_param.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in COMPLAINT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    projection = {field: 1 for field in fields}
+    projection['user_id'] = 1  # Needed for access checks and id conversion
+    return projection
@@ -0,0 +1,234 @@
+"""
+Department Performance Reports
+Builds monthly PDF reports (volumes, SLA compliance, resolution times per
+department and category) from MongoDB aggregations. Reports are cached in
+REPORTS_FOLDER keyed by their parameters and a data version
+"""
+import os
+import hashlib
+import logging
+import tempfile
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+RESOLVED_STATUSES = ['Resolved', 'Closed']
+# Newest update per collection for the data version (same key as live polling's index)
+UPDATED_AT_INDEX = [('updated_at', 1), ('_id', 1)]
+
+
+def ensure_report_indexes(collections):
+    """updated_at index behind data_version; False if any failed"""
+    ok = True
+    for collection in collections:
+        try:
+            collection.create_index(UPDATED_AT_INDEX)
+        except Exception as e:
+            logger.warning("Could not create updated_at index on %s: %s", collection.name, e)
+            ok = False
+    return ok
+
+
+def resolution_changes(old_status, new_status, now):
+    """resolved_at for a status change: set when a complaint is resolved/closed, cleared when it is reopened"""
+    if new_status in RESOLVED_STATUSES and old_status not in RESOLVED_STATUSES:
+        return {'resolved_at': now}
+    if new_status not in RESOLVED_STATUSES and old_status in RESOLVED_STATUSES:
+        return {'resolved_at': None}
+    return {}
+
+
+def month_range(month):
+    """Return (start, end) datetimes for a 'YYYY-MM' string"""
+    start = datetime.strptime(month, '%Y-%m')
+    if start.month == 12:
+        end = start.replace(year=start.year + 1, month=1)
+    else:
+        end = start.replace(month=start.month + 1)
+    return start, end
+
+
+def data_version(collections):
+    """
+    Cheap fingerprint of the complaint data: per collection, the document count
+    from collection metadata and the newest updated_at (one index read). Any
+    insert, update or delete changes it. It covers whole collections, not just
+    the period, so a write elsewhere also invalidates a cached report; that
+    costs a rebuild, never a stale report. The current date is included
+    because open complaints can breach SLA without being updated
+    """
+    parts = [datetime.utcnow().strftime('%Y-%m-%d')]
+    for collection in collections:
+        latest = collection.find_one({}, {'updated_at': 1}, sort=[('updated_at', -1), ('_id', -1)])
+        last_update = latest.get('updated_at') if latest else None
+        parts.append(f"{collection.name}:{collection.estimated_document_count()}:"
+                     f"{last_update.isoformat() if isinstance(last_update, datetime) else ''}")
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def report_filename(report_type, month, version):
+    """Cache file name for a report, unique per parameters and data version"""
+    key = hashlib.sha1(f"{report_type}:{month}:{version}".encode('utf-8')).hexdigest()[:16]
+    return f"{report_type}_{month}_{key}.pdf"
+
+
+def aggregate_performance(collections, start, end):
+    """
+    Aggregate volumes, SLA outcomes and resolution time per (department, category)
+    All grouping runs inside MongoDB; only one summary row per group comes back
+    """
+    now = datetime.utcnow()
+    is_resolved = {'$in': ['$status', RESOLVED_STATUSES]}
+    # Complaints resolved before resolved_at was recorded fall back to updated_at
+    resolved_at = {'$ifNull': ['$resolved_at', '$updated_at']}
+    pipeline = [
+        {'$match': {'created_at': {'$gte': start, '$lt': end}}},
+        {'$group': {
+            '_id': {'department': '$department', 'category': '$category'},
+            'total': {'$sum': 1},
+            'resolved': {'$sum': {'$cond': [is_resolved, 1, 0]}},
+            'breached': {'$sum': {'$cond': [
+                {'$or': [
+                    {'$and': [is_resolved, {'$gt': [resolved_at, '$sla_deadline']}]},
+                    {'$and': [{'$not': [is_resolved]}, {'$lt': ['$sla_deadline', now]}]}
+                ]}, 1, 0]}},
+            'resolution_ms': {'$sum': {'$cond': [
+                is_resolved, {'$subtract': [resolved_at, '$created_at']}, 0]}}
+        }}
+    ]
+    rows = []
+    for collection in collections:
+        for group in collection.aggregate(pipeline):
+            rows.append({
+                'department': group['_id'].get('department') or 'Unknown',
+                'category': group['_id'].get('category') or 'Unknown',
+                'total': group['total'],
+                'resolved': group['resolved'],
+                'breached': group['breached'],
+                'resolution_ms': group['resolution_ms'] or 0
+            })
+    return rows
+
+
+def summarize(rows, key):
+    """Combine aggregated rows by 'department' or 'category'"""
+    totals = {}
+    for row in rows:
+        entry = totals.setdefault(row[key], {'total': 0, 'resolved': 0, 'breached': 0, 'resolution_ms': 0})
+        for field in ('total', 'resolved', 'breached', 'resolution_ms'):
+            entry[field] += row[field]
+    summary = []
+    for name in sorted(totals):
+        entry = totals[name]
+        summary.append({
+            'name': name,
+            'total': entry['total'],
+            'resolved': entry['resolved'],
+            'sla_compliance': round(100.0 * (entry['total'] - entry['breached']) / entry['total'], 1) if entry['total'] else 0.0,
+            'avg_resolution_hours': round(entry['resolution_ms'] / entry['resolved'] / 3600000.0, 1) if entry['resolved'] else None
+        })
+    return summary
+
+
+def render_performance_pdf(path, title, period_label, rows):
+    """Render the department performance report to a PDF file"""
+    # reportlab is only needed when a report is actually rendered
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    doc = SimpleDocTemplate(path, pagesize=A4, title=title)
+    story = [
+        Paragraph(title, styles['Title']),
+        Paragraph(f"Period: {period_label}", styles['Normal']),
+        Paragraph(f"Generated: {datetime.utcnow().strftime('%B %d, %Y %H:%M')} UTC", styles['Normal']),
+        Spacer(1, 18)
+    ]
+
+    total = sum(row['total'] for row in rows)
+    resolved = sum(row['resolved'] for row in rows)
+    story.append(Paragraph(f"Total complaints: {total} &nbsp;&nbsp; Resolved: {resolved}", styles['Heading3']))
+    story.append(Spacer(1, 12))
+
+    table_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#6366f1')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#cbd5e1')),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8fafc')])
+    ])
+
+    for heading, key in (('By Department', 'department'), ('By Category', 'category')):
+        story.append(Paragraph(heading, styles['Heading2']))
+        data = [[key.title(), 'Total', 'Resolved', 'SLA Compliance %', 'Avg Resolution (h)']]
+        for entry in summarize(rows, key):
+            data.append([
+                entry['name'],
+                entry['total'],
+                entry['resolved'],
+                f"{entry['sla_compliance']:.1f}",
+                f"{entry['avg_resolution_hours']:.1f}" if entry['avg_resolution_hours'] is not None else '-'
+            ])
+        if len(data) == 1:
+            data.append(['No complaints in this period', '', '', '', ''])
+        table = Table(data, repeatRows=1)
+        table.setStyle(table_style)
+        story.append(table)
+        story.append(Spacer(1, 18))
+
+    doc.build(story)
+
+
+def run_performance_report(ctx, collections, month, filename, reports_folder):
+    """Job function: aggregate and render a monthly report into REPORTS_FOLDER"""
+    start, end = month_range(month)
+    os.makedirs(reports_folder, exist_ok=True)
+    final_path = os.path.join(reports_folder, filename)
+    if os.path.exists(final_path):
+        return {'filename': filename, 'cached': True}
+
+    rows = aggregate_performance(collections, start, end)
+    ctx.update_progress(len(rows), len(rows), force=True)
+
+    # Render to a temp file so a half-written PDF is never served
+    fd, tmp_path = tempfile.mkstemp(dir=reports_folder, suffix='.pdf.part')
+    os.close(fd)
+    try:
+        render_performance_pdf(tmp_path, 'Department Performance Report', start.strftime('%B %Y'), rows)
+        os.replace(tmp_path, final_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    prune_reports(reports_folder, filename)
+    return {'filename': filename, 'cached': False}
+
+
+def prune_reports(reports_folder, filename):
+    """Delete older copies of the same report and month, built from earlier data versions"""
+    prefix = filename.rsplit('_', 1)[0] + '_'
+    for name in os.listdir(reports_folder):
+        if name != filename and name.startswith(prefix) and name.endswith('.pdf'):
+            try:
+                os.remove(os.path.join(reports_folder, name))
+            except OSError:
+                pass
+
+
+def list_cached_reports(reports_folder):
+    """PDF reports already on disk, newest first"""
+    if not os.path.isdir(reports_folder):
+        return []
+    reports = []
+    for name in os.listdir(reports_folder):
+        if not name.endswith('.pdf'):
+            continue
+        path = os.path.join(reports_folder, name)
+        reports.append({
+            'filename': name,
+            'size': os.path.getsize(path),
+            'created_at': datetime.utcfromtimestamp(os.path.getmtime(path))
+        })
+    reports.sort(key=lambda report: report['created_at'], reverse=True)
+    return reports
@@ -0,0 +1,130 @@
+"""
+Staff Roster
+In-memory cache of staff and admin accounts with per-member complaint counts
+(open / in progress / resolved), so the staff pages render without counting
+every category collection per staff member
+
+Counts are updated incrementally as complaints are assigned or change status
+and rebuilt from the database every reconcile_interval seconds
+"""
+import threading
+import time
+
+from utils.assignment import is_open
+
+ROSTER_ROLES = ('staff', 'admin')
+RESOLVED_STATUSES = ('Resolved', 'Closed')
+MEMBER_PROJECTION = {'password': 0}
+
+
+def summarize_counts(status_counts):
+    """Collapse per-status counts into the figures shown on the staff pages"""
+    return {
+        'assigned': sum(status_counts.values()),
+        'open': sum(count for status, count in status_counts.items() if is_open(status)),
+        'in_progress': status_counts.get('In Progress', 0),
+        'resolved': sum(status_counts.get(status, 0) for status in RESOLVED_STATUSES)
+    }
+
+
+class StaffRoster:
+    """Cached staff members plus live per-status complaint counts"""
+
+    def __init__(self, reconcile_interval=300):
+        self.reconcile_interval = reconcile_interval
+        self._lock = threading.Lock()
+        self._members = {}  # staff_id -> user document (no password)
+        self._counts = {}   # staff_id -> {status: complaints}
+        self._loaded_at = None
+
+    def needs_reload(self):
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.reconcile_interval
+
+    def load(self, users_collection, collections):
+        """Reload members and recount: one $group per collection"""
+        counts = {}
+        pipeline = [
+            {'$match': {'assigned_to': {'$ne': None}}},
+            {'$group': {'_id': {'staff': '$assigned_to', 'status': '$status'}, 'count': {'$sum': 1}}}
+        ]
+        for collection in collections:
+            for group in collection.aggregate(pipeline):
+                staff_counts = counts.setdefault(str(group['_id']['staff']), {})
+                status = group['_id'].get('status') or 'Pending'
+                staff_counts[status] = staff_counts.get(status, 0) + group['count']
+
+        members = {}
+        for user in users_collection.find({'role': {'$in': list(ROSTER_ROLES)}}, MEMBER_PROJECTION):
+            user['_id'] = str(user['_id'])
+            members[user['_id']] = user
+
+        with self._lock:
+            self._members = members
+            self._counts = counts
+            self._loaded_at = time.monotonic()
+        return len(members)
+
+    def upsert_member(self, user):
+        """Add or refresh one member after it is created or edited"""
+        user = {key: value for key, value in user.items() if key != 'password'}
+        user['_id'] = str(user['_id'])
+        with self._lock:
+            if user.get('role') in ROSTER_ROLES:
+                self._members[user['_id']] = user
+            else:
+                self._members.pop(user['_id'], None)
+
+    def update_member(self, staff_id, changes):
+        """Apply field changes to a cached member, if present"""
+        with self._lock:
+            member = self._members.get(str(staff_id))
+            if member is not None:
+                member.update(changes)
+
+    def track(self, old_assigned, old_status, new_assigned, new_status):
+        """Move one complaint between (staff, status) counters"""
+        old_key = (str(old_assigned), old_status or 'Pending') if old_assigned else None
+        new_key = (str(new_assigned), new_status or 'Pending') if new_assigned else None
+        if old_key == new_key:
+            return
+        with self._lock:
+            if old_key:
+                staff_counts = self._counts.setdefault(old_key[0], {})
+                staff_counts[old_key[1]] = max(staff_counts.get(old_key[1], 0) - 1, 0)
+            if new_key:
+                staff_counts = self._counts.setdefault(new_key[0], {})
+                staff_counts[new_key[1]] = staff_counts.get(new_key[1], 0) + 1
+
+    def get(self, staff_id):
+        """Cached member document (a copy), or None"""
+        with self._lock:
+            member = self._members.get(str(staff_id))
+            return dict(member) if member else None
+
+    def counts(self, staff_id):
+        with self._lock:
+            return summarize_counts(self._counts.get(str(staff_id), {}))
+
+    def members(self, roles=ROSTER_ROLES, active_only=False):
+        """Member copies with their counts, in creation order"""
+        with self._lock:
+            result = []
+            for member in self._members.values():
+                if member.get('role') not in roles:
+                    continue
+                if active_only and not member.get('is_active', True):
+                    continue
+                entry = dict(member)
+                entry['counts'] = summarize_counts(self._counts.get(member['_id'], {}))
+                result.append(entry)
+        result.sort(key=lambda member: member['_id'])
+        return result
+
+    def workloads(self):
+        """(staff_id, open complaints, department codes) for active staff, for the assignment engine"""
+        with self._lock:
+            return [
+                (staff_id, summarize_counts(self._counts.get(staff_id, {}))['open'], member.get('departments') or [])
+                for staff_id, member in self._members.items()
+                if member.get('role') == 'staff' and member.get('is_active', True)
+            ]
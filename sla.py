@@ -0,0 +1,111 @@
+"""
+SLA Sweeper
+Finds open complaints whose SLA deadline has passed, marks them sla_breached
+in bulk, records the breach in the activity log and escalates them (priority
+raised one level, department notified). Queries run on the
+(status, sla_deadline) index and only pick up complaints not yet flagged, so
+each sweep touches just the newly breached ones
+"""
+import logging
+from datetime import datetime
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+SLA_INDEX = [('status', 1), ('sla_deadline', 1)]
+SLA_BREACHED_INDEX = [('sla_breached', 1), ('status', 1)]
+SWEEP_PROJECTION = {
+    'complaint_id': 1, 'category': 1, 'department': 1, 'department_code': 1,
+    'location': 1, 'priority': 1, 'status': 1, 'sla_deadline': 1, 'assigned_to': 1
+}
+
+
+def ensure_sla_indexes(collections):
+    """Create the indexes the sweeper and the dashboards filter on; False if any failed"""
+    ok = True
+    for collection in collections:
+        try:
+            collection.create_index(SLA_INDEX, name='status_sla_deadline')
+            collection.create_index(SLA_BREACHED_INDEX, name='sla_breached_status')
+        except Exception as e:
+            logger.warning("Could not create SLA indexes on %s: %s", collection.name, e)
+            ok = False
+    return ok
+
+
+def next_priority(priority, priority_levels):
+    """The priority one level above (shorter SLA), or None if already at the top"""
+    levels = sorted(priority_levels, key=lambda level: -priority_levels[level].get('days', 0))
+    if priority not in levels:
+        return None
+    index = levels.index(priority)
+    return levels[index + 1] if index + 1 < len(levels) else None
+
+
+def sweep_sla_breaches(collections, activity_collection, open_statuses, priority_levels,
+                       escalate=True, batch_size=500, now=None):
+    """
+    Flag complaints that breached their SLA since the last sweep
+    Returns the breached complaints (with their new priority) for notifications
+    """
+    now = now or datetime.utcnow()
+    query = {
+        'status': {'$in': list(open_statuses)},
+        'sla_deadline': {'$lt': now},
+        'sla_breached': {'$ne': True}
+    }
+    breached = []
+    for collection in collections:
+        while True:
+            docs = list(collection.find(query, SWEEP_PROJECTION).limit(batch_size))
+            if not docs:
+                break
+            ops = []
+            activities = []
+            for doc in docs:
+                update_set = {'sla_breached': True, 'sla_breached_at': now, 'updated_at': now}
+                new_priority = next_priority(doc.get('priority'), priority_levels) if escalate else None
+                if new_priority:
+                    update_set['priority'] = new_priority
+                    update_set['escalated_at'] = now
+                # The sla_breached guard keeps a concurrent sweep from flagging twice
+                ops.append(UpdateOne({'_id': doc['_id'], 'sla_breached': {'$ne': True}},
+                                     {'$set': update_set, '$inc': {'version': 1}}))
+                activities.append({
+                    'complaint_id': doc['_id'],
+                    'action': 'sla_breached',
+                    'user_id': None,
+                    'details': {
+                        'sla_deadline': doc.get('sla_deadline'),
+                        'priority_from': doc.get('priority'),
+                        'priority_to': new_priority or doc.get('priority')
+                    },
+                    'timestamp': now,
+                    'ip_address': 'system'
+                })
+                breached.append(dict(doc, priority=new_priority or doc.get('priority'),
+                                     previous_priority=doc.get('priority')))
+            result = collection.bulk_write(ops, ordered=False)
+            if activity_collection is not None:
+                activity_collection.insert_many(activities, ordered=False)
+            if len(docs) < batch_size or result.modified_count == 0:
+                break
+    return breached
+
+
+def group_by_department(breached, departments):
+    """Group breached complaints into one digest per department email"""
+    emails = {info.get('code'): (info.get('email'), info.get('name')) for info in departments.values()}
+    digests = {}
+    for complaint in breached:
+        email, name = emails.get(complaint.get('department_code'), (None, None))
+        if not email:
+            continue
+        digest = digests.setdefault(email, {'email': email, 'name': name, 'complaints': []})
+        digest['complaints'].append({
+            'complaint_id': complaint.get('complaint_id', str(complaint['_id'])),
+            'category': complaint.get('category', ''),
+            'location': complaint.get('location', ''),
+            'priority': complaint.get('priority', ''),
+            'sla_deadline': complaint.get('sla_deadline')
+        })
+    return list(digests.values())
@@ -0,0 +1,171 @@
+"""
+Upload Storage Backends
+Stores complaint photos and worker proof uploads either on the local
+filesystem or in MongoDB GridFS so several app nodes can share them
+"""
+import logging
+import os
+import shutil
+import mimetypes
+import tempfile
+from flask import url_for as flask_url_for
+
+logger = logging.getLogger(__name__)
+UPLOADS_PREFIX = 'uploads/'
+
+
+def upload_filename(path):
+    """Strip 'static/' and 'uploads/' prefixes from a stored upload path"""
+    if not path:
+        return ''
+    path = path.lstrip('/')
+    if path.startswith('static/'):
+        path = path[7:]
+    if path.startswith(UPLOADS_PREFIX):
+        path = path[len(UPLOADS_PREFIX):]
+    return os.path.basename(path)
+
+
+class StorageBackend:
+    """Interface shared by all upload storage backends"""
+
+    def put(self, filename, stream, content_type=None):
+        """Store a file and return the path to save on the complaint document"""
+        raise NotImplementedError
+
+    def get_stream(self, path):
+        """Return a readable binary file object for a stored path, or None"""
+        raise NotImplementedError
+
+    def delete(self, path):
+        """Remove a stored file, returns True if something was deleted"""
+        raise NotImplementedError
+
+    def url_for(self, path):
+        """Return the URL templates should use to display a stored file"""
+        raise NotImplementedError
+
+
+class LocalStorageBackend(StorageBackend):
+    """Stores uploads in UPLOAD_FOLDER, served by Flask's static route"""
+
+    def __init__(self, upload_folder):
+        self.upload_folder = upload_folder
+        os.makedirs(self.upload_folder, exist_ok=True)
+
+    def _full_path(self, path):
+        return os.path.join(self.upload_folder, upload_filename(path))
+
+    def put(self, filename, stream, content_type=None):
+        filename = upload_filename(filename)
+        with open(self._full_path(filename), 'wb') as f:
+            shutil.copyfileobj(stream, f)
+        return f"{UPLOADS_PREFIX}{filename}"
+
+    def get_stream(self, path):
+        try:
+            return open(self._full_path(path), 'rb')
+        except OSError:
+            return None
+
+    def delete(self, path):
+        try:
+            os.remove(self._full_path(path))
+            return True
+        except OSError:
+            return False
+
+    def url_for(self, path):
+        return flask_url_for('static', filename=f"{UPLOADS_PREFIX}{upload_filename(path)}")
+
+
+class GridFSStorageBackend(StorageBackend):
+    """
+    Stores uploads in a GridFS bucket of the complaints database
+    Reads and writes are streamed in chunks; when cache_folder is set,
+    downloaded files are kept on local disk and served from there
+    """
+
+    def __init__(self, database, bucket_name='uploads', chunk_size=255 * 1024, cache_folder=None):
+        import gridfs
+        self.bucket = gridfs.GridFSBucket(database, bucket_name=bucket_name,
+                                          chunk_size_bytes=chunk_size)
+        self.files = database[f"{bucket_name}.files"]
+        self.chunk_size = chunk_size
+        self.cache_folder = cache_folder
+        if self.cache_folder:
+            os.makedirs(self.cache_folder, exist_ok=True)
+
+    def _cache_path(self, filename):
+        return os.path.join(self.cache_folder, filename)
+
+    def put(self, filename, stream, content_type=None):
+        filename = upload_filename(filename)
+        content_type = content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        self.bucket.upload_from_stream(filename, stream, metadata={'content_type': content_type})
+        return f"{UPLOADS_PREFIX}{filename}"
+
+    def get_stream(self, path):
+        import gridfs
+        filename = upload_filename(path)
+        if self.cache_folder:
+            cache_path = self._cache_path(filename)
+            if os.path.exists(cache_path):
+                return open(cache_path, 'rb')
+        try:
+            grid_out = self.bucket.open_download_stream_by_name(filename)
+        except gridfs.errors.NoFile:
+            return None
+        if not self.cache_folder:
+            return grid_out
+
+        # Read-through cache: copy chunk by chunk into a temp file, then
+        # rename so concurrent readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_folder)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                while True:
+                    chunk = grid_out.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+            os.replace(tmp_path, self._cache_path(filename))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return self.bucket.open_download_stream_by_name(filename)
+        finally:
+            grid_out.close()
+        return open(self._cache_path(filename), 'rb')
+
+    def delete(self, path):
+        filename = upload_filename(path)
+        deleted = False
+        for grid_file in self.files.find({'filename': filename}, {'_id': 1}):
+            self.bucket.delete(grid_file['_id'])
+            deleted = True
+        if self.cache_folder:
+            try:
+                os.remove(self._cache_path(filename))
+            except OSError:
+                pass
+        return deleted
+
+    def url_for(self, path):
+        return flask_url_for('uploaded_file', filename=upload_filename(path))
+
+
+def create_storage_backend(config, database=None):
+    """Build the storage backend selected by STORAGE_BACKEND"""
+    backend = config.get('STORAGE_BACKEND', 'local')
+    if backend == 'gridfs':
+        if database is None:
+            logger.warning("GridFS storage requested but database is unavailable, using local storage")
+        else:
+            return GridFSStorageBackend(
+                database,
+                bucket_name=config.get('GRIDFS_BUCKET', 'uploads'),
+                chunk_size=config.get('GRIDFS_CHUNK_SIZE', 255 * 1024),
+                cache_folder=config.get('GRIDFS_CACHE_FOLDER') or None
+            )
+    return LocalStorageBackend(config['UPLOAD_FOLDER'])
@@ -0,0 +1,148 @@
+"""
+Staff Delta Sync
+"Everything assigned to me that changed since token T" for offline-capable
+staff clients. Changes come from the (assigned_to, updated_at) index on each
+category collection; complaints reassigned away from a staff member are
+reported through tombstones kept in a small TTL collection
+
+A sync token is an opaque cursor: the start of the sync cycle plus the
+(updated_at, _id) position reached so far, so large change sets page
+cleanly even when a bulk action stamps many complaints with the same time
+"""
+import base64
+import binascii
+import json
+import logging
+from datetime import datetime, timedelta
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import DeleteOne, UpdateOne
+
+logger = logging.getLogger(__name__)
+SYNC_INDEX = [('assigned_to', 1), ('updated_at', 1), ('_id', 1)]
+TOMBSTONE_INDEX = [('staff_id', 1), ('removed_at', 1)]
+TOKEN_VERSION = 1
+EPOCH = datetime(1970, 1, 1)
+
+
+class InvalidSyncToken(ValueError):
+    """Raised for tokens that cannot be decoded; clients should do a full sync"""
+
+
+def ensure_sync_indexes(collections, tombstones, retention_days=30):
+    """Create the sync index on each category collection and the tombstone TTL index; False if any failed"""
+    ok = True
+    for collection in collections:
+        try:
+            collection.create_index(SYNC_INDEX, name='assigned_to_updated_at')
+        except Exception as e:
+            logger.warning("Could not create sync index on %s: %s", collection.name, e)
+            ok = False
+    try:
+        tombstones.create_index(TOMBSTONE_INDEX, name='staff_removed_at')
+        tombstones.create_index([('staff_id', 1), ('complaint_id', 1)], name='staff_complaint', unique=True)
+        tombstones.create_index('removed_at', name='tombstone_ttl', expireAfterSeconds=retention_days * 86400)
+    except Exception as e:
+        logger.warning("Could not create tombstone indexes: %s", e)
+        ok = False
+    return ok
+
+
+def _to_ms(value):
+    return int((value - EPOCH).total_seconds() * 1000)
+
+
+def _from_ms(value):
+    return EPOCH + timedelta(milliseconds=int(value))
+
+
+def encode_token(cycle_start, position=None, last_id=None):
+    """Opaque token: cycle start, and the (updated_at, _id) reached within the cycle"""
+    data = {'v': TOKEN_VERSION, 's': _to_ms(cycle_start)}
+    if position is not None:
+        data['t'] = _to_ms(position)
+        data['i'] = str(last_id) if last_id else None
+    raw = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_token(token):
+    """(cycle_start, position, last_id); raises InvalidSyncToken"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        data = json.loads(raw)
+        if data.get('v') != TOKEN_VERSION:
+            raise InvalidSyncToken('Unsupported sync token version')
+        cycle_start = _from_ms(data['s'])
+        position = _from_ms(data['t']) if 't' in data else cycle_start
+        last_id = ObjectId(data['i']) if data.get('i') else None
+        return cycle_start, position, last_id
+    except InvalidSyncToken:
+        raise
+    except (binascii.Error, ValueError, TypeError, KeyError, InvalidId, OverflowError) as e:
+        raise InvalidSyncToken(f'Invalid sync token: {e}')
+
+
+def record_reassignments(tombstones, moves, now=None):
+    """
+    Keep tombstones in step with (complaint_oid, old_assigned, new_assigned) moves:
+    the previous assignee gets a tombstone, the new one loses any old tombstone
+    """
+    now = now or datetime.utcnow()
+    ops = []
+    for complaint_oid, old_assigned, new_assigned in moves:
+        if str(old_assigned or '') == str(new_assigned or ''):
+            continue
+        if old_assigned:
+            ops.append(UpdateOne({'staff_id': ObjectId(str(old_assigned)), 'complaint_id': complaint_oid},
+                                 {'$set': {'removed_at': now}}, upsert=True))
+        if new_assigned:
+            ops.append(DeleteOne({'staff_id': ObjectId(str(new_assigned)), 'complaint_id': complaint_oid}))
+    if ops:
+        tombstones.bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def changes_since(collections, tombstones, staff_oid, token=None, limit=200, projection=None,
+                  now=None, overlap_seconds=5, max_age_days=30):
+    """
+    One page of changes for a staff member
+    Returns (changes, removed complaint ids, next token, has_more). The final
+    page's token starts the next cycle overlap_seconds in the past so writes
+    still in flight when the page was read are picked up next time (clients
+    upsert by _id, so repeats are harmless). Tokens older than the tombstone
+    retention are rejected, since removals may already have been purged
+    """
+    now = now or datetime.utcnow()
+    if token:
+        cycle_start, position, last_id = decode_token(token)
+        if EPOCH < cycle_start < now - timedelta(days=max_age_days):
+            raise InvalidSyncToken('Sync token expired')
+    else:
+        cycle_start, position, last_id = EPOCH, EPOCH, None
+
+    query = {'assigned_to': staff_oid}
+    if last_id is not None:
+        query['$or'] = [{'updated_at': {'$gt': position}}, {'updated_at': position, '_id': {'$gt': last_id}}]
+    elif position > EPOCH:
+        query['updated_at'] = {'$gte': position}
+
+    docs = []
+    for collection in collections:
+        cursor = collection.find(query, projection).sort([('updated_at', 1), ('_id', 1)]).limit(limit + 1)
+        docs.extend(cursor)
+    docs.sort(key=lambda doc: (doc.get('updated_at') or EPOCH, doc['_id']))
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+
+    if has_more:
+        last = docs[-1]
+        return docs, [], encode_token(cycle_start, last.get('updated_at') or EPOCH, last['_id']), True
+
+    # Last page: tombstones for the whole cycle, then start the next cycle
+    # (a full sync starts from nothing, so it needs no tombstones)
+    removed = []
+    if cycle_start > EPOCH:
+        removed = [str(doc['complaint_id']) for doc in
+                   tombstones.find({'staff_id': staff_oid, 'removed_at': {'$gte': cycle_start}}, {'complaint_id': 1})]
+    return docs, removed, encode_token(now - timedelta(seconds=overlap_seconds)), False
@@ -0,0 +1,18 @@
+"""
+The application modules live at the repository root but import each other as
+utils.<module> (the deployed layout) and import config directly; expose the
+root both ways
+"""
+import os
+import sys
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+if 'utils' not in sys.modules:
+    utils = types.ModuleType('utils')
+    utils.__path__ = [ROOT]
+    sys.modules['utils'] = utils
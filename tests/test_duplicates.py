@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+import mongomock
+from bson import ObjectId
+
+from utils.duplicates import NUM_PERM, DuplicateIndex, minhash_signature, normalize, similarity
+
+NOW = datetime(2024, 6, 1, 12, 0, 0)
+POTHOLE = ('Large pothole in the middle of the road causing accidents every night', 'MG Road near bus stand')
+REWORDED = ('There is a large pothole in the middle of the road, causing accidents every night!',
+            'M.G. Road near the bus stand')
+UNRELATED = ('Street light not working for two weeks in the colony', 'Sector 14 park lane')
+
+
+def complaint(text, created_at=NOW, **extra):
+    description, location = text
+    return dict({'_id': ObjectId(), 'description': description, 'location': location,
+                 'status': 'Pending', 'created_at': created_at}, **extra)
+
+
+def test_normalize_drops_punctuation_and_stop_words():
+    assert normalize('The pothole, near THE bus-stand!') == 'pothole bus stand'
+
+
+def test_signature_is_stable_and_fixed_length():
+    signature = minhash_signature(*POTHOLE)
+    assert len(signature) == NUM_PERM
+    assert signature == minhash_signature(*POTHOLE)
+
+
+def test_similarity_separates_rewording_from_other_complaints():
+    signature = minhash_signature(*POTHOLE)
+    assert similarity(signature, signature) == 1.0
+    assert similarity(signature, minhash_signature(*REWORDED)) >= 0.5
+    assert similarity(signature, minhash_signature(*UNRELATED)) < 0.2
+
+
+def test_find_returns_candidates_sharing_a_band():
+    index = DuplicateIndex(threshold=0.5)
+    original = complaint(POTHOLE, complaint_id='CMP-1')
+    index.add('Road Damage', original)
+    index.add('Road Damage', complaint(UNRELATED))
+
+    matches = index.find('Road Damage', minhash_signature(*REWORDED), now=NOW)
+    assert [entry['_id'] for _, entry in matches] == [str(original['_id'])]
+    assert matches[0][1]['complaint_id'] == 'CMP-1'
+    assert 'signature' not in matches[0][1]
+    # Tables are per category
+    assert index.find('Water Supply', minhash_signature(*REWORDED), now=NOW) == []
+
+
+def test_add_is_idempotent_and_remove_unindexes():
+    index = DuplicateIndex()
+    doc = complaint(POTHOLE)
+    assert index.add('Road Damage', doc)
+    assert not index.add('Road Damage', doc)
+    assert len(index) == 1
+    index.remove('Road Damage', doc['_id'])
+    assert len(index) == 0
+    assert index.find('Road Damage', minhash_signature(*POTHOLE), now=NOW) == []
+
+
+def test_complaints_outside_the_window_are_pruned():
+    index = DuplicateIndex(window_hours=72)
+    index.add('Road Damage', complaint(POTHOLE, created_at=NOW - timedelta(hours=80)))
+    assert index.find('Road Damage', minhash_signature(*POTHOLE), now=NOW) == []
+    assert len(index) == 0
+
+
+def test_load_and_catch_up_skip_closed_and_duplicate_complaints():
+    collection = mongomock.MongoClient().db.road_damage
+    collection.insert_many([
+        complaint(POTHOLE, created_at=NOW - timedelta(hours=1)),
+        complaint(POTHOLE, created_at=NOW - timedelta(hours=1), status='Closed'),
+        complaint(POTHOLE, created_at=NOW - timedelta(hours=1), duplicate_of=ObjectId()),
+        complaint(POTHOLE, created_at=NOW - timedelta(hours=100)),
+    ])
+    index = DuplicateIndex(window_hours=72)
+    assert index.load({'Road Damage': collection}, now=NOW) == 1
+    assert index.loaded
+
+    # Inserted by another process after the load
+    collection.insert_one(complaint(REWORDED, created_at=NOW + timedelta(minutes=1)))
+    assert index.catch_up('Road Damage', collection) == 1
+    assert index.catch_up('Road Damage', collection) == 0
+    assert len(index) == 2
@@ -0,0 +1,70 @@
+from datetime import datetime
+
+import mongomock
+
+from config import Config
+from utils.keywords import KeywordMatcher, is_more_severe, rescan_collection
+
+PRIORITY_LEVELS = Config.PRIORITY_LEVELS
+KEYWORDS = {'gas leak': 'Urgent', 'gas': 'High', 'live wire': 'Urgent', 'wire': 'Normal',
+            'sewage overflow': 'High', 'overflow': 'Low'}
+NOW = datetime(2024, 6, 1, 12, 0, 0)
+
+
+def test_overlapping_keywords_all_match():
+    matcher = KeywordMatcher(KEYWORDS)
+    assert matcher.scan('Gas leak next to a LIVE-WIRE; sewage  overflow too') == \
+        ['gas', 'gas leak', 'live wire', 'overflow', 'sewage overflow', 'wire']
+
+
+def test_keywords_match_whole_words_only():
+    matcher = KeywordMatcher(KEYWORDS)
+    assert matcher.scan('gas leakage from the gasworks') == ['gas']
+    assert matcher.scan('wireless overflowing') == []
+
+
+def test_failure_links_recover_partial_matches():
+    # A partial 'live wire' falls back through its failure links and still finds the later keywords
+    matcher = KeywordMatcher({'live wire': 'Urgent', 'wire': 'Normal', 'wire cut': 'High'})
+    assert matcher.scan('a live wir then a wire cut') == ['wire', 'wire cut']
+    assert matcher.scan('live live wire') == ['live wire', 'wire']
+
+
+def test_empty_matcher_and_blank_keywords():
+    assert KeywordMatcher({}).scan('gas leak') == []
+    matcher = KeywordMatcher({'  ': 'Urgent', '!!': 'High'})
+    assert len(matcher) == 0
+
+
+def test_escalation_picks_the_most_severe_priority():
+    matcher = KeywordMatcher(KEYWORDS)
+    assert matcher.escalation(['gas', 'gas leak'], PRIORITY_LEVELS) == 'Urgent'
+    assert matcher.escalation(['overflow'], PRIORITY_LEVELS) == 'Low'
+    assert matcher.escalation([], PRIORITY_LEVELS) is None
+
+
+def test_is_more_severe():
+    assert is_more_severe('Urgent', 'Normal', PRIORITY_LEVELS)
+    assert not is_more_severe('Low', 'Normal', PRIORITY_LEVELS)
+    assert not is_more_severe('Normal', 'Normal', PRIORITY_LEVELS)
+    assert is_more_severe('Low', None, PRIORITY_LEVELS)
+    assert not is_more_severe('Unknown', 'Low', PRIORITY_LEVELS)
+
+
+def test_rescan_escalates_but_never_lowers_priority():
+    collection = mongomock.MongoClient().db.road_damage
+    leak, overflow, quiet = collection.insert_many([
+        {'description': 'Gas leak near the school', 'priority': 'Normal', 'created_at': NOW, 'version': 1},
+        {'description': 'Drain overflow', 'priority': 'High', 'created_at': NOW, 'version': 1},
+        {'description': 'Faded road markings', 'priority': 'Normal', 'created_at': NOW, 'version': 1},
+    ]).inserted_ids
+
+    escalated = rescan_collection(KeywordMatcher(KEYWORDS), collection, {}, PRIORITY_LEVELS, now=NOW)
+    assert [(doc['_id'], update_set['priority']) for doc, update_set in escalated] == [(leak, 'Urgent')]
+
+    leak_doc = collection.find_one({'_id': leak})
+    assert leak_doc['priority'] == 'Urgent' and leak_doc['is_urgent'] and leak_doc['version'] == 2
+    overflow_doc = collection.find_one({'_id': overflow})
+    assert overflow_doc['priority'] == 'High'
+    assert overflow_doc['escalation_keywords'] == ['overflow'] and overflow_doc['version'] == 2
+    assert collection.find_one({'_id': quiet})['version'] == 1
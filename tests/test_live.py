@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+import mongomock
+
+from utils.live import changes_after, latest_watermark
+
+T0 = datetime(2024, 6, 1, 12, 0, 0)
+
+
+def make_collection():
+    return mongomock.MongoClient().db.complaints
+
+
+def test_empty_collection_starts_at_epoch():
+    assert latest_watermark(make_collection()) == (datetime(1970, 1, 1), None)
+
+
+def test_watermark_breaks_ties_on_id():
+    collection = make_collection()
+    ids = collection.insert_many([{'status': 'Pending', 'updated_at': T0} for _ in range(3)]).inserted_ids
+    assert latest_watermark(collection) == (T0, max(ids))
+
+
+def test_documents_sharing_updated_at_are_paged_past():
+    collection = make_collection()
+    watermark = latest_watermark(collection)
+    # A bulk action stamps more documents with one time than fit in a page
+    ids = collection.insert_many([{'status': 'In Progress', 'updated_at': T0} for _ in range(12)]).inserted_ids
+
+    docs, watermark = changes_after(collection, watermark, page_size=5)
+    assert [doc['_id'] for doc in docs] == sorted(ids)
+    assert watermark == (T0, max(ids))
+
+    docs, watermark = changes_after(collection, watermark, page_size=5)
+    assert docs == []
+    assert watermark == (T0, max(ids))
+
+
+def test_only_later_changes_are_returned():
+    collection = make_collection()
+    collection.insert_many([{'status': 'Pending', 'updated_at': T0} for _ in range(4)])
+    watermark = latest_watermark(collection)
+    later = collection.insert_one({'status': 'Pending', 'updated_at': T0 + timedelta(seconds=1)}).inserted_id
+    # Same time as the watermark but a higher _id: written after the watermark was read
+    tied = collection.insert_one({'status': 'Pending', 'updated_at': T0}).inserted_id
+
+    docs, watermark = changes_after(collection, watermark, page_size=2)
+    assert [doc['_id'] for doc in docs] == [tied, later]
+    assert watermark == (T0 + timedelta(seconds=1), later)
@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+from bson import ObjectId
+
+from utils.sync import (EPOCH, InvalidSyncToken, changes_since, decode_token, encode_token,
+                        record_reassignments)
+
+NOW = datetime(2024, 6, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().db
+
+
+def add_complaints(collection, staff_oid, count, updated_at):
+    docs = [{'assigned_to': staff_oid, 'status': 'Pending', 'updated_at': updated_at} for _ in range(count)]
+    return collection.insert_many(docs).inserted_ids
+
+
+def sync_all(collections, tombstones, staff_oid, token=None, limit=200, now=NOW):
+    """Follow has_more to the end of a cycle; returns (ids, removed, next token)"""
+    ids, removed = [], []
+    while True:
+        changes, gone, token, has_more = changes_since(collections, tombstones, staff_oid, token, limit=limit, now=now)
+        ids.extend(doc['_id'] for doc in changes)
+        removed.extend(gone)
+        if not has_more:
+            return ids, removed, token
+
+
+def test_token_round_trip():
+    last_id = ObjectId()
+    token = encode_token(NOW, NOW + timedelta(seconds=3), last_id)
+    assert decode_token(token) == (NOW, NOW + timedelta(seconds=3), last_id)
+    assert decode_token(encode_token(NOW)) == (NOW, NOW, None)
+
+
+@pytest.mark.parametrize('token', ['not a token', 'e30', encode_token(NOW).swapcase()])
+def test_bad_tokens_are_rejected(token):
+    with pytest.raises(InvalidSyncToken):
+        decode_token(token)
+
+
+def test_pages_through_complaints_sharing_updated_at(db):
+    staff_oid = ObjectId()
+    roads, water = db.road_damage, db.water_supply
+    # A bulk action stamps every complaint with the same time, across collections
+    ids = add_complaints(roads, staff_oid, 7, NOW) + add_complaints(water, staff_oid, 6, NOW)
+    add_complaints(roads, ObjectId(), 3, NOW)
+
+    synced, removed, _ = sync_all([roads, water], db.tombstones, staff_oid, limit=4)
+    assert synced == sorted(ids)
+    assert removed == []
+
+
+def test_next_cycle_returns_later_changes_and_tombstones(db):
+    staff_oid, other_oid = ObjectId(), ObjectId()
+    roads = db.road_damage
+    kept, moved = add_complaints(roads, staff_oid, 2, NOW - timedelta(hours=1))
+    _, _, token = sync_all([roads], db.tombstones, staff_oid, now=NOW - timedelta(minutes=30))
+
+    later = NOW - timedelta(minutes=10)
+    roads.update_one({'_id': kept}, {'$set': {'status': 'In Progress', 'updated_at': later}})
+    roads.update_one({'_id': moved}, {'$set': {'assigned_to': other_oid, 'updated_at': later}})
+    record_reassignments(db.tombstones, [(moved, staff_oid, other_oid)], now=later)
+
+    synced, removed, _ = sync_all([roads], db.tombstones, staff_oid, token)
+    assert synced == [kept]
+    assert removed == [str(moved)]
+
+
+def test_reassigning_back_clears_the_tombstone(db):
+    staff_oid, other_oid, complaint_oid = ObjectId(), ObjectId(), ObjectId()
+    record_reassignments(db.tombstones, [(complaint_oid, staff_oid, other_oid)], now=NOW)
+    record_reassignments(db.tombstones, [(complaint_oid, other_oid, staff_oid)], now=NOW)
+    assert [doc['staff_id'] for doc in db.tombstones.find()] == [other_oid]
+    assert record_reassignments(db.tombstones, [(complaint_oid, staff_oid, staff_oid)]) == 0
+
+
+def test_final_token_overlaps_in_flight_writes(db):
+    _, _, token = sync_all([db.road_damage], db.tombstones, ObjectId())
+    cycle_start, position, last_id = decode_token(token)
+    assert cycle_start == position == NOW - timedelta(seconds=5)
+    assert last_id is None
+
+
+def test_expired_token_is_rejected(db):
+    token = encode_token(NOW - timedelta(days=31))
+    with pytest.raises(InvalidSyncToken):
+        changes_since([db.road_damage], db.tombstones, ObjectId(), token, now=NOW)
+    # A full sync (cycle starting at EPOCH) never expires
+    changes_since([db.road_damage], db.tombstones, ObjectId(), encode_token(EPOCH), now=NOW)
@@ -0,0 +1,24 @@
+"""
+Production entry point
+  gunicorn -c gunicorn.conf.py wsgi:application   (Linux/Mac, several processes)
+  python wsgi.py                                  (waitress, single process; works on Windows)
+"""
+import logging
+import os
+import signal
+import sys
+
+from app import create_app
+from config import Config
+
+# Under gunicorn each worker starts its own background tasks after the fork (see gunicorn.conf.py)
+application = create_app(start_background=os.environ.get('WSGI_SERVER') != 'gunicorn')
+
+if __name__ == '__main__':
+    from waitress import serve
+
+    # waitress stops on SystemExit; turning SIGTERM into one lets the atexit hook
+    # registered by create_app flush background work
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    logging.getLogger(__name__).info("Serving on %s with %s threads (waitress)", Config.SERVER_BIND, Config.SERVER_THREADS)
+    serve(application, listen=Config.SERVER_BIND, threads=Config.SERVER_THREADS)